@@ -0,0 +1,302 @@
+"""
+This script is used to keep a pool of copies of an In-Class Activity template ready in a staging folder, so that
+activities can be handed out in class without waiting for each copy to be made.
+
+    - "prewarm" (before class) tops up the staging folder with anonymous copies of the template.
+    - "claim" (in class) renames one pool copy for each student and moves it into the activity folder, with one
+      batched files.update request per chunk of students, so no copies are made while students wait. If the pool runs
+      out (or a claim fails), the remaining students' activities are copied as usual.
+"""
+
+import importlib
+import itertools
+import re
+import sys
+import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import helpers.drive as drive
+import helpers.naming as naming
+import helpers.pipeline as pipeline
+from copy_gdrive_file import copy_file
+
+# the In-Class Activity generator's module name is not a valid identifier, so it cannot be imported with "import"
+create_activity_module = importlib.import_module("create_in-class-activity")
+
+# name of each copy in the pool. the template id keeps pools of different templates apart in one staging folder.
+POOL_FILENAME_FORMAT = "Activity Pool -- {template_id} -- {index:04d}"
+POOL_FILENAME_PATTERN = re.compile(
+    r"^Activity Pool -- (?P<template_id>\S+) -- (?P<index>\d+)$"
+)
+
+
+def find_pool_copies(gdrive_service, template_id, staging_folder_id):
+    """
+    Finds the unclaimed pool copies of a template in the staging folder, with a single listing.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param template_id: string id of template the pool was copied from.
+    :param staging_folder_id: string id of staging folder.
+    :return: list of (int index, file dict) tuples, sorted by index.
+    """
+    output = []
+    for curr_file in drive.list_files(
+        gdrive_service, drive.folder_query(staging_folder_id)
+    ):
+        results = POOL_FILENAME_PATTERN.match(curr_file["name"])
+        if results is not None and results.group("template_id") == template_id:
+            output.append((int(results.group("index")), curr_file))
+
+    return sorted(output, key=lambda pool_copy: pool_copy[0])
+
+
+def prewarm_pool(
+    gdrive_service, template_url, staging_folder_url, pool_size, copy_controller=None
+):
+    """
+    Tops up the pool of copies in the staging folder, so it holds at least pool_size unclaimed copies.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param template_url: string url of In-Class Activity template.
+    :param staging_folder_url: string url of folder to keep the pool in.
+    :param pool_size: int number of unclaimed copies the pool should hold.
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :return: int number of copies created.
+    """
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+    template_id = helpers.get_file_id_from_url(template_url)
+    staging_folder_id = helpers.get_folder_id_from_url(staging_folder_url)
+
+    # number new copies after the existing ones, so names stay unique
+    pool_copies = find_pool_copies(gdrive_service, template_id, staging_folder_id)
+    next_index = pool_copies[-1][0] + 1 if pool_copies else 0
+    new_filenames = [
+        POOL_FILENAME_FORMAT.format(template_id=template_id, index=index)
+        for index in range(next_index, next_index + pool_size - len(pool_copies))
+    ]
+
+    def create_pool_copy(filename):
+        return copy_controller.call(
+            copy_file, gdrive_service, template_url, staging_folder_url, filename
+        )
+
+    # make the missing copies, several at a time
+    created_count = 0
+    for copied_file in concurrency.run_concurrently(
+        create_pool_copy, new_filenames, copy_controller.max_limit
+    ):
+        if copied_file is not None:
+            created_count += 1
+
+    print(copy_controller.summary())
+    print(
+        "Created {created} copies ({existing} already in pool, {failed} failed).".format(
+            created=created_count,
+            existing=len(pool_copies),
+            failed=len(new_filenames) - created_count,
+        )
+    )
+    return created_count
+
+
+def create_claim_requests(gdrive_service, claims, staging_folder_id, folder_id):
+    """
+    Creates a files.update request for each claim, which renames the pool copy and moves it out of the staging folder.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param claims: list of (student, filename, file dict) tuples.
+    :param staging_folder_id: string id of staging folder.
+    :param folder_id: string id of folder to move claimed copies to.
+    :return: list of (file id, HttpRequest) tuples for drive.execute_batched.
+    """
+    return [
+        (
+            pool_file["id"],
+            gdrive_service.files().update(
+                fileId=pool_file["id"],
+                body={"name": filename},
+                addParents=folder_id,
+                removeParents=staging_folder_id,
+                supportsAllDrives=True,
+                fields="id, name",
+            ),
+        )
+        for _, filename, pool_file in claims
+    ]
+
+
+def claim_pool(
+    gdrive_service,
+    template_url,
+    staging_folder_url,
+    folder_url,
+    student_list,
+    chunk_size=drive.MAX_BATCH_SIZE,
+):
+    """
+    Hands out an In-Class Activity to each student by claiming copies from the pool. Students are read in chunks, and
+    each chunk's copies are renamed and moved with one batched request. Students left over when the pool runs out, or
+    whose claim failed, get a fresh copy of the template instead.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param template_url: string url of In-Class Activity template the pool was copied from.
+    :param staging_folder_url: string url of folder the pool is kept in.
+    :param folder_url: string url of folder to move claimed copies to.
+    :param student_list: iterable of students to hand out activities to (see helpers/pipeline.py for item formats).
+    :param chunk_size: int number of students claimed per batched request.
+    :return: generator of result records (name, filename, file_id, url).
+    """
+    template_id = helpers.get_file_id_from_url(template_url)
+    staging_folder_id = helpers.get_folder_id_from_url(staging_folder_url)
+    folder_id = helpers.get_folder_id_from_url(folder_url)
+
+    # list the pool once, then hand out copies in order
+    pool_copies = iter(
+        pool_file
+        for _, pool_file in find_pool_copies(
+            gdrive_service, template_id, staging_folder_id
+        )
+    )
+    students = iter(student_list)
+    leftover_students = []
+
+    while True:
+        student_chunk = list(itertools.islice(students, chunk_size))
+        if not student_chunk:
+            break
+
+        # pair each student with a pool copy, until the pool runs out
+        claims = []
+        for student in student_chunk:
+            pool_file = next(pool_copies, None)
+            if pool_file is None:
+                leftover_students.append(student)
+                continue
+
+            student_name = pipeline.get_item_name(student)
+            claims.append(
+                (student_name, naming.activity_filename(student_name), pool_file)
+            )
+
+        # rename and move this chunk's copies together
+        with profiling.phase("claim"):
+            claimed_files, failed_claims = drive.execute_batched(
+                gdrive_service,
+                create_claim_requests(
+                    gdrive_service, claims, staging_folder_id, folder_id
+                ),
+                chunk_size=chunk_size,
+            )
+
+        for student_name, filename, pool_file in claims:
+            if pool_file["id"] in failed_claims:
+                print(
+                    "Could not claim {id} for {name}: {error}".format(
+                        id=pool_file["id"],
+                        name=student_name,
+                        error=failed_claims[pool_file["id"]],
+                    )
+                )
+                leftover_students.append(student_name)
+                continue
+
+            yield pipeline.create_result_record(
+                student_name,
+                filename,
+                claimed_files[pool_file["id"]],
+                create_activity_module.FILE_URL_FORMAT,
+            )
+
+    # copy the template as usual for anyone the pool could not cover
+    if leftover_students:
+        print(
+            "Pool could not cover {count} students, copying their activities instead.".format(
+                count=len(leftover_students)
+            )
+        )
+        yield from create_activity_module.generate_activity(
+            leftover_students, gdrive_service, template_url, folder_url
+        )
+
+
+def main(mode, template_file_url, staging_folder_url, mode_args):
+    """
+    Authenticates and either prewarms or claims from a pool of In-Class Activity copies.
+
+    :param mode: string "prewarm" or "claim".
+    :param template_file_url: string url of In-Class Activity template.
+    :param staging_folder_url: string url of folder the pool is kept in.
+    :param mode_args: for "prewarm", a list of [int pool size]. for "claim", a list of [string activity folder url,
+        iterable of students].
+    :return: for "prewarm", int number of copies created. for "claim", None.
+    """
+    # authenticate for Google Drive v3 API
+    gdrive_service = helpers.auth_gdrive()
+
+    if mode == "prewarm":
+        return prewarm_pool(
+            gdrive_service, template_file_url, staging_folder_url, mode_args[0]
+        )
+
+    # hand out activities, printing each as it is claimed
+    for record in claim_pool(
+        gdrive_service,
+        template_file_url,
+        staging_folder_url,
+        mode_args[0],
+        mode_args[1],
+    ):
+        print(pipeline.format_result_record(record))
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+    input_mode = sys.argv[1] if arg_count > 0 else None
+
+    # fill the pool before class
+    if input_mode == "prewarm":
+        if arg_count != 4:
+            raise Exception(
+                "Invalid number of arguments. Expected 4 "
+                "(prewarm, activity template URL, staging folder URL, Pool Size) got {}.".format(
+                    arg_count
+                )
+            )
+
+        input_mode_args = [int(sys.argv[4])]
+
+    # hand out activities from the pool in class
+    elif input_mode == "claim":
+        if arg_count != 5:
+            raise Exception(
+                "Invalid number of arguments. Expected 5 "
+                "(claim, activity template URL, staging folder URL, activity folder URL, "
+                "Student List as JSON, or - to read NDJSON from stdin) got {}.".format(
+                    arg_count
+                )
+            )
+
+        input_mode_args = [sys.argv[4], pipeline.parse_items_argument(sys.argv[5])]
+
+    else:
+        raise Exception(
+            "Invalid mode. Expected 'prewarm' or 'claim' got {}.".format(input_mode)
+        )
+
+    # inputs shared by both modes
+    input_template_file_url = sys.argv[2]
+    input_staging_folder_url = sys.argv[3]
+
+    with profiling.profile_run("activity_pool", should_profile):
+        main(
+            input_mode,
+            input_template_file_url,
+            input_staging_folder_url,
+            input_mode_args,
+        )
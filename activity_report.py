@@ -0,0 +1,272 @@
+"""
+This script is used to report which students and teams have not worked on their generated files recently (e.g.,
+teams that have not touched this week's Weekly Template, or students that have not edited their IPM).
+
+Every generated folder is listed together with a few paginated files.list calls, fetching only each file's name,
+modifiedTime, and lastModifyingUser, and files are joined to the Studio Roster by the generators' filename conventions.
+A file counts as touched if it was last modified after the given time by its student (or a member of its team).
+"""
+
+import sys
+from datetime import datetime, timezone
+import helpers.imports as helpers
+import helpers.drive as drive
+import helpers.naming as naming
+import helpers.profiling as profiling
+import roster_to_json as studio_db
+
+# fields fetched for each file
+ACTIVITY_FIELDS = "id, name, modifiedTime, lastModifyingUser(displayName, emailAddress)"
+
+
+def parse_timestamp(timestamp):
+    """
+    Parses an ISO 8601 timestamp (e.g., "2021-10-12" or Google Drive's "2021-10-12T18:22:11.123Z").
+    Timestamps without a timezone are treated as UTC.
+
+    :param timestamp: string ISO 8601 timestamp.
+    :return: timezone-aware datetime.
+    """
+    parsed = datetime.fromisoformat(timestamp.replace("Z", "+00:00"))
+
+    if parsed.tzinfo is None:
+        return parsed.replace(tzinfo=timezone.utc)
+
+    return parsed
+
+
+def list_generated_files(gdrive_service, folder_urls):
+    """
+    Lists every generated file in a set of folders, listing several folders per query.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folder_urls: list of string urls of folders with generated files.
+    :return: list of file dicts (with name, modifiedTime, lastModifyingUser, file_type, and owner).
+    """
+    folder_ids = [
+        helpers.get_folder_id_from_url(folder_url) for folder_url in folder_urls
+    ]
+
+    output = []
+    for curr_file in drive.list_files_in_folders(
+        gdrive_service, folder_ids, fields=ACTIVITY_FIELDS
+    ):
+        generated_file_type = naming.find_generated_file_type(curr_file["name"])
+        if generated_file_type is None:
+            continue
+
+        output.append(
+            dict(
+                curr_file,
+                file_type=generated_file_type[0],
+                owner=generated_file_type[1],
+            )
+        )
+
+    return output
+
+
+def find_owner_emails(studio_db_dict):
+    """
+    Creates a lookup from each owner in generated filenames to the email addresses of the students it belongs to.
+
+    :param studio_db_dict: dict containing all information for the studio database.
+    :return: dict of "student" and "team" to a dict of owner (student short name or team name) to set of emails.
+    """
+    output = {"student": {}, "team": {}}
+
+    for student_name, student_info in studio_db_dict.items():
+        # skip empty rows in the roster
+        if student_name == "":
+            continue
+
+        email_address = student_info["email_address"].lower()
+        output["student"].setdefault(
+            naming.student_short_name(student_name), set()
+        ).add(email_address)
+        if student_info["team_info"]["team_name"] != "":
+            output["team"].setdefault(
+                student_info["team_info"]["team_name"], set()
+            ).add(email_address)
+
+    return output
+
+
+def create_activity_report(generated_files, studio_db_dict, since, template_name):
+    """
+    Finds each owner's most recently modified file of each kind, and whether they have touched it since a time.
+    Only kinds of generated files that appear in the listed folders are reported.
+
+    :param generated_files: list of file dicts from list_generated_files.
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param since: timezone-aware datetime. files last modified by their owner after this are touched.
+    :param template_name: string name of weekly template to report on (e.g., "Week 05 Templates").
+    :return: dict of kind of generated file to list of row dicts (owner, status, file_name, modified_time,
+        last_modified_by), sorted by owner. status is "touched", "not touched", or "missing".
+    """
+    owner_emails = find_owner_emails(studio_db_dict)
+
+    # keep the most recently modified file for each owner, ignoring other weeks' templates
+    latest_files = {}
+    for curr_file in generated_files:
+        if curr_file["file_type"] == "weekly-template":
+            results = naming.GENERATED_FILE_PATTERNS["weekly-template"].match(
+                curr_file["name"]
+            )
+            if results.group("template_name") != template_name:
+                continue
+
+        file_key = (curr_file["file_type"], curr_file["owner"])
+        if (
+            file_key not in latest_files
+            or curr_file["modifiedTime"] > latest_files[file_key]["modifiedTime"]
+        ):
+            latest_files[file_key] = curr_file
+
+    output = {}
+    for file_type in sorted({file_type for file_type, _ in latest_files.keys()}):
+        rows = []
+
+        # every student or team in the roster is expected to have a file
+        for owner, emails in sorted(
+            owner_emails[naming.GENERATED_FILE_OWNERS[file_type]].items()
+        ):
+            curr_file = latest_files.get((file_type, owner))
+            if curr_file is None:
+                rows.append(
+                    {
+                        "owner": owner,
+                        "status": "missing",
+                        "file_name": "",
+                        "modified_time": "",
+                        "last_modified_by": "",
+                    }
+                )
+                continue
+
+            last_modifying_user = curr_file.get("lastModifyingUser", {})
+            touched = (
+                parse_timestamp(curr_file["modifiedTime"]) >= since
+                and last_modifying_user.get("emailAddress", "").lower() in emails
+            )
+            rows.append(
+                {
+                    "owner": owner,
+                    "status": "touched" if touched else "not touched",
+                    "file_name": curr_file["name"],
+                    "modified_time": curr_file["modifiedTime"],
+                    "last_modified_by": last_modifying_user.get("displayName", ""),
+                }
+            )
+
+        output[file_type] = rows
+
+    return output
+
+
+def print_activity_report(activity_report, since):
+    """
+    Prints the owners that have not touched their files for each kind of generated file.
+
+    :param activity_report: dict from create_activity_report.
+    :param since: timezone-aware datetime the report was created for.
+    :return: None
+    """
+    for file_type, rows in activity_report.items():
+        inactive_rows = [row for row in rows if row["status"] != "touched"]
+        print(
+            "{file_type}: {inactive} of {total} have not touched their file since {since}.".format(
+                file_type=file_type,
+                inactive=len(inactive_rows),
+                total=len(rows),
+                since=since.isoformat(),
+            )
+        )
+
+        for row in inactive_rows:
+            if row["status"] == "missing":
+                print("    {owner}: missing".format(owner=row["owner"]))
+            else:
+                print(
+                    "    {owner}: last modified {time} by {user}".format(
+                        owner=row["owner"],
+                        time=row["modified_time"],
+                        user=row["last_modified_by"] or "unknown",
+                    )
+                )
+
+
+def main(
+    since,
+    template_name,
+    roster_spreadsheet_url,
+    student_info_sheet_name,
+    team_info_sheet_name,
+    folder_urls,
+):
+    """
+    Fetches info from Studio Roster and the generated folders, and prints an activity report.
+
+    :param since: string ISO 8601 timestamp. files last modified by their owner after this are touched.
+    :param template_name: string name of weekly template to report on (e.g., "Week 05 Templates").
+    :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet.
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :param folder_urls: list of string urls of folders with generated files.
+    :return: dict from create_activity_report.
+    """
+    # authenticate for Google Drive v3 API
+    gdrive_service = helpers.auth_gdrive()
+
+    # generate studio database from roster
+    studio_db_dict = studio_db.main(
+        roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+    )
+
+    since_time = parse_timestamp(since)
+    activity_report = create_activity_report(
+        list_generated_files(gdrive_service, folder_urls),
+        studio_db_dict,
+        since_time,
+        template_name,
+    )
+    print_activity_report(activity_report, since_time)
+    return activity_report
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count < 6:
+        raise Exception(
+            "Invalid number of arguments. Expected at least 6 "
+            "(Since timestamp, Weekly Template name, Studio Roster URL, Student Info sheet name, "
+            "Team Info sheet name, one or more Generated Files folder URLs) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for the activity report
+    input_since = sys.argv[1]
+    input_template_name = sys.argv[2]
+    input_folder_urls = sys.argv[6:]
+
+    # inputs for generating studio database
+    input_studio_db_url = sys.argv[3]
+    input_student_info_sheet_name = sys.argv[4]
+    input_team_info_sheet_name = sys.argv[5]
+
+    with profiling.profile_run("activity_report", should_profile):
+        main(
+            input_since,
+            input_template_name,
+            input_studio_db_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+            input_folder_urls,
+        )
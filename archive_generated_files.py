@@ -0,0 +1,418 @@
+"""
+This script is used to archive every generated file (IPMs, self-assessments, Weekly Templates, etc.) in a set of
+folders to a local zip or tar file at the end of the quarter.
+
+Files are exported several at a time, and each export is streamed to a temporary file that is only held in memory
+while it is small, so memory use stays bounded no matter how many or how large the files are. Running the script
+again with the same archive resumes it, skipping files that were already archived.
+"""
+
+import os
+import re
+import shutil
+import sys
+import tarfile
+import tempfile
+import time
+import zipfile
+import helpers.imports as helpers
+import helpers.concurrency as concurrency
+import helpers.drive as drive
+import helpers.naming as naming
+import helpers.profiling as profiling
+
+# urls for exporting Google Docs, Sheets, and Slides, and for downloading any other file
+EXPORT_URL_FORMAT = "https://www.googleapis.com/drive/v3/files/{id}/export"
+DOWNLOAD_URL_FORMAT = "https://www.googleapis.com/drive/v3/files/{id}"
+
+# prefix of mime types for Google Docs, Sheets, and Slides, which have to be exported rather than downloaded
+GOOGLE_APPS_MIME_PREFIX = "application/vnd.google-apps."
+SPREADSHEET_MIME_TYPE = "application/vnd.google-apps.spreadsheet"
+
+# mime types and extensions for each export format. "xlsx" only applies to spreadsheets, other files are PDFs.
+PDF_EXPORT = ("application/pdf", "pdf")
+XLSX_EXPORT = (
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    "xlsx",
+)
+EXPORT_FORMATS = ("pdf", "xlsx")
+
+# exports larger than this are spooled to disk rather than held in memory
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# size of each chunk read from a download
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+def get_export_type(mime_type, export_format):
+    """
+    Chooses what a file is exported as.
+
+    :param mime_type: string mime type of file in Google Drive.
+    :param export_format: string "pdf" or "xlsx".
+    :return: tuple of (string export mime type, string file extension), or None if the file is downloaded as-is.
+    """
+    if not mime_type.startswith(GOOGLE_APPS_MIME_PREFIX):
+        return None
+
+    if export_format == "xlsx" and mime_type == SPREADSHEET_MIME_TYPE:
+        return XLSX_EXPORT
+
+    return PDF_EXPORT
+
+
+def create_member_name(folder_name, file_name, extension, file_id=None):
+    """
+    Creates the path of a file inside the archive, with one directory per archived folder.
+
+    :param folder_name: string name of the Google Drive folder the file is in.
+    :param file_name: string name of the file.
+    :param extension: string file extension (without the dot), or None to keep the name as-is.
+    :param file_id: optional string id of the file, added to the name to tell apart files with the same name.
+    :return: string archive member name.
+    """
+    # slashes would create extra directories in the archive
+    folder_name = re.sub(r"[\\/]", "-", folder_name)
+    file_name = re.sub(r"[\\/]", "-", file_name)
+
+    if file_id is not None:
+        file_name = "{file}-{id}".format(file=file_name, id=file_id)
+
+    if extension is None:
+        return "{folder}/{file}".format(folder=folder_name, file=file_name)
+
+    return "{folder}/{file}.{ext}".format(
+        folder=folder_name, file=file_name, ext=extension
+    )
+
+
+def find_archive_files(gdrive_service, folder_urls, export_format):
+    """
+    Lists the generated files in each folder, and decides where each one goes in the archive.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folder_urls: list of string urls of folders with generated files.
+    :param export_format: string "pdf" or "xlsx".
+    :return: list of dicts with each file's id, name, folder_name, extension, member_name, and export_mime_type (None
+        to download as-is).
+    """
+    output = []
+
+    for folder_url in folder_urls:
+        folder_id = helpers.get_folder_id_from_url(folder_url)
+        folder_name = (
+            gdrive_service.files()
+            .get(fileId=folder_id, fields="name", supportsAllDrives=True)
+            .execute()["name"]
+        )
+
+        for curr_file in drive.list_files(
+            gdrive_service, drive.folder_query(folder_id), fields="id, name, mimeType"
+        ):
+            # only archive files that follow a generator's naming convention
+            if naming.find_generated_file_type(curr_file["name"]) is None:
+                continue
+
+            export_type = get_export_type(curr_file["mimeType"], export_format)
+            output.append(
+                {
+                    "id": curr_file["id"],
+                    "name": curr_file["name"],
+                    "folder_name": folder_name,
+                    "extension": export_type[1] if export_type is not None else None,
+                    "export_mime_type": (
+                        export_type[0] if export_type is not None else None
+                    ),
+                }
+            )
+
+    add_member_names(output)
+    return output
+
+
+def add_member_names(archive_files):
+    """
+    Decides where each file goes in the archive. Files whose names would be the same (e.g., files with the same name
+    in folders with the same name, but different owners) have their file id added, so none are overwritten or skipped.
+
+    :param archive_files: list of dicts with each file's id, name, folder_name, and extension. a member_name is
+        added to each.
+    :return: None
+    """
+    member_names = [
+        create_member_name(
+            archive_file["folder_name"], archive_file["name"], archive_file["extension"]
+        )
+        for archive_file in archive_files
+    ]
+
+    # count each name, so only the duplicated ones are changed
+    name_counts = {}
+    for member_name in member_names:
+        name_counts[member_name] = name_counts.get(member_name, 0) + 1
+
+    for archive_file, member_name in zip(archive_files, member_names):
+        if name_counts[member_name] > 1:
+            member_name = create_member_name(
+                archive_file["folder_name"],
+                archive_file["name"],
+                archive_file["extension"],
+                archive_file["id"],
+            )
+        archive_file["member_name"] = member_name
+
+
+def export_file(session, archive_file):
+    """
+    Streams an export (or download) of a file into a temporary file.
+
+    :param session: google.auth AuthorizedSession.
+    :param archive_file: dict from find_archive_files.
+    :return: SpooledTemporaryFile with the exported file, positioned at the start. the caller must close it.
+    :raises requests.HTTPError: if the export failed.
+    """
+    if archive_file["export_mime_type"] is not None:
+        url = EXPORT_URL_FORMAT.format(id=archive_file["id"])
+        params = {"mimeType": archive_file["export_mime_type"]}
+    else:
+        url = DOWNLOAD_URL_FORMAT.format(id=archive_file["id"])
+        params = {"alt": "media", "supportsAllDrives": "true"}
+
+    with profiling.phase("export"):
+        with session.get(url, params=params, stream=True) as response:
+            response.raise_for_status()
+
+            output = tempfile.SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+            try:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK_SIZE):
+                    output.write(chunk)
+            except Exception:
+                output.close()
+                raise
+
+    output.seek(0)
+    return output
+
+
+def get_archive_kind(archive_path):
+    """
+    :param archive_path: string filepath of archive.
+    :return: string "zip" or "tar", based on the archive's extension.
+    """
+    if archive_path.lower().endswith(".zip"):
+        return "zip"
+
+    if archive_path.lower().endswith(".tar"):
+        return "tar"
+
+    # compressed tar files cannot be appended to, so they cannot be resumed
+    raise Exception(
+        "Invalid archive filepath. Expected a .zip or .tar file got {}.".format(
+            archive_path
+        )
+    )
+
+
+def recover_tar_archive(archive_path):
+    """
+    Truncates a partially-written tar archive to the end of its last complete member, so it can be appended to.
+
+    :param archive_path: string filepath of tar archive.
+    :return: set of string names of complete members.
+    """
+    archive_size = os.path.getsize(archive_path)
+    complete_end = 0
+    output = set()
+
+    try:
+        with tarfile.open(archive_path, "r:") as archive:
+            for member in archive:
+                # stop at a member whose data was cut off
+                if member.offset_data + member.size > archive_size:
+                    break
+
+                blocks = (member.size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+                complete_end = member.offset_data + blocks * tarfile.BLOCKSIZE
+                output.add(member.name)
+    except (tarfile.ReadError, EOFError):
+        # the archive ends partway through a header, so everything before it is kept
+        pass
+
+    # replace the partial member with the end-of-archive marker, which appending starts from
+    with open(archive_path, "r+b") as archive_file:
+        archive_file.truncate(complete_end)
+        archive_file.seek(complete_end)
+        archive_file.write(tarfile.NUL * tarfile.BLOCKSIZE * 2)
+
+    return output
+
+
+def open_archive(archive_path):
+    """
+    Opens an archive for appending, creating it if needed.
+
+    :param archive_path: string filepath of .zip or .tar archive.
+    :return: tuple of (open ZipFile or TarFile, set of string names of members already in the archive).
+    """
+    archive_exists = os.path.exists(archive_path)
+
+    if get_archive_kind(archive_path) == "tar":
+        archived_names = recover_tar_archive(archive_path) if archive_exists else set()
+        return tarfile.open(archive_path, "a"), archived_names
+
+    # zip archives are only readable once closed, so a zip from a run that was killed cannot be resumed
+    try:
+        archive = zipfile.ZipFile(
+            archive_path, "a", compression=zipfile.ZIP_DEFLATED, allowZip64=True
+        )
+    except zipfile.BadZipFile:
+        raise Exception(
+            "Could not resume {}: the archive was not closed cleanly. Use a .tar archive to resume "
+            "after a crash.".format(archive_path)
+        )
+
+    return archive, set(archive.namelist())
+
+
+def write_member(archive, member_name, content):
+    """
+    Copies a file into an archive in chunks.
+
+    :param archive: open ZipFile or TarFile from open_archive.
+    :param member_name: string name of member to add.
+    :param content: file object positioned at the start of the member's content.
+    :return: None
+    """
+    size = content.seek(0, os.SEEK_END)
+    content.seek(0)
+
+    if isinstance(archive, tarfile.TarFile):
+        member = tarfile.TarInfo(member_name)
+        member.size = size
+        member.mtime = time.time()
+        archive.addfile(member, content)
+    else:
+        with archive.open(
+            member_name, "w", force_zip64=size >= zipfile.ZIP64_LIMIT
+        ) as member:
+            shutil.copyfileobj(content, member, DOWNLOAD_CHUNK_SIZE)
+
+
+def archive_generated_files(
+    gdrive_service, session, folder_urls, archive_path, export_format
+):
+    """
+    Exports every generated file in a set of folders into a local archive, skipping files already archived.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param session: google.auth AuthorizedSession for streaming exports.
+    :param folder_urls: list of string urls of folders with generated files.
+    :param archive_path: string filepath of .zip or .tar archive to create or resume.
+    :param export_format: string "pdf" or "xlsx".
+    :return: list of dicts of files that could not be exported.
+    """
+    archive, archived_names = open_archive(archive_path)
+    export_controller = concurrency.AdaptiveConcurrencyController("export")
+    failed_files = []
+    archived_count = 0
+
+    def export(archive_file):
+        try:
+            return archive_file, export_controller.call(
+                export_file, session, archive_file
+            )
+        except Exception as error:
+            print("Could not export {}: {}".format(archive_file["name"], error))
+            return archive_file, None
+
+    try:
+        archive_files = find_archive_files(gdrive_service, folder_urls, export_format)
+        pending_files = [
+            archive_file
+            for archive_file in archive_files
+            if archive_file["member_name"] not in archived_names
+        ]
+        print(
+            "Archiving {pending} files ({skipped} already archived).".format(
+                pending=len(pending_files),
+                skipped=len(archive_files) - len(pending_files),
+            )
+        )
+
+        # export several files at a time, but write them to the archive one at a time from this thread
+        for archive_file, content in concurrency.run_concurrently(
+            export, pending_files, export_controller.max_limit
+        ):
+            if content is None:
+                failed_files.append(archive_file)
+                continue
+
+            try:
+                write_member(archive, archive_file["member_name"], content)
+            finally:
+                content.close()
+
+            archived_count += 1
+            print("Archived {}".format(archive_file["member_name"]))
+    finally:
+        archive.close()
+
+    print(export_controller.summary())
+    print(
+        "Archived {archived} files to {path} ({failed} failed).".format(
+            archived=archived_count, path=archive_path, failed=len(failed_files)
+        )
+    )
+    return failed_files
+
+
+def main(archive_path, export_format, folder_urls):
+    """
+    Authenticates and archives every generated file in the given folders.
+
+    :param archive_path: string filepath of .zip or .tar archive to create or resume.
+    :param export_format: string "pdf" or "xlsx".
+    :param folder_urls: list of string urls of folders with generated files.
+    :return: list of dicts of files that could not be exported.
+    """
+    # authenticate for Google Drive v3 API, and share its credentials for streaming exports
+    gdrive_service = helpers.auth_gdrive()
+    session = helpers.create_authorized_session(helpers.get_user_credentials())
+
+    return archive_generated_files(
+        gdrive_service, session, folder_urls, archive_path, export_format
+    )
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count < 3:
+        raise Exception(
+            "Invalid number of arguments. Expected at least 3 "
+            "(Archive filepath, Export Format, one or more Generated Files folder URLs) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for archiving generated files
+    input_archive_path = sys.argv[1]
+    input_export_format = sys.argv[2]
+    input_folder_urls = sys.argv[3:]
+
+    # check for a known export format and archive type
+    if input_export_format not in EXPORT_FORMATS:
+        raise Exception(
+            "Invalid Export Format. Expected one of {} got {}.".format(
+                list(EXPORT_FORMATS), input_export_format
+            )
+        )
+    get_archive_kind(input_archive_path)
+
+    with profiling.profile_run("archive_generated_files", should_profile):
+        main(input_archive_path, input_export_format, input_folder_urls)
@@ -0,0 +1,167 @@
+"""
+This script is used to assign each student to a Mysore session, using the availability parsed from the Studio Roster
+and a capacity for each session, and to export the Studio Database with each student's "mysore_session".
+
+As many students as possible are assigned to a session they are available for (see helpers/mysore_sessions.py).
+Students that cannot be assigned without going over a session's capacity are listed, and their "mysore_session" is
+left empty.
+"""
+
+import json
+import sys
+import helpers.profiling as profiling
+import helpers.mysore_sessions as mysore_sessions
+import helpers.studio_db_sqlite as studio_db_sqlite
+import roster_to_json as studio_db
+
+
+def parse_capacities(capacities, studio_db_dict):
+    """
+    Parses session capacities, given as a JSON object of session name to capacity, or a single capacity for every
+    session any student is available for.
+
+    :param capacities: string JSON object (e.g., '{"Mon 10am": 12}') or integer (e.g., "12").
+    :param studio_db_dict: dict containing all information for the studio database.
+    :return: dict of session name to int capacity.
+    """
+    parsed_capacities = json.loads(capacities)
+    if isinstance(parsed_capacities, dict):
+        return parsed_capacities
+
+    return {
+        session: parsed_capacities
+        for student_info in studio_db_dict.values()
+        for session in student_info["mysore_availability"]
+    }
+
+
+def assign_mysore_sessions(studio_db_dict, capacities):
+    """
+    Assigns students to Mysore sessions, and stores each student's session in the studio database.
+
+    :param studio_db_dict: dict containing all information for the studio database. updated in place.
+    :param capacities: dict of session name to int capacity.
+    :return: dict of student name to string session name, or None if the student could not be assigned.
+    """
+    # skip empty rows in the roster
+    availability = {
+        student_name: student_info["mysore_availability"]
+        for student_name, student_info in studio_db_dict.items()
+        if student_name != ""
+    }
+
+    with profiling.phase("assign"):
+        assignments = mysore_sessions.assign_sessions(availability, capacities)
+
+    for student_name, session in assignments.items():
+        studio_db_dict[student_name]["mysore_session"] = (
+            session if session is not None else ""
+        )
+
+    return assignments
+
+
+def print_assignments(assignments, capacities):
+    """
+    Prints how full each session is, and any students that could not be assigned.
+
+    :param assignments: dict from assign_mysore_sessions.
+    :param capacities: dict of session name to int capacity.
+    :return: None
+    """
+    session_counts = {session: 0 for session in capacities}
+    for session in assignments.values():
+        if session is not None:
+            session_counts[session] += 1
+
+    for session, count in session_counts.items():
+        print(
+            "{session}: {count} of {capacity}".format(
+                session=session, count=count, capacity=capacities[session]
+            )
+        )
+
+    unassigned = sorted(
+        student_name for student_name, session in assignments.items() if session is None
+    )
+    print(
+        "Assigned {assigned} of {total} students.".format(
+            assigned=len(assignments) - len(unassigned), total=len(assignments)
+        )
+    )
+    if len(unassigned) > 0:
+        print("Could not assign: {}".format("; ".join(unassigned)))
+
+
+def main(
+    spreadsheet_url,
+    student_info_sheet_name,
+    team_info_sheet_name,
+    capacities,
+    output_file,
+):
+    """
+    Fetches the Studio Database, assigns Mysore sessions, and exports it with each student's session.
+
+    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio Database).
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :param capacities: string JSON object of session name to capacity, or a single capacity for every session.
+    :param output_file: string filepath to output the Studio Database to, as SQLite or json depending on extension.
+    :return: dict from assign_mysore_sessions.
+    """
+    studio_db_dict, team_info_dict = studio_db.fetch_studio_db(
+        spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+    )
+
+    parsed_capacities = parse_capacities(capacities, studio_db_dict)
+    assignments = assign_mysore_sessions(studio_db_dict, parsed_capacities)
+    print_assignments(assignments, parsed_capacities)
+
+    # export as SQLite or json, depending on the output file's extension
+    with profiling.phase("export"):
+        if studio_db_sqlite.is_sqlite_path(output_file):
+            studio_db.export_studio_db_as_sqlite(
+                studio_db_dict, output_file, team_info_dict
+            )
+        else:
+            studio_db.export_studio_db_as_json(studio_db_dict, output_file)
+
+    print("Studio Database with Mysore sessions exported to {}".format(output_file))
+    return assignments
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count != 5:
+        raise Exception(
+            "Invalid number of arguments. Expected 5 "
+            "(Studio Roster URL, Student Info sheet name, Team Info sheet name, "
+            "Session Capacities as JSON or a single capacity, Output filepath) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for generating studio database
+    input_spreadsheet_url = sys.argv[1]
+    input_student_info_sheet_name = sys.argv[2]
+    input_team_info_sheet_name = sys.argv[3]
+
+    # inputs for assigning sessions
+    input_capacities = sys.argv[4]
+    input_output_file = sys.argv[5]
+
+    with profiling.profile_run("assign_mysore_sessions", should_profile):
+        main(
+            input_spreadsheet_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+            input_capacities,
+            input_output_file,
+        )
@@ -0,0 +1,374 @@
+"""
+This script benchmarks the CPU and memory cost of parsing the Studio Roster, using synthetic rosters served by stub
+worksheet objects (no network access needed). Results can be saved as a baseline, and later runs can be checked
+against that baseline to catch performance regressions.
+"""
+
+import collections
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# benchmarks live one folder below the scripts they benchmark
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import roster_to_json as studio_db
+from gspread.utils import a1_to_rowcol
+
+# synthetic roster sizes to benchmark
+ROW_COUNTS = [100, 1000, 10000, 100000]
+
+# fetch_team_info only parses "Week 01 Templates" through "Week 09 Templates", so rosters never have more columns
+WEEK_COUNTS = [1, 5, 9]
+
+# smaller rosters are timed more than once, and the best time is kept
+REPEATS_SMALL = 5
+REPEATS_LARGE = 1
+LARGE_ROW_COUNT = 10000
+
+# a benchmark fails the regression check if it is slower (or uses more memory) than the baseline by these ratios.
+# very fast benchmarks are noisy, so they must also be slower by MIN_TIME_DIFFERENCE seconds.
+TIME_TOLERANCE = 0.5
+MEMORY_TOLERANCE = 0.25
+MIN_TIME_DIFFERENCE = 0.005
+
+# baseline results are stored next to this script
+BASELINE_FILEPATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baseline.json"
+)
+
+
+class StubWorksheet:
+    """
+    Stands in for a gspread worksheet, serving values from memory.
+    """
+
+    def __init__(self, values):
+        """
+        :param values: list of rows (lists of strings), including the header row.
+        """
+        self.values = values
+        self.row_count = len(values)
+
+    def get_all_values(self):
+        """
+        :return: list of rows (lists of strings), including the header row.
+        """
+        return self.values
+
+    def row_values(self, row):
+        """
+        :param row: int row number (starting at 1).
+        :return: list of strings in row.
+        """
+        return self.values[row - 1]
+
+    def get(self, range_name):
+        """
+        :param range_name: string A1 range of whole rows (e.g., "2:1001") or a single column (e.g., "A2:A1001").
+        :return: list of rows (lists of strings) in range.
+        """
+        start, end = range_name.split(":")
+
+        # whole rows
+        if start.isdigit():
+            return self.values[int(start) - 1 : int(end)]
+
+        # single column
+        start_row, column = a1_to_rowcol(start)
+        end_row, _ = a1_to_rowcol(end)
+        return [[row[column - 1]] for row in self.values[start_row - 1 : end_row]]
+
+    def batch_get(self, range_names):
+        """
+        :param range_names: list of string A1 ranges.
+        :return: list of values for each range.
+        """
+        return [self.get(range_name) for range_name in range_names]
+
+
+class StubSpreadsheet:
+    """
+    Stands in for a gspread spreadsheet, serving stub worksheets by name.
+    """
+
+    def __init__(self, worksheets):
+        """
+        :param worksheets: dict of sheet name to StubWorksheet.
+        """
+        self.worksheets = worksheets
+
+    def worksheet(self, sheet_name):
+        """
+        :param sheet_name: string name of worksheet.
+        :return: StubWorksheet.
+        """
+        return self.worksheets[sheet_name]
+
+
+def create_synthetic_roster(row_count, week_count):
+    """
+    Creates a synthetic Studio Roster with one team for every five students.
+
+    :param row_count: int number of students.
+    :param week_count: int number of "Week NN Templates" columns on the Team Info sheet.
+    :return: StubSpreadsheet with "Student Info" and "Team Info" worksheets.
+    """
+    team_count = max(1, row_count // 5)
+    team_names = ["Team {:05d}".format(index) for index in range(team_count)]
+
+    # student info sheet
+    student_values = [
+        [
+            "Full Name",
+            "Email",
+            "Team Name",
+            "Learning Goals",
+            "Individual Progress Map",
+            "Self-Assessment",
+        ]
+    ]
+    for index in range(row_count):
+        student_values.append(
+            [
+                "Student{index} Last{index}".format(index=index),
+                "student{index}@u.northwestern.edu".format(index=index),
+                team_names[index % team_count],
+                "Learn to scope research problems, and to work with peers.",
+                "https://docs.google.com/spreadsheets/d/ipm{index}/edit".format(
+                    index=index
+                ),
+                "",
+            ]
+        )
+
+    # team info sheet
+    week_names = [
+        "Week {:02d} Templates".format(week) for week in range(1, week_count + 1)
+    ]
+    team_values = [["Team Name"] + week_names + ["Final Presentation"]]
+    for team_name in team_names:
+        team_values.append(
+            [team_name]
+            + [
+                "https://docs.google.com/presentation/d/{team}-{week}/edit".format(
+                    team=team_name.replace(" ", ""), week=week
+                )
+                for week in range(1, week_count + 1)
+            ]
+            + [""]
+        )
+
+    return StubSpreadsheet(
+        {
+            "Student Info": StubWorksheet(student_values),
+            "Team Info": StubWorksheet(team_values),
+        }
+    )
+
+
+def create_benchmarks(row_count, week_count, output_dir):
+    """
+    Creates a benchmark for each step of the roster pipeline. Inputs for later steps are prepared ahead of time, so
+    each benchmark only measures its own step.
+
+    :param row_count: int number of students in synthetic roster.
+    :param week_count: int number of weekly template columns in synthetic roster.
+    :param output_dir: string directory to export json to.
+    :return: dict of function name to zero-argument function that runs it.
+    """
+    spreadsheet = create_synthetic_roster(row_count, week_count)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        student_info = studio_db.fetch_student_info(spreadsheet, "Student Info")
+        team_info = studio_db.fetch_team_info(spreadsheet, "Team Info")
+        team_members = studio_db.fetch_team_members(spreadsheet, "Student Info")
+        studio_db_dict = studio_db.create_studio_db_dict(student_info, team_info)
+
+    def stream_studio_db_to_json():
+        studio_db.export_studio_db_records_as_json(
+            studio_db.iter_studio_db(
+                studio_db.iter_student_info(spreadsheet, "Student Info"),
+                team_info,
+                team_members,
+            ),
+            os.path.join(output_dir, "hci_studio_db_streamed.json"),
+        )
+
+    return {
+        "fetch_student_info": lambda: studio_db.fetch_student_info(
+            spreadsheet, "Student Info"
+        ),
+        "fetch_team_info": lambda: studio_db.fetch_team_info(spreadsheet, "Team Info"),
+        "create_studio_db_dict": lambda: studio_db.create_studio_db_dict(
+            student_info, team_info
+        ),
+        "export_studio_db_as_json": lambda: studio_db.export_studio_db_as_json(
+            studio_db_dict, os.path.join(output_dir, "hci_studio_db.json")
+        ),
+        "iter_student_info": lambda: collections.deque(
+            studio_db.iter_student_info(spreadsheet, "Student Info"), maxlen=0
+        ),
+        "stream_studio_db_to_json": stream_studio_db_to_json,
+    }
+
+
+def measure(benchmark, repeats):
+    """
+    Measures the best wall time and the peak memory allocated by a benchmark.
+
+    :param benchmark: zero-argument function to measure.
+    :param repeats: int number of times to time the benchmark.
+    :return: dict with seconds (best time) and peak_bytes.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        # time without tracing memory, since tracemalloc slows down allocations
+        best_time = None
+        for _ in range(repeats):
+            start_time = time.perf_counter()
+            benchmark()
+            elapsed_time = time.perf_counter() - start_time
+            best_time = (
+                elapsed_time if best_time is None else min(best_time, elapsed_time)
+            )
+
+        # measure peak memory in a separate run
+        tracemalloc.start()
+        benchmark()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {"seconds": best_time, "peak_bytes": peak_bytes}
+
+
+def run_benchmarks(row_counts=ROW_COUNTS, week_counts=WEEK_COUNTS):
+    """
+    Runs every benchmark for every synthetic roster size, printing results as they finish.
+
+    :param row_counts: list of int numbers of students.
+    :param week_counts: list of int numbers of weekly template columns.
+    :return: dict of benchmark key (e.g., "fetch_student_info/rows=100/weeks=1") to result dict.
+    """
+    output = {}
+
+    with tempfile.TemporaryDirectory() as output_dir:
+        for row_count in row_counts:
+            for week_count in week_counts:
+                benchmarks = create_benchmarks(row_count, week_count, output_dir)
+                repeats = (
+                    REPEATS_LARGE if row_count >= LARGE_ROW_COUNT else REPEATS_SMALL
+                )
+
+                for function_name, benchmark in benchmarks.items():
+                    key = "{function}/rows={rows}/weeks={weeks}".format(
+                        function=function_name, rows=row_count, weeks=week_count
+                    )
+                    output[key] = measure(benchmark, repeats)
+                    print(
+                        "{key}: {seconds:.4f}s, {peak:.1f} MiB peak".format(
+                            key=key,
+                            seconds=output[key]["seconds"],
+                            peak=output[key]["peak_bytes"] / 2**20,
+                        )
+                    )
+
+    return output
+
+
+def find_regressions(results, baseline):
+    """
+    Compares benchmark results against a baseline.
+
+    :param results: dict of benchmark key to result dict from run_benchmarks.
+    :param baseline: dict of benchmark key to result dict from a previous run.
+    :return: list of string descriptions of each regression.
+    """
+    output = []
+
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+
+        baseline_seconds = baseline[key]["seconds"]
+        if (
+            result["seconds"] > baseline_seconds * (1 + TIME_TOLERANCE)
+            and result["seconds"] - baseline_seconds > MIN_TIME_DIFFERENCE
+        ):
+            output.append(
+                "{key}: {seconds:.4f}s vs. {baseline:.4f}s baseline".format(
+                    key=key, seconds=result["seconds"], baseline=baseline_seconds
+                )
+            )
+
+        baseline_bytes = baseline[key]["peak_bytes"]
+        if result["peak_bytes"] > baseline_bytes * (1 + MEMORY_TOLERANCE):
+            output.append(
+                "{key}: {peak:.1f} MiB vs. {baseline:.1f} MiB baseline".format(
+                    key=key,
+                    peak=result["peak_bytes"] / 2**20,
+                    baseline=baseline_bytes / 2**20,
+                )
+            )
+
+    return output
+
+
+if __name__ == "__main__":
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count not in (1, 2):
+        raise Exception(
+            "Invalid number of arguments. Expected 1 or 2 "
+            "(Mode, optional Max Row Count) got {}.".format(arg_count)
+        )
+
+    # inputs for running benchmarks
+    input_mode = sys.argv[1]
+    input_max_row_count = int(sys.argv[2]) if arg_count == 2 else max(ROW_COUNTS)
+
+    if input_mode not in ("run", "save", "check"):
+        raise Exception(
+            "Invalid mode. Expected 'run', 'save', or 'check' got {}.".format(
+                input_mode
+            )
+        )
+
+    # run benchmarks
+    benchmark_results = run_benchmarks(
+        [row_count for row_count in ROW_COUNTS if row_count <= input_max_row_count]
+    )
+
+    # save results as the new baseline
+    if input_mode == "save":
+        with open(BASELINE_FILEPATH, "w") as outfile:
+            json.dump(benchmark_results, outfile, indent=4, sort_keys=True)
+        print("Baseline saved to {}".format(BASELINE_FILEPATH))
+
+    # compare results against the saved baseline, failing on any regression
+    elif input_mode == "check":
+        # baselines are machine-specific, so they are not committed
+        if not os.path.exists(BASELINE_FILEPATH):
+            raise Exception(
+                "No baseline found at {}. Run save first (on this machine, before making changes).".format(
+                    BASELINE_FILEPATH
+                )
+            )
+
+        with open(BASELINE_FILEPATH, "r") as infile:
+            baseline_results = json.load(infile)
+
+        regressions = find_regressions(benchmark_results, baseline_results)
+        for regression in regressions:
+            print("Regression in {}".format(regression))
+
+        if len(regressions) > 0:
+            sys.exit(1)
+
+        print("No regressions against {}".format(BASELINE_FILEPATH))
@@ -0,0 +1,275 @@
+"""
+This script is used to clean up stray copies left behind by failed or repeated runs of the generator scripts. It can
+either find duplicate and orphaned generated files in a folder, or trash every file that a journaled run created.
+"""
+
+import sys
+import helpers.imports as helpers
+import helpers.drive as drive
+import helpers.journal as journal
+import helpers.naming as naming
+import roster_to_json as studio_db
+
+
+def find_duplicates_and_orphans(
+    folder_files, file_type, studio_db_dict, template_name=None
+):
+    """
+    Groups generated files by name to find duplicates, and finds files that match no student or team in the roster.
+
+    :param folder_files: list of file dicts (with id, name, and modifiedTime) from a single folder.
+    :param file_type: string kind of generated file (e.g., "ipm", "weekly-template").
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param template_name: string name of weekly template to clean up. required for "weekly-template", since any
+        "[X] Y" filename matches the Weekly Template convention.
+    :return: tuple of (list of duplicate file dicts, list of orphaned file dicts).
+    :raises Exception: if file_type is "weekly-template" and no template_name is given.
+    """
+    if file_type == "weekly-template" and template_name is None:
+        raise Exception("Weekly Template cleanup needs a Template Name.")
+
+    # find every owner that generated files could belong to
+    if naming.GENERATED_FILE_OWNERS[file_type] == "team":
+        known_owners = {
+            student_info["team_info"]["team_name"]
+            for student_info in studio_db_dict.values()
+        }
+    else:
+        known_owners = set(
+            naming.index_students_by_short_name(studio_db_dict.keys()).keys()
+        )
+
+    # group generated files by name, setting aside any that belong to no one in the roster
+    orphans = []
+    files_by_name = {}
+    for curr_file in folder_files:
+        curr_owner = naming.match_generated_filename(curr_file["name"], file_type)
+
+        # only clean up copies of the given weekly template, not other team-prefixed files
+        if curr_owner is None or (
+            template_name is not None
+            and curr_file["name"]
+            != naming.weekly_template_filename(curr_owner, template_name)
+        ):
+            continue
+        elif curr_owner not in known_owners:
+            orphans.append(curr_file)
+        else:
+            files_by_name.setdefault(curr_file["name"], []).append(curr_file)
+
+    # keep the most recently modified copy of each file, since that is the one students are likely working in
+    duplicates = []
+    for curr_files in files_by_name.values():
+        curr_files.sort(key=lambda curr_file: curr_file["modifiedTime"], reverse=True)
+        duplicates.extend(curr_files[1:])
+
+    return duplicates, orphans
+
+
+def trash_files(gdrive_service, file_list):
+    """
+    Moves files to the trash using batched requests.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param file_list: list of file dicts (with id) to trash.
+    :return: tuple of (dict of file id to response, dict of file id to error).
+    """
+    trash_requests = [
+        (
+            curr_file["id"],
+            gdrive_service.files().update(
+                fileId=curr_file["id"],
+                body={"trashed": True},
+                supportsAllDrives=True,
+                fields="id",
+            ),
+        )
+        for curr_file in file_list
+    ]
+
+    return drive.execute_batched(gdrive_service, trash_requests)
+
+
+def cleanup_folder(
+    gdrive_service,
+    studio_db_dict,
+    folder_url,
+    file_type,
+    dry_run,
+    trash_orphans=False,
+    template_name=None,
+):
+    """
+    Trashes duplicate generated files in a folder, and orphaned generated files if asked to.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param folder_url: string url of folder that generated files were copied to.
+    :param file_type: string kind of generated file (e.g., "ipm", "weekly-template").
+    :param dry_run: boolean whether to only print what would be trashed.
+    :param trash_orphans: boolean whether to trash orphans too. otherwise they are only listed.
+    :param template_name: string name of weekly template to clean up. required for "weekly-template".
+    :return: list of file dicts that were (or would be) trashed.
+    """
+    # list the folder once
+    folder_id = helpers.get_folder_id_from_url(folder_url)
+    folder_files = drive.list_files(
+        gdrive_service,
+        drive.folder_query(folder_id),
+        fields="id, name, modifiedTime",
+    )
+
+    # find files to trash
+    duplicates, orphans = find_duplicates_and_orphans(
+        folder_files, file_type, studio_db_dict, template_name
+    )
+
+    # orphans may belong to someone who was renamed or left the roster, so only list them unless asked
+    if not trash_orphans:
+        for curr_file in orphans:
+            print(
+                "Skipping {filename} ({id}): orphan. Pass true for Trash Orphans to trash it.".format(
+                    filename=curr_file["name"], id=curr_file["id"]
+                )
+            )
+        orphans = []
+
+    for reason, file_list in (("duplicate", duplicates), ("orphan", orphans)):
+        for curr_file in file_list:
+            print(
+                "{action} {filename} ({id}): {reason}".format(
+                    action="Would trash" if dry_run else "Trashing",
+                    filename=curr_file["name"],
+                    id=curr_file["id"],
+                    reason=reason,
+                )
+            )
+
+    # trash files
+    to_trash = duplicates + orphans
+    if not dry_run:
+        report_trash_results(*trash_files(gdrive_service, to_trash))
+
+    return to_trash
+
+
+def cleanup_journal(gdrive_service, journal_path, dry_run):
+    """
+    Trashes every file that a journaled run created.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param journal_path: string filepath of the run's journal.
+    :param dry_run: boolean whether to only print what would be trashed.
+    :return: list of journal records that were (or would be) trashed.
+    """
+    # a file can be journaled more than once if a run was retried, so only trash it once
+    to_trash = list(
+        {record["id"]: record for record in journal.read_journal(journal_path)}.values()
+    )
+
+    for record in to_trash:
+        print(
+            "{action} {filename} ({id})".format(
+                action="Would trash" if dry_run else "Trashing",
+                filename=record["name"],
+                id=record["id"],
+            )
+        )
+
+    if not dry_run:
+        report_trash_results(*trash_files(gdrive_service, to_trash))
+
+    return to_trash
+
+
+def report_trash_results(trashed_files, failed_files):
+    """
+    Prints any files that could not be trashed, and a summary.
+
+    :param trashed_files: dict of file id to response for trashed files.
+    :param failed_files: dict of file id to error for files that could not be trashed.
+    :return: None
+    """
+    for file_id, error in failed_files.items():
+        print("Could not trash {id}: {error}".format(id=file_id, error=error))
+
+    print(
+        "Trashed {trashed} files ({failed} failed).".format(
+            trashed=len(trashed_files), failed=len(failed_files)
+        )
+    )
+
+
+if __name__ == "__main__":
+    # get command line args
+    arg_count = len(sys.argv) - 1
+    input_mode = sys.argv[1] if arg_count > 0 else None
+
+    # clean up everything a journaled run created
+    if input_mode == "journal":
+        if arg_count != 3:
+            raise Exception(
+                "Invalid number of arguments. Expected 3 "
+                "(journal, Journal filepath, Dry Run (boolean)) got {}.".format(
+                    arg_count
+                )
+            )
+
+        # inputs for cleaning up a journaled run
+        input_journal_path = sys.argv[2]
+        input_dry_run = True if sys.argv[3] == "true" else False
+
+        cleanup_journal(helpers.auth_gdrive(), input_journal_path, input_dry_run)
+
+    # clean up duplicates and orphans in a folder
+    elif input_mode == "folder":
+        if arg_count not in (7, 8, 9):
+            raise Exception(
+                "Invalid number of arguments. Expected 7 to 9 "
+                "(folder, File Type, Generated Files folder URL, Dry Run (boolean), "
+                "Studio Roster URL, Student Info sheet name, Team Info sheet name, "
+                "optional Trash Orphans (boolean), Template Name for Weekly Templates) got {}.".format(
+                    arg_count
+                )
+            )
+
+        # inputs for cleaning up a folder
+        input_file_type = sys.argv[2]
+        input_folder_url = sys.argv[3]
+        input_dry_run = True if sys.argv[4] == "true" else False
+        input_trash_orphans = True if arg_count > 7 and sys.argv[8] == "true" else False
+        input_template_name = sys.argv[9] if arg_count == 9 else None
+
+        # inputs for generating studio database
+        input_studio_db_url = sys.argv[5]
+        input_student_info_sheet_name = sys.argv[6]
+        input_team_info_sheet_name = sys.argv[7]
+
+        # check for a known file type
+        if input_file_type not in naming.GENERATED_FILE_PATTERNS:
+            raise Exception(
+                "Invalid File Type. Expected one of {} got {}.".format(
+                    list(naming.GENERATED_FILE_PATTERNS.keys()), input_file_type
+                )
+            )
+        if input_file_type == "weekly-template" and input_template_name is None:
+            raise Exception("Weekly Template cleanup needs a Template Name.")
+
+        cleanup_folder(
+            helpers.auth_gdrive(),
+            studio_db.main(
+                input_studio_db_url,
+                input_student_info_sheet_name,
+                input_team_info_sheet_name,
+            ),
+            input_folder_url,
+            input_file_type,
+            input_dry_run,
+            input_trash_orphans,
+            input_template_name,
+        )
+
+    else:
+        raise Exception(
+            "Invalid mode. Expected 'folder' or 'journal' got {}.".format(input_mode)
+        )
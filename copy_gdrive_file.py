@@ -1,8 +1,12 @@
 """
 This script is used to copy a specified template file to a specified destination folder in Google Drive.
 """
+
 import sys
 import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.drive as drive
+import helpers.journal as journal
 from apiclient import errors
 
 
@@ -15,18 +19,26 @@ def copy_file_request(service, origin_file_id, file_parent_id, file_name):
     :param file_parent_id: string id of folder to copy file to.
     :param file_name: string name for newly copied file.
     :return: copied file, if successful. none otherwise.
+    :raises HttpError: if the copy was rate limited, so callers can back off and retry.
     """
     # setup request body
     copy_request_body = {"name": file_name, "parents": [file_parent_id]}
 
-    # attempt to copy file
+    # attempt to copy file, and record it in the run's journal (if enabled)
     try:
-        return (
-            service.files()
-            .copy(fileId=origin_file_id, body=copy_request_body)
-            .execute()
-        )
+        with profiling.phase("copy"):
+            copied_file = (
+                service.files()
+                .copy(fileId=origin_file_id, body=copy_request_body)
+                .execute()
+            )
+        journal.record_created_file(copied_file["id"], file_name, file_parent_id)
+        return copied_file
     except errors.HttpError as error:
+        # let callers back off and retry rate limited copies
+        if drive.is_retryable_error(error):
+            raise
+
         print("An error occurred: {}".format(error))
 
     # return none if file copy failed
@@ -67,6 +79,9 @@ def main(file_url, folder_url, file_name):
 
 
 if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
     # get command line args
     arg_count = len(sys.argv) - 1
 
@@ -84,4 +99,5 @@ if __name__ == "__main__":
     input_file_name = sys.argv[3]
 
     # copy file to destination
-    main(input_file_url, input_folder_url, input_file_name)
+    with profiling.profile_run("copy_gdrive_file", should_profile):
+        main(input_file_url, input_folder_url, input_file_name)
@@ -4,77 +4,133 @@ output directory and a list of student names.
 """
 
 import sys
-import json
 import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import helpers.naming as naming
+import helpers.pipeline as pipeline
+import roster_to_json as studio_db
 from copy_gdrive_file import copy_file
 
+# url of a generated file, given its id
+FILE_URL_FORMAT = "https://docs.google.com/presentation/d/{id}/edit"
 
-def generate_activity(student_list, gdrive_service, template_url, folder_url):
+
+def generate_activity(
+    student_list, gdrive_service, template_url, folder_url, copy_controller=None
+):
     """
-    Generates an In-Class Activity for each student.
+    Generates an In-Class Activity for each student. Several copies are made at once, with the number in flight
+    adjusted by copy_controller.
+    Students are read from student_list as copies are made, so it can be a lazily-read stream (e.g., NDJSON on
+    stdin, or a roster from roster_to_json.iter_student_info).
 
-    :param student_list: list of students names to generate activity for.
+    :param student_list: iterable of students to generate activity for (see helpers/pipeline.py for item formats).
     :param gdrive_service: Google Drive v3 authentication object.
     :param template_url: string url of original file to copy.
     :param folder_url: string url of folder to copy file to.
-    :return: None
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :return: generator of result records (name, filename, file_id, url), in the order copies finish.
     """
-    # iterate over student list and create an activity for each student
-    for student in student_list:
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+
+    def create_activity(student):
+        student_name = pipeline.get_item_name(student)
+
         # generate a filename using the student's first name and last initial
-        student_name_split = student.split(" ")
-        student_filename = (
-            "[{first} {lasti}.] Steve Jobs iPhone Activity -- Design Argument".format(
-                first=student_name_split[0], lasti=student_name_split[-1][0]
-            )
-        )
+        student_filename = naming.activity_filename(student_name)
 
         # copy original file for each project using student_filename
-        curr_copied_file = copy_file(
-            gdrive_service, template_url, folder_url, student_filename
+        curr_copied_file = copy_controller.call(
+            copy_file,
+            gdrive_service,
+            template_url,
+            pipeline.get_item_folder_url(student, folder_url),
+            student_filename,
         )
-
-        # generate a file URL for copied file, and print out
-        curr_file_id = curr_copied_file["id"]
-        print(
-            "{filename}: https://docs.google.com/presentation/d/{id}/edit".format(
-                filename=student_filename, id=curr_file_id
-            )
+        return pipeline.create_result_record(
+            student_name, student_filename, curr_copied_file, FILE_URL_FORMAT
         )
 
+    # create an activity for each student, several at a time
+    yield from concurrency.run_concurrently(
+        create_activity, student_list, copy_controller.max_limit
+    )
 
-def main(template_file_url, folder_url, student_name_list):
+    print(copy_controller.summary())
+
+
+def main(
+    template_file_url,
+    folder_url,
+    student_name_list=None,
+    roster_spreadsheet_url=None,
+    student_info_sheet_name=None,
+):
     """
     Fetches Studio Database information and uses it to generate Sprint Logs.
 
     :param template_file_url: string url of original file to copy.
     :param folder_url: string url of folder to copy file to.
-    :param student_name_list: list of student names to create files for.
+    :param student_name_list: iterable of students to create files for. if None, every student in the Studio Roster
+        is streamed from it, one window of rows at a time.
+    :param roster_spreadsheet_url: optional string url of Studio Roster Google Spreadsheet (or filepath of SQLite
+        Studio Database), for when student_name_list is None.
+    :param student_info_sheet_name: optional string name of sheet where Student Information is stored.
     :return: None
     """
-    # authenticate for Google Drive v3 and Google Spreadsheets APIs
+    # authenticate for Google Drive v3 API
     gdrive_service = helpers.auth_gdrive()
-    gspreadsheets_service = helpers.auth_gsheets()
 
-    # generate activity for each student
-    generate_activity(student_name_list, gdrive_service, template_file_url, folder_url)
+    # stream every student from the roster, so copies start before the whole roster is fetched
+    if student_name_list is None:
+        student_name_list = studio_db.stream_student_info(
+            roster_spreadsheet_url, student_info_sheet_name
+        )
+
+    # generate activity for each student, printing each as it is created
+    for record in generate_activity(
+        student_name_list, gdrive_service, template_file_url, folder_url
+    ):
+        print(pipeline.format_result_record(record))
 
 
 if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
     # get command line args
     arg_count = len(sys.argv) - 1
 
     # check for correct number of arguments
-    if arg_count != 3:
+    if arg_count not in (3, 4):
         raise Exception(
             "Invalid number of arguments. Expected 3 "
             "(activity template URL, activity folder URL, "
-            "Student List) got {}.".format(arg_count)
+            "Student List as JSON, or - to read NDJSON from stdin) or 4 "
+            "(activity template URL, activity folder URL, Studio Roster URL, Student Info sheet name) got {}.".format(
+                arg_count
+            )
         )
 
     # inputs for creating activity
     input_template_file_url = sys.argv[1]
     input_folder_url = sys.argv[2]
-    input_student_list = json.loads(sys.argv[3])
 
-    main(input_template_file_url, input_folder_url, input_student_list)
+    # students are either listed, or streamed from the roster
+    if arg_count == 3:
+        input_student_list = pipeline.parse_items_argument(sys.argv[3])
+        input_roster_args = ()
+    else:
+        input_student_list = None
+        input_roster_args = (sys.argv[3], sys.argv[4])
+
+    with profiling.profile_run("create_in-class-activity", should_profile):
+        main(
+            input_template_file_url,
+            input_folder_url,
+            input_student_list,
+            *input_roster_args,
+        )
@@ -5,7 +5,12 @@ output directory and a list of student names.
 
 import sys
 import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import helpers.naming as naming
+import helpers.pipeline as pipeline
 import roster_to_json as studio_db
+import provision_team_folders
 from copy_gdrive_file import copy_file
 
 
@@ -16,30 +21,48 @@ def generate_self_assessment(
     template_url,
     target_folder_url,
     should_populate,
+    copy_controller=None,
+    populate_controller=None,
 ):
     """
     Generates a Self-Assessment worksheet for each student. Data is populated if should_populate is True.
 
+    Several students are handled at once. Copies (Drive) and populates (Sheets) are limited separately, since each API
+    throttles independently, and each limit is adjusted by its controller.
+
     :param studio_db_dict: dict containing all information for the studio database
     :param gdrive_service: Google Drive v3 authentication object.
     :param template_url: string url of original file to copy.
     :param target_folder_url: string url of folder to copy file to.
     :param should_populate: boolean whether student info from the studio_db_dict should be used to pre-populate
         the generated self-assessment.
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :param populate_controller: optional AdaptiveConcurrencyController for populating copies.
     :return: None
     """
-    # iterate over each student in the studio_db_dict, and create a self-assessment for them
-    for student_name, student_info in studio_db_dict.items():
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+    populate_controller = (
+        populate_controller or concurrency.AdaptiveConcurrencyController("populate")
+    )
+
+    def create_self_assessment(student):
+        student_name, student_info = student
+
         # generate a filename using the student's first name and last initial
-        student_name_split = student_name.split(" ")
-        student_filename = "{first} {lasti}. -- Mid-Quarter Self-Assessment".format(
-            first=student_name_split[0], lasti=student_name_split[-1][0]
-        )
+        student_filename = naming.mid_quarter_self_assessment_filename(student_name)
 
         # copy original file for each project using student_filename
-        curr_copied_file = copy_file(
-            gdrive_service, template_url, target_folder_url, student_filename
+        curr_copied_file = copy_controller.call(
+            copy_file,
+            gdrive_service,
+            template_url,
+            pipeline.get_item_folder_url(student, target_folder_url),
+            student_filename,
         )
+        if curr_copied_file is None:
+            return student_filename, None
 
         # generate a file URL for copied file
         curr_file_id = curr_copied_file["id"]
@@ -49,17 +72,34 @@ def generate_self_assessment(
 
         # populate with data
         if should_populate:
-            populate_self_assessment(
-                gspreadsheets_service, curr_file_url, student_name, student_info
+            populate_controller.call(
+                populate_self_assessment,
+                gspreadsheets_service,
+                curr_file_url,
+                student_name,
+                student_info,
             )
 
+        return student_filename, curr_file_url
+
+    # create a self-assessment for each student in the studio_db_dict, several at a time
+    for student_filename, curr_file_url in concurrency.run_concurrently(
+        create_self_assessment,
+        studio_db_dict.items(),
+        copy_controller.max_limit + populate_controller.max_limit,
+    ):
         # print generated file
         print(
             "{filename}: {fileurl}".format(
-                filename=student_filename, fileurl=curr_file_url
+                filename=student_filename,
+                fileurl=curr_file_url if curr_file_url is not None else "copy failed",
             )
         )
 
+    print(copy_controller.summary())
+    if should_populate:
+        print(populate_controller.summary())
+
 
 def populate_self_assessment(
     gspreadsheet_service, self_assessment_url, student_name, student_info_dict
@@ -73,12 +113,13 @@ def populate_self_assessment(
     :param student_info_dict:
     :return:
     """
-    # get the generated spreadsheet
-    generated_spreadsheet = gspreadsheet_service.open_by_url(self_assessment_url)
+    with profiling.phase("populate"):
+        # get the generated spreadsheet
+        generated_spreadsheet = gspreadsheet_service.open_by_url(self_assessment_url)
 
-    # populate basic info
-    basic_info_worksheet = generated_spreadsheet.worksheet("Basic Info")
-    populate_basic_info(basic_info_worksheet, student_name, student_info_dict)
+        # populate basic info
+        basic_info_worksheet = generated_spreadsheet.worksheet("Basic Info")
+        populate_basic_info(basic_info_worksheet, student_name, student_info_dict)
 
 
 def populate_basic_info(worksheet, student_name, student_info_dict):
@@ -123,6 +164,7 @@ def main(
     roster_spreadsheet_url,
     student_info_sheet_name,
     team_info_sheet_name,
+    team_folder_cache_path=None,
 ):
     """
     Fetches info from Studio Roster, and uses it to generate self-assessment sheets for each student.
@@ -133,16 +175,28 @@ def main(
     :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet.
     :param student_info_sheet_name: string name of sheet where Student Information is stored.
     :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :param team_folder_cache_path: optional string filepath of a team folder cache from provision_team_folders.py, to
+        copy each student's Self-Assessment into their team's folder.
     :return: None
     """
+    # copies and populates are limited separately, so pool enough connections for both to be at their limits
+    copy_controller = concurrency.AdaptiveConcurrencyController("copy")
+    populate_controller = concurrency.AdaptiveConcurrencyController("populate")
+    pool_size = concurrency.get_pool_size(copy_controller, populate_controller)
+
     # authenticate for Google Drive v3 and Google Spreadsheets APIs
-    gdrive_service = helpers.auth_gdrive()
-    gspreadsheets_service = helpers.auth_gsheets()
+    gdrive_service = helpers.auth_gdrive(pool_size)
+    gspreadsheets_service = helpers.auth_gsheets(pool_size)
 
     # generate studio database from roster
     studio_db_dict = studio_db.main(
         roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
     )
+    if team_folder_cache_path is not None:
+        provision_team_folders.add_team_folders(
+            studio_db_dict,
+            provision_team_folders.read_folder_cache(team_folder_cache_path),
+        )
 
     # generate IPMs for each student
     generate_self_assessment(
@@ -152,21 +206,25 @@ def main(
         template_file_url,
         target_folder_url,
         should_populate,
+        copy_controller,
+        populate_controller,
     )
 
 
 if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
     # get command line args
     arg_count = len(sys.argv) - 1
 
     # check for correct number of arguments
-    if arg_count != 6:
+    if arg_count not in (6, 7):
         raise Exception(
-            "Invalid number of arguments. Expected 6 "
+            "Invalid number of arguments. Expected 6 or 7 "
             "(Self-Assessment template URL, Self-Assessment target folder URL, Should Populate (boolean), "
-            "Studio Roster URL, Student Info sheet name, Team Info sheet name) got {}.".format(
-                arg_count
-            )
+            "Studio Roster URL, Student Info sheet name, Team Info sheet name, optional Team Folder Cache filepath) "
+            "got {}.".format(arg_count)
         )
 
     # inputs for creating self-assessments
@@ -178,12 +236,15 @@ if __name__ == "__main__":
     input_studio_db_url = sys.argv[4]
     input_student_info_sheet_name = sys.argv[5]
     input_team_info_sheet_name = sys.argv[6]
-
-    main(
-        input_template_file_url,
-        input_folder_url,
-        input_should_populate,
-        input_studio_db_url,
-        input_student_info_sheet_name,
-        input_team_info_sheet_name,
-    )
+    input_team_folder_cache_path = sys.argv[7] if arg_count == 7 else None
+
+    with profiling.profile_run("create_mid-quarter_self-assessment", should_profile):
+        main(
+            input_template_file_url,
+            input_folder_url,
+            input_should_populate,
+            input_studio_db_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+            input_team_folder_cache_path,
+        )
@@ -5,9 +5,25 @@ output directory and a list of student names.
 
 import sys
 import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import helpers.naming as naming
+import helpers.pipeline as pipeline
 import roster_to_json as studio_db
+import provision_team_folders
+from cleanup_generated_files import trash_files
 from copy_gdrive_file import copy_file
 
+# strategies for populating self-assessments. "per-team" writes each team's info once, to an intermediate copy that
+# every member's self-assessment is copied from.
+POPULATE_STRATEGIES = ("per-student", "per-team")
+
+# name of each team's intermediate copy. it does not follow any generated file's naming convention.
+TEAM_COPY_FILENAME_FORMAT = "{team_name} -- Self-Assessment Team Copy (temporary)"
+
+# url of a generated file, given its id
+SPREADSHEET_URL_FORMAT = "https://docs.google.com/spreadsheets/d/{id}/edit"
+
 
 def generate_self_assessment(
     studio_db_dict,
@@ -16,30 +32,48 @@ def generate_self_assessment(
     template_url,
     target_folder_url,
     should_populate,
+    copy_controller=None,
+    populate_controller=None,
 ):
     """
     Generates a Self-Assessment worksheet for each student. Data is populated if should_populate is True.
 
+    Several students are handled at once. Copies (Drive) and populates (Sheets) are limited separately, since each API
+    throttles independently, and each limit is adjusted by its controller.
+
     :param studio_db_dict: dict containing all information for the studio database
     :param gdrive_service: Google Drive v3 authentication object.
     :param template_url: string url of original file to copy.
     :param target_folder_url: string url of folder to copy file to.
     :param should_populate: boolean whether student info from the studio_db_dict should be used to pre-populate
         the generated self-assessment.
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :param populate_controller: optional AdaptiveConcurrencyController for populating copies.
     :return: None
     """
-    # iterate over each student in the studio_db_dict, and create a self-assessment for them
-    for student_name, student_info in studio_db_dict.items():
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+    populate_controller = (
+        populate_controller or concurrency.AdaptiveConcurrencyController("populate")
+    )
+
+    def create_self_assessment(student):
+        student_name, student_info = student
+
         # generate a filename using the student's first name and last initial
-        student_name_split = student_name.split(" ")
-        student_filename = "{first} {lasti}. -- HCI Studio EOQ Self-Assessment".format(
-            first=student_name_split[0], lasti=student_name_split[-1][0]
-        )
+        student_filename = naming.self_assessment_filename(student_name)
 
         # copy original file for each project using student_filename
-        curr_copied_file = copy_file(
-            gdrive_service, template_url, target_folder_url, student_filename
+        curr_copied_file = copy_controller.call(
+            copy_file,
+            gdrive_service,
+            template_url,
+            pipeline.get_item_folder_url(student, target_folder_url),
+            student_filename,
         )
+        if curr_copied_file is None:
+            return student_filename, None
 
         # generate a file URL for copied file
         curr_file_id = curr_copied_file["id"]
@@ -49,17 +83,34 @@ def generate_self_assessment(
 
         # populate with data
         if should_populate:
-            populate_self_assessment(
-                gspreadsheets_service, curr_file_url, student_name, student_info
+            populate_controller.call(
+                populate_self_assessment,
+                gspreadsheets_service,
+                curr_file_url,
+                student_name,
+                student_info,
             )
 
+        return student_filename, curr_file_url
+
+    # create a self-assessment for each student in the studio_db_dict, several at a time
+    for student_filename, curr_file_url in concurrency.run_concurrently(
+        create_self_assessment,
+        studio_db_dict.items(),
+        copy_controller.max_limit + populate_controller.max_limit,
+    ):
         # print generated file
         print(
             "{filename}: {fileurl}".format(
-                filename=student_filename, fileurl=curr_file_url
+                filename=student_filename,
+                fileurl=curr_file_url if curr_file_url is not None else "copy failed",
             )
         )
 
+    print(copy_controller.summary())
+    if should_populate:
+        print(populate_controller.summary())
+
 
 def populate_self_assessment(
     gspreadsheet_service, self_assessment_url, student_name, student_info_dict
@@ -73,36 +124,56 @@ def populate_self_assessment(
     :param student_info_dict:
     :return:
     """
-    # get the generated spreadsheet
-    generated_spreadsheet = gspreadsheet_service.open_by_url(self_assessment_url)
+    with profiling.phase("populate"):
+        # get the generated spreadsheet
+        generated_spreadsheet = gspreadsheet_service.open_by_url(self_assessment_url)
 
-    # populate basic info
-    basic_info_worksheet = generated_spreadsheet.worksheet("Basic Info")
-    populate_basic_info(basic_info_worksheet, student_name, student_info_dict)
+        # populate basic info
+        basic_info_worksheet = generated_spreadsheet.worksheet("Basic Info")
+        populate_basic_info(basic_info_worksheet, student_name, student_info_dict)
 
-    # populate sprints
-    sprints_worksheet = generated_spreadsheet.worksheet("Sprint")
-    populate_sprints(sprints_worksheet, student_name, student_info_dict)
+        # populate sprints
+        sprints_worksheet = generated_spreadsheet.worksheet("Sprint")
+        populate_sprints(sprints_worksheet, student_name, student_info_dict)
 
 
-def populate_basic_info(worksheet, student_name, student_info_dict):
+def create_student_values(student_name, student_info_dict):
     """
-    Populates the Basic Info tab with the student's: name; email; team color (and members); individual progress map.
+    Creates the Basic Info values that are specific to a student: name; email; learning goal; individual progress map.
 
-    :param worksheet: gspread worksheet object that points to the Basic Info tab.
     :param student_name: string name of student.
     :param student_info_dict: dict info related to student.
-    :return:
+    :return: dict of Basic Info cell (e.g., "B2") to value.
     """
-    # generate update list with student's: name; email; team color (and members); individual progress map link
-    student_email = student_info_dict["email_address"]
     student_learning_goal = student_info_dict["learning_goals"]
+    student_ipm = student_info_dict["individual_progress_map_link"]
+
+    return {
+        "B2": student_name,
+        "B3": student_info_dict["email_address"],
+        "B4": (
+            student_learning_goal
+            if student_learning_goal != ""
+            else "enter learning goal"
+        ),
+        "B7": (
+            student_ipm if student_ipm != "" else "enter individual progress map link"
+        ),
+    }
+
+
+def create_team_values(student_info_dict):
+    """
+    Creates the Basic Info values that are the same for every member of a team: team color (and members); design log;
+    latest weekly template; final presentation.
+
+    :param student_info_dict: dict info related to a student in the team.
+    :return: dict of Basic Info cell (e.g., "B5") to value.
+    """
     student_team = "{teamname} ({teammembers})".format(
         teamname=student_info_dict["team_info"]["team_name"],
         teammembers="; ".join(student_info_dict["team_info"]["team_members"]),
     )
-    student_design_log = "enter design log link (if applicable)"
-    student_ipm = student_info_dict["individual_progress_map_link"]
     team_latest_proj_template = student_info_dict["team_info"]["weekly_templates"][-1][
         "link"
     ]
@@ -110,40 +181,26 @@ def populate_basic_info(worksheet, student_name, student_info_dict):
         "final_presentation_link"
     ]
 
-    update_list = [
-        [student_name],
-        [student_email],
-        [
-            student_learning_goal
-            if student_learning_goal != ""
-            else "enter learning goal"
-        ],
-        [student_team],
-        [student_design_log],
-        [student_ipm if student_ipm != "" else "enter individual progress map link"],
-        [team_latest_proj_template],
-        [
+    return {
+        "B5": student_team,
+        "B6": "enter design log link (if applicable)",
+        "B8": team_latest_proj_template,
+        "B9": (
             team_final_presentation_link
             if team_final_presentation_link != ""
             else "enter final presentation link"
-        ],
-    ]
+        ),
+    }
 
-    # update worksheet
-    worksheet.update("B2:B9", update_list)
 
-
-def populate_sprints(worksheet, student_name, student_info_dict):
+def create_sprint_values(student_info_dict):
     """
-    Populates the Sprint Tab with Weekly Template URLs for each sprint.
+    Creates the Sprint values (Weekly Template URLs for each sprint), which are the same for every member of a team.
 
-    :param worksheet: gspread worksheet object that points to the Basic Info tab.
-    :param student_name: string name of student.
     :param student_info_dict: dict info related to student.
-    :return:
+    :return: list of single-value rows for the Sprint tab, starting at B2.
     """
-    # generate update list
-    update_list = []
+    output = []
     for i in range(1, 10):
         curr_template_name = "Week 0{index} Templates".format(index=i)
 
@@ -152,15 +209,244 @@ def populate_sprints(worksheet, student_name, student_info_dict):
             if curr_template_dict["name"] == curr_template_name:
                 # add link to update list, or update with "enter here" if no link is found
                 curr_template_link = curr_template_dict["link"]
-                update_list.append(
+                output.append(
                     [curr_template_link if curr_template_link != "" else "enter here"]
                 )
 
                 # no need to keep looking for week i
                 break
 
+    return output
+
+
+def populate_basic_info(worksheet, student_name, student_info_dict):
+    """
+    Populates the Basic Info tab with the student's: name; email; team color (and members); individual progress map.
+
+    :param worksheet: gspread worksheet object that points to the Basic Info tab.
+    :param student_name: string name of student.
+    :param student_info_dict: dict info related to student.
+    :return:
+    """
+    # generate update list with student's: name; email; team color (and members); individual progress map link
+    values = dict(
+        create_student_values(student_name, student_info_dict),
+        **create_team_values(student_info_dict)
+    )
+    update_list = [[values["B{row}".format(row=row)]] for row in range(2, 10)]
+
     # update worksheet
-    worksheet.update("B2:B10", update_list)
+    worksheet.update("B2:B9", update_list)
+
+
+def populate_sprints(worksheet, student_name, student_info_dict):
+    """
+    Populates the Sprint Tab with Weekly Template URLs for each sprint.
+
+    :param worksheet: gspread worksheet object that points to the Basic Info tab.
+    :param student_name: string name of student.
+    :param student_info_dict: dict info related to student.
+    :return:
+    """
+    # update worksheet
+    worksheet.update("B2:B10", create_sprint_values(student_info_dict))
+
+
+def create_value_ranges(values):
+    """
+    Creates a values.batchUpdate range for each Basic Info cell.
+
+    :param values: dict of Basic Info cell (e.g., "B2") to value.
+    :return: list of valueRange dicts.
+    """
+    return [
+        {"range": "'Basic Info'!{cell}".format(cell=cell), "values": [[value]]}
+        for cell, value in values.items()
+    ]
+
+
+def populate_team_copy(gspreadsheet_service, team_copy_id, student_info_dict):
+    """
+    Pre-populates a team's intermediate copy with the info shared by every member, in a single request.
+
+    :param gspreadsheet_service: gspread authentication object.
+    :param team_copy_id: string id of team's intermediate copy.
+    :param student_info_dict: dict info related to a student in the team.
+    :return: None
+    """
+    with profiling.phase("populate"):
+        gspreadsheet_service.http_client.values_batch_update(
+            team_copy_id,
+            {
+                "valueInputOption": "RAW",
+                "data": create_value_ranges(create_team_values(student_info_dict))
+                + [
+                    {
+                        "range": "Sprint!B2:B10",
+                        "values": create_sprint_values(student_info_dict),
+                    }
+                ],
+            },
+        )
+
+
+def populate_student_cells(
+    gspreadsheet_service, self_assessment_id, student_name, student_info_dict
+):
+    """
+    Populates only the student-specific cells of a self-assessment copied from a team copy, in a single request.
+
+    :param gspreadsheet_service: gspread authentication object.
+    :param self_assessment_id: string id of student's self-assessment.
+    :param student_name: string name of student.
+    :param student_info_dict: dict info related to student.
+    :return: None
+    """
+    with profiling.phase("populate"):
+        gspreadsheet_service.http_client.values_batch_update(
+            self_assessment_id,
+            {
+                "valueInputOption": "RAW",
+                "data": create_value_ranges(
+                    create_student_values(student_name, student_info_dict)
+                ),
+            },
+        )
+
+
+def generate_self_assessment_per_team(
+    studio_db_dict,
+    gdrive_service,
+    gspreadsheets_service,
+    template_url,
+    target_folder_url,
+    copy_controller=None,
+    populate_controller=None,
+):
+    """
+    Generates a pre-populated Self-Assessment worksheet for each student, writing each team's info once.
+
+    An intermediate copy of the template is made for each team and populated with the info shared by its members.
+    Each member's Self-Assessment is copied from their team's copy, so only their own cells are written. Intermediate
+    copies are trashed once every Self-Assessment has been made.
+
+    :param studio_db_dict: dict containing all information for the studio database
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param gspreadsheets_service: gspread authentication object.
+    :param template_url: string url of original file to copy.
+    :param target_folder_url: string url of folder to copy file to.
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :param populate_controller: optional AdaptiveConcurrencyController for populating copies.
+    :return: None
+    """
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+    populate_controller = (
+        populate_controller or concurrency.AdaptiveConcurrencyController("populate")
+    )
+    max_workers = copy_controller.max_limit + populate_controller.max_limit
+
+    # group students by team, keeping one student's info to populate the team's copy with
+    team_students = {}
+    for student_name, student_info in studio_db_dict.items():
+        team_students.setdefault(student_info["team_info"]["team_name"], student_info)
+
+    # id of each team's copy (or None if copying failed), added as soon as the copy is made
+    team_copies = {}
+
+    def create_team_copy(team):
+        team_name, student_info = team
+
+        # copy original file for each team, and populate it with the team's info
+        team_copy = copy_controller.call(
+            copy_file,
+            gdrive_service,
+            template_url,
+            target_folder_url,
+            TEAM_COPY_FILENAME_FORMAT.format(team_name=team_name),
+        )
+        if team_copy is None:
+            team_copies[team_name] = None
+            return
+
+        # record the copy before populating it, so it is trashed even if populating fails
+        team_copies[team_name] = team_copy["id"]
+        populate_controller.call(
+            populate_team_copy, gspreadsheets_service, team_copy["id"], student_info
+        )
+
+    def create_self_assessment(student):
+        student_name, student_info = student
+
+        # generate a filename using the student's first name and last initial
+        student_filename = naming.self_assessment_filename(student_name)
+
+        # copy the team's copy for each student, so only their own info needs to be written
+        team_copy_id = team_copies[student_info["team_info"]["team_name"]]
+        if team_copy_id is None:
+            return student_filename, None
+
+        curr_copied_file = copy_controller.call(
+            copy_file,
+            gdrive_service,
+            SPREADSHEET_URL_FORMAT.format(id=team_copy_id),
+            pipeline.get_item_folder_url(student, target_folder_url),
+            student_filename,
+        )
+        if curr_copied_file is None:
+            return student_filename, None
+
+        populate_controller.call(
+            populate_student_cells,
+            gspreadsheets_service,
+            curr_copied_file["id"],
+            student_name,
+            student_info,
+        )
+        return student_filename, SPREADSHEET_URL_FORMAT.format(
+            id=curr_copied_file["id"]
+        )
+
+    try:
+        # create and populate a copy for each team, several at a time
+        for _ in concurrency.run_concurrently(
+            create_team_copy, team_students.items(), max_workers
+        ):
+            pass
+
+        # create a self-assessment for each student from their team's copy, several at a time
+        for student_filename, curr_file_url in concurrency.run_concurrently(
+            create_self_assessment, studio_db_dict.items(), max_workers
+        ):
+            # print generated file
+            print(
+                "{filename}: {fileurl}".format(
+                    filename=student_filename,
+                    fileurl=(
+                        curr_file_url if curr_file_url is not None else "copy failed"
+                    ),
+                )
+            )
+    finally:
+        # trash the intermediate team copies
+        _, failed_files = trash_files(
+            gdrive_service,
+            [
+                {"id": team_copy_id}
+                for team_copy_id in list(team_copies.values())
+                if team_copy_id is not None
+            ],
+        )
+        for file_id, error in failed_files.items():
+            print(
+                "Could not trash team copy {id}: {error}".format(
+                    id=file_id, error=error
+                )
+            )
+
+    print(copy_controller.summary())
+    print(populate_controller.summary())
 
 
 def main(
@@ -170,6 +456,8 @@ def main(
     roster_spreadsheet_url,
     student_info_sheet_name,
     team_info_sheet_name,
+    strategy="per-student",
+    team_folder_cache_path=None,
 ):
     """
     Fetches info from Studio Roster, and uses it to generate self-assessment sheets for each student.
@@ -180,18 +468,43 @@ def main(
     :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet.
     :param student_info_sheet_name: string name of sheet where Student Information is stored.
     :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :param strategy: string "per-student" or "per-team" (only used when should_populate is True).
+    :param team_folder_cache_path: optional string filepath of a team folder cache from provision_team_folders.py, to
+        copy each student's Self-Assessment into their team's folder.
     :return: None
     """
+    # copies and populates are limited separately, so pool enough connections for both to be at their limits
+    copy_controller = concurrency.AdaptiveConcurrencyController("copy")
+    populate_controller = concurrency.AdaptiveConcurrencyController("populate")
+    pool_size = concurrency.get_pool_size(copy_controller, populate_controller)
+
     # authenticate for Google Drive v3 and Google Spreadsheets APIs
-    gdrive_service = helpers.auth_gdrive()
-    gspreadsheets_service = helpers.auth_gsheets()
+    gdrive_service = helpers.auth_gdrive(pool_size)
+    gspreadsheets_service = helpers.auth_gsheets(pool_size)
 
     # generate studio database from roster
     studio_db_dict = studio_db.main(
         roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
     )
+    if team_folder_cache_path is not None:
+        provision_team_folders.add_team_folders(
+            studio_db_dict,
+            provision_team_folders.read_folder_cache(team_folder_cache_path),
+        )
+
+    # generate self-assessments for each student, writing team info once per team if asked to
+    if should_populate and strategy == "per-team":
+        generate_self_assessment_per_team(
+            studio_db_dict,
+            gdrive_service,
+            gspreadsheets_service,
+            template_file_url,
+            target_folder_url,
+            copy_controller,
+            populate_controller,
+        )
+        return
 
-    # generate IPMs for each student
     generate_self_assessment(
         studio_db_dict,
         gdrive_service,
@@ -199,38 +512,55 @@ def main(
         template_file_url,
         target_folder_url,
         should_populate,
+        copy_controller,
+        populate_controller,
     )
 
 
 if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
     # get command line args
     arg_count = len(sys.argv) - 1
 
     # check for correct number of arguments
-    if arg_count != 6:
+    if arg_count not in (6, 7, 8):
         raise Exception(
-            "Invalid number of arguments. Expected 6 "
+            "Invalid number of arguments. Expected 6 to 8 "
             "(Self-Assessment template URL, Self-Assessment target folder URL, Should Populate (boolean), "
-            "Studio Roster URL, Student Info sheet name, Team Info sheet name) got {}.".format(
-                arg_count
-            )
+            "Studio Roster URL, Student Info sheet name, Team Info sheet name, optional Populate Strategy, "
+            "optional Team Folder Cache filepath) got {}.".format(arg_count)
         )
 
     # inputs for creating self-assessments
     input_template_file_url = sys.argv[1]
     input_folder_url = sys.argv[2]
     input_should_populate = True if sys.argv[3] == "true" else False
+    input_strategy = sys.argv[7] if arg_count >= 7 else "per-student"
+    input_team_folder_cache_path = sys.argv[8] if arg_count == 8 else None
 
     # inputs for generating studio database
     input_studio_db_url = sys.argv[4]
     input_student_info_sheet_name = sys.argv[5]
     input_team_info_sheet_name = sys.argv[6]
 
-    main(
-        input_template_file_url,
-        input_folder_url,
-        input_should_populate,
-        input_studio_db_url,
-        input_student_info_sheet_name,
-        input_team_info_sheet_name,
-    )
+    # check for a known populate strategy
+    if input_strategy not in POPULATE_STRATEGIES:
+        raise Exception(
+            "Invalid Populate Strategy. Expected one of {} got {}.".format(
+                list(POPULATE_STRATEGIES), input_strategy
+            )
+        )
+
+    with profiling.profile_run("create_self_assessments", should_profile):
+        main(
+            input_template_file_url,
+            input_folder_url,
+            input_should_populate,
+            input_studio_db_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+            input_strategy,
+            input_team_folder_cache_path,
+        )
@@ -2,91 +2,386 @@
 This script is used to create Weekly Templates for each project team in HCI Studio.
 """
 
+import contextlib
+import functools
+import re
 import sys
-import json
+from apiclient import errors
 import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import helpers.naming as naming
+import helpers.pipeline as pipeline
+import helpers.studio_db_sqlite as studio_db_sqlite
+import roster_to_json as studio_db
 from copy_gdrive_file import copy_file
 
+# url of a generated file, given its id
+FILE_URL_FORMAT = "https://docs.google.com/presentation/d/{id}/edit"
+
+# placeholders in the Weekly Template deck that are replaced with each team's info
+TEAM_NAME_PLACEHOLDER = "{{team_name}}"
+TEAM_MEMBERS_PLACEHOLDER = "{{team_members}}"
+PREVIOUS_WEEK_LINK_PLACEHOLDER = "{{previous_week_link}}"
+
 
 def generate_weekly_templates(
-    project_team_names_list, gdrive_service, template_name, template_url, folder_url
+    project_team_names_list,
+    gdrive_service,
+    template_name,
+    template_url,
+    folder_url,
+    copy_controller=None,
 ):
     """
-    Generates an Weekly Template for each project team.
+    Generates an Weekly Template for each project team. Several copies are made at once, with the number in flight
+    adjusted by copy_controller.
+    Teams are read from project_team_names_list as copies are made, so it can be a lazily-read stream (e.g., NDJSON
+    on stdin).
 
-    :param project_team_names_list: list of project team names to generate Weekly Template for.
+    :param project_team_names_list: iterable of project teams to generate Weekly Template for (see
+        helpers/pipeline.py for item formats).
     :param gdrive_service: Google Drive v3 authentication object.
     :param template_name: name of weekly template.
     :param template_url: string url of original file to copy.
     :param folder_url: string url of folder to copy file to.
-    :return: None
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :return: generator of result records (name, filename, file_id, url), in the order copies finish.
     """
-    # iterate over project team nameslist and create an Weekly Template for each project team
-    for project_team in project_team_names_list:
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+
+    def create_weekly_template(project_team):
+        project_team_name = pipeline.get_item_name(project_team)
+
         # generate a filename using the project team name
-        weekly_template_filename = "[{team_name}] {template_name}".format(
-            team_name=project_team, template_name=template_name
+        weekly_template_filename = naming.weekly_template_filename(
+            project_team_name, template_name
         )
 
         # copy original file for each project using weekly_template_filename
-        curr_copied_file = copy_file(
-            gdrive_service, template_url, folder_url, weekly_template_filename
+        curr_copied_file = copy_controller.call(
+            copy_file,
+            gdrive_service,
+            template_url,
+            pipeline.get_item_folder_url(project_team, folder_url),
+            weekly_template_filename,
+        )
+        return pipeline.create_result_record(
+            project_team_name,
+            weekly_template_filename,
+            curr_copied_file,
+            FILE_URL_FORMAT,
         )
 
-        # generate a file URL for copied file, and print out
-        curr_file_id = curr_copied_file["id"]
-        print(
-            "{filename}: https://docs.google.com/presentation/d/{id}/edit".format(
-                filename=weekly_template_filename, id=curr_file_id
+    # create a Weekly Template for each project team, several at a time
+    yield from concurrency.run_concurrently(
+        create_weekly_template, project_team_names_list, copy_controller.max_limit
+    )
+
+    print(copy_controller.summary())
+
+
+def parse_template_week_number(template_name):
+    """
+    Parses the week number from the name of a weekly template (e.g., "Template 01: Needfinding and Analysis On Your
+    Own" or "Week 1").
+
+    :param template_name: string name of weekly template.
+    :return: int week number, or None if the name has no week number.
+    """
+    results = re.search(r"(?:Template|Week)\s*(\d+)", template_name, re.IGNORECASE)
+
+    if results:
+        return int(results.group(1))
+
+    return None
+
+
+def find_previous_week_link(team_info, template_name):
+    """
+    Finds the link to a team's Weekly Template from the week before template_name's week.
+
+    :param team_info: dict of parsed Team Info, including weekly_templates.
+    :param template_name: string name of weekly template being created.
+    :return: string link to the previous week's Weekly Template, or "" if the roster does not have one.
+    """
+    week_number = parse_template_week_number(template_name)
+    if week_number is None:
+        return ""
+
+    for template in team_info.get("weekly_templates", []):
+        if studio_db_sqlite.parse_week_number(template["name"]) == week_number - 1:
+            return template["link"]
+
+    return ""
+
+
+def create_replacement_requests(project_team, team_info, template_name):
+    """
+    Creates Slides requests that replace the placeholders in a Weekly Template with a team's info.
+
+    :param project_team: string name of project team.
+    :param team_info: dict of parsed Team Info, including team_members and weekly_templates.
+    :param template_name: string name of weekly template being created, used to find the previous week's link.
+    :return: list of replaceAllText request dicts.
+    """
+    replacements = {
+        TEAM_NAME_PLACEHOLDER: project_team,
+        TEAM_MEMBERS_PLACEHOLDER: ", ".join(team_info.get("team_members", [])),
+        PREVIOUS_WEEK_LINK_PLACEHOLDER: find_previous_week_link(
+            team_info, template_name
+        ),
+    }
+
+    return [
+        {
+            "replaceAllText": {
+                "containsText": {"text": placeholder, "matchCase": True},
+                "replaceText": replacement,
+            }
+        }
+        for placeholder, replacement in replacements.items()
+    ]
+
+
+def personalize_weekly_template(
+    gslides_service, presentation_id, project_team, team_info, template_name
+):
+    """
+    Replaces the placeholders in a copied Weekly Template with a team's info, using a single batchUpdate.
+
+    :param gslides_service: Google Slides v1 authentication object.
+    :param presentation_id: string id of copied Weekly Template.
+    :param project_team: string name of project team.
+    :param team_info: dict of parsed Team Info, including team_members and weekly_templates.
+    :param template_name: string name of weekly template.
+    :return: batchUpdate response.
+    """
+    with profiling.phase("populate"):
+        return (
+            gslides_service.presentations()
+            .batchUpdate(
+                presentationId=presentation_id,
+                body={
+                    "requests": create_replacement_requests(
+                        project_team, team_info, template_name
+                    )
+                },
             )
+            .execute()
         )
 
 
-def main(template_name, template_file_url, folder_url, project_team_names_list):
+def personalize_weekly_templates(
+    gslides_service,
+    copied_templates,
+    find_team_info,
+    template_name,
+    populate_controller=None,
+):
+    """
+    Personalizes copied Weekly Templates with each team's info, personalizing several decks at the same time, with the
+    number in flight adjusted by populate_controller.
+    Decks are personalized as they are copied when copied_templates is the generator from generate_weekly_templates.
+
+    :param gslides_service: Google Slides v1 authentication object.
+    :param copied_templates: iterable of result records from generate_weekly_templates.
+    :param find_team_info: function that takes a team name, and returns the team's parsed Team Info (including
+        team_members), or None if the team is not in the roster (e.g., the get method of a team info dict, or
+        studio_db_sqlite.find_team with a connection). it is only called from the calling thread.
+    :param template_name: string name of weekly template.
+    :param populate_controller: optional AdaptiveConcurrencyController for Slides batch updates.
+    :return: generator of the result records, each with a "personalized" boolean, in the order decks finish. Decks
+        that could not be personalized also have an "error" string, so one failed deck does not stop the others.
+    """
+    populate_controller = (
+        populate_controller or concurrency.AdaptiveConcurrencyController("populate")
+    )
+
+    def personalize(record_team_info):
+        record, team_info = record_team_info
+        project_team = record["name"]
+        if record["file_id"] is None:
+            return dict(record, personalized=False)
+
+        if team_info is None:
+            print("Skipping {}: team not found in Studio Roster.".format(project_team))
+            return dict(record, personalized=False)
+
+        try:
+            populate_controller.call(
+                personalize_weekly_template,
+                gslides_service,
+                record["file_id"],
+                project_team,
+                team_info,
+                template_name,
+            )
+        except errors.HttpError as error:
+            print("An error occurred personalizing {}: {}".format(project_team, error))
+            return dict(record, personalized=False, error=str(error))
+
+        return dict(record, personalized=True)
+
+    # look up each team as its deck is handed to a thread, so lookups stay on the calling thread
+    yield from concurrency.run_concurrently(
+        personalize,
+        ((record, find_team_info(record["name"])) for record in copied_templates),
+        populate_controller.max_limit,
+    )
+
+    print(populate_controller.summary())
+
+
+def fetch_team_info_with_members(
+    roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+):
+    """
+    Fetches Team Info from the Studio Roster, including the members of each team.
+
+    :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet.
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :return: dict of parsed Team Info, including team_members.
+    """
+    gspreadsheets_service = helpers.auth_gsheets()
+    roster_spreadsheet = gspreadsheets_service.open_by_url(roster_spreadsheet_url)
+
+    team_info_dict = studio_db.fetch_team_info(roster_spreadsheet, team_info_sheet_name)
+    team_members = studio_db.fetch_team_members(
+        roster_spreadsheet, student_info_sheet_name
+    )
+    for team_name, team_info in team_info_dict.items():
+        team_info["team_members"] = team_members.get(team_name, [])
+
+    return team_info_dict
+
+
+@contextlib.contextmanager
+def open_team_info_lookup(
+    roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+):
+    """
+    Opens a lookup of each team's info (including team_members) in the Studio Roster. An exported SQLite Studio
+    Database is queried one team at a time, instead of loading the whole roster.
+
+    :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio
+        Database).
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :return: context manager giving a function that takes a team name, and returns the team's parsed Team Info, or
+        None if the team is not in the roster. it can only be called from the thread that opened it.
+    """
+    if not studio_db_sqlite.is_sqlite_path(roster_spreadsheet_url):
+        yield fetch_team_info_with_members(
+            roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+        ).get
+        return
+
+    connection = studio_db_sqlite.connect(roster_spreadsheet_url)
+    try:
+        yield functools.partial(studio_db_sqlite.find_team, connection)
+    finally:
+        connection.close()
+
+
+def main(
+    template_name,
+    template_file_url,
+    folder_url,
+    project_team_names_list,
+    roster_spreadsheet_url=None,
+    student_info_sheet_name=None,
+    team_info_sheet_name=None,
+):
     """
     Generates Weekly Templates based on command-line arguments.
+    If a Studio Roster is given, each copied Weekly Template is personalized with its team's info.
 
     :param template_name: name of weekly template.
     :param template_file_url: string url of original file to copy.
     :param folder_url: string url of folder to copy file to.
-    :param project_team_names_list: list of project team names to create files for.
+    :param project_team_names_list: iterable of project teams to create files for.
+    :param roster_spreadsheet_url: optional string url of Studio Roster Google Spreadsheet.
+    :param student_info_sheet_name: optional string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: optional string name of sheet where Team Information is stored.
     :return: None
     """
-    # authenticate for Google Drive v3 and Google Spreadsheets APIs
-    gdrive_service = helpers.auth_gdrive()
-    gspreadsheets_service = helpers.auth_gsheets()
+    # pool enough connections for the most copies and personalizations in flight at once
+    copy_controller = concurrency.AdaptiveConcurrencyController("copy")
+    populate_controller = concurrency.AdaptiveConcurrencyController("populate")
+    pool_size = concurrency.get_pool_size(copy_controller, populate_controller)
+
+    # authenticate for Google Drive v3 API
+    gdrive_service = helpers.auth_gdrive(pool_size)
 
     # generate Weekly Templates for each project team
-    generate_weekly_templates(
+    copied_templates = generate_weekly_templates(
         project_team_names_list,
         gdrive_service,
         template_name,
         template_file_url,
         folder_url,
+        copy_controller,
     )
 
+    # print each Weekly Template as it is finished, personalizing each with its team's info as it is copied
+    with contextlib.ExitStack() as stack:
+        if roster_spreadsheet_url is not None:
+            copied_templates = personalize_weekly_templates(
+                helpers.auth_gslides(pool_size),
+                copied_templates,
+                stack.enter_context(
+                    open_team_info_lookup(
+                        roster_spreadsheet_url,
+                        student_info_sheet_name,
+                        team_info_sheet_name,
+                    )
+                ),
+                template_name,
+                populate_controller,
+            )
+
+        for record in copied_templates:
+            print(pipeline.format_result_record(record))
+
 
 if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
     # get command line args
     arg_count = len(sys.argv) - 1
 
     # check for correct number of arguments
-    if arg_count != 4:
+    if arg_count not in (4, 7):
         raise Exception(
             "Invalid number of arguments. Expected 4 "
             "(Template Name, Weekly Template URL, Destination Folder URL, "
-            "Project Team Names List) got {}.".format(arg_count)
+            "Project Team Names List as JSON, or - to read NDJSON from stdin) or 7 (with Studio Roster URL, Student Info sheet name, "
+            "Team Info sheet name) got {}.".format(arg_count)
         )
 
     # inputs for creating Weekly Templates
     input_template_file_name = sys.argv[1]
     input_template_file_url = sys.argv[2]
     input_folder_url = sys.argv[3]
-    input_project_team_names_list = json.loads(sys.argv[4])
+    input_project_team_names_list = pipeline.parse_items_argument(sys.argv[4])
 
-    main(
-        input_template_file_name,
-        input_template_file_url,
-        input_folder_url,
-        input_project_team_names_list,
-    )
+    # optional inputs for personalizing Weekly Templates
+    input_studio_db_url = sys.argv[5] if arg_count == 7 else None
+    input_student_info_sheet_name = sys.argv[6] if arg_count == 7 else None
+    input_team_info_sheet_name = sys.argv[7] if arg_count == 7 else None
+
+    with profiling.profile_run("create_weekly_templates", should_profile):
+        main(
+            input_template_file_name,
+            input_template_file_url,
+            input_folder_url,
+            input_project_team_names_list,
+            input_studio_db_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+        )
@@ -0,0 +1,516 @@
+"""
+This script is used to split a very large run (e.g., IPMs for several courses) across several worker processes, on
+one or more machines, using a lease table in a shared SQLite file (see helpers/leases.py).
+
+    - "enqueue" adds a run, with its template, folder, and list of students or teams, to the lease file.
+    - "work" claims batches of the run's jobs and generates their files, until every job is done. Start as many
+      workers as needed. Each one has its own adaptive concurrency, so throughput grows with workers until Google's
+      quota is reached (at which point each worker backs off).
+    - "status" prints how many jobs are pending, leased, done, and failed.
+
+A worker that dies loses its leases once they expire, and other workers claim its jobs again. Since a dead worker may
+have copied a file without recording it, a reclaimed job first checks its folder for the file, and only copies the
+template if it is not there. Jobs whose item has a "folder_id" (e.g., from provision_team_folders.py) are copied to,
+and checked in, that folder instead of the run's folder.
+
+Weekly Template runs enqueued with a Studio Roster store each team's info in its job, and workers personalize each
+deck with it before marking the job done. Decks reused from an earlier attempt are personalized again, since
+replacing a placeholder that is already replaced changes nothing.
+"""
+
+import importlib
+import os
+import socket
+import sys
+import time
+import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import helpers.drive as drive
+import helpers.leases as leases
+import helpers.naming as naming
+import helpers.pipeline as pipeline
+import create_ipm
+import create_weekly_templates
+
+# the In-Class Activity generator's module name is not a valid identifier, so it cannot be imported with "import"
+create_activity_module = importlib.import_module("create_in-class-activity")
+
+# kinds of generated files a run can make
+FILE_TYPES = ("ipm", "in-class-activity", "weekly-template")
+
+# number of jobs each worker claims at a time
+DEFAULT_BATCH_SIZE = 20
+
+# seconds an idle worker waits before checking for expired leases again
+DEFAULT_POLL_INTERVAL = 10
+
+
+def get_worker_id():
+    """
+    :return: string id for this worker process, unique across machines (e.g., "lab-mac-3-41522").
+    """
+    return "{host}-{pid}".format(host=socket.gethostname(), pid=os.getpid())
+
+
+def create_filename(config, name):
+    """
+    Creates the filename a run's generator gives a student or team.
+
+    :param config: dict of run config.
+    :param name: string student or team name.
+    :return: string filename.
+    """
+    if config["file_type"] == "ipm":
+        return naming.ipm_filename(name)
+
+    if config["file_type"] == "in-class-activity":
+        return naming.activity_filename(name)
+
+    return naming.weekly_template_filename(name, config["template_name"])
+
+
+def get_url_format(config):
+    """
+    :param config: dict of run config.
+    :return: string format for generated file urls, with an {id} field.
+    """
+    if config["file_type"] == "ipm":
+        return create_ipm.FILE_URL_FORMAT
+
+    if config["file_type"] == "in-class-activity":
+        return create_activity_module.FILE_URL_FORMAT
+
+    return create_weekly_templates.FILE_URL_FORMAT
+
+
+def generate_files(config, items, gdrive_service, copy_controller):
+    """
+    Runs a run's generator over some of its students or teams.
+
+    :param config: dict of run config.
+    :param items: list of students or teams (see helpers/pipeline.py for item formats).
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param copy_controller: AdaptiveConcurrencyController for copies, shared by every batch the worker runs.
+    :return: generator of result records (name, filename, file_id, url).
+    """
+    if config["file_type"] == "ipm":
+        return create_ipm.generate_ipm(
+            items,
+            gdrive_service,
+            config["template_url"],
+            config["folder_url"],
+            copy_controller,
+        )
+
+    if config["file_type"] == "in-class-activity":
+        return create_activity_module.generate_activity(
+            items,
+            gdrive_service,
+            config["template_url"],
+            config["folder_url"],
+            copy_controller,
+        )
+
+    return create_weekly_templates.generate_weekly_templates(
+        items,
+        gdrive_service,
+        config["template_name"],
+        config["template_url"],
+        config["folder_url"],
+        copy_controller,
+    )
+
+
+def add_team_info(items, find_team_info):
+    """
+    Adds each team's info to its item, so workers can personalize Weekly Templates without the roster.
+
+    :param items: iterable of teams (see helpers/pipeline.py for item formats).
+    :param find_team_info: function that takes a team name, and returns the team's parsed Team Info (including
+        team_members), or None if the team is not in the roster.
+    :return: generator of (string team name, dict of item info with team_info) tuples.
+    """
+    for item in items:
+        team_name = pipeline.get_item_name(item)
+
+        # keep the item's own info (e.g., its folder)
+        if isinstance(item, dict):
+            item_info = item
+        elif isinstance(item, (tuple, list)) and len(item) > 1:
+            item_info = item[1]
+        else:
+            item_info = {}
+
+        yield team_name, dict(item_info, team_info=find_team_info(team_name))
+
+
+def get_item_team_info(item):
+    """
+    :param item: job item, as added by add_team_info.
+    :return: dict of the team's parsed Team Info, or None if the item has none.
+    """
+    if isinstance(item, (tuple, list)) and len(item) > 1:
+        return item[1].get("team_info")
+
+    return None
+
+
+def find_existing_files(gdrive_service, folder_filenames):
+    """
+    Finds which files are already in their folders, listing every folder together.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folder_filenames: set of (string folder id, string filename) tuples to look for.
+    :return: dict of (string folder id, string filename) to file dict, for each file found.
+    """
+    folder_ids = sorted({folder_id for folder_id, _ in folder_filenames})
+
+    return {
+        (folder_id, curr_file["name"]): curr_file
+        for curr_file in drive.list_files_in_folders(gdrive_service, folder_ids)
+        for folder_id in curr_file.get("parents", [])
+        if (folder_id, curr_file["name"]) in folder_filenames
+    }
+
+
+def process_jobs(
+    config,
+    jobs,
+    gdrive_service,
+    copy_controller,
+    gslides_service=None,
+    populate_controller=None,
+):
+    """
+    Generates the files for a batch of claimed jobs. Jobs that were claimed before (by a worker that may have died
+    after copying) reuse their file if it is already in their folder. Weekly Templates are personalized if the run
+    was enqueued with a Studio Roster, including reused ones.
+
+    :param config: dict of run config.
+    :param jobs: list of job dicts from leases.claim_jobs.
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param copy_controller: AdaptiveConcurrencyController for copies.
+    :param gslides_service: Google Slides v1 authentication object, for runs that personalize Weekly Templates.
+    :param populate_controller: optional AdaptiveConcurrencyController for Slides batch updates.
+    :return: generator of (string job key, result record) tuples.
+    """
+    records = find_or_copy_files(config, jobs, gdrive_service, copy_controller)
+
+    if config.get("personalize", False):
+        team_info = {job["job_key"]: get_item_team_info(job["item"]) for job in jobs}
+        records = create_weekly_templates.personalize_weekly_templates(
+            gslides_service,
+            records,
+            team_info.get,
+            config["template_name"],
+            populate_controller,
+        )
+
+    for record in records:
+        yield record["name"], record
+
+
+def find_or_copy_files(config, jobs, gdrive_service, copy_controller):
+    """
+    Finds the files of reclaimed jobs that an earlier attempt already copied, and copies the template for every other
+    job.
+
+    :param config: dict of run config.
+    :param jobs: list of job dicts from leases.claim_jobs.
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param copy_controller: AdaptiveConcurrencyController for copies.
+    :return: generator of result records, each named with its job key.
+    """
+    # only list folders when a job may have been started before. jobs can have their own folder (e.g., a team folder)
+    reclaimed_files = {
+        (
+            helpers.get_folder_id_from_url(
+                pipeline.get_item_folder_url(job["item"], config["folder_url"])
+            ),
+            create_filename(config, job["job_key"]),
+        ): job["job_key"]
+        for job in jobs
+        if job["attempts"] > 1
+    }
+    existing_files = (
+        find_existing_files(gdrive_service, set(reclaimed_files.keys()))
+        if reclaimed_files
+        else {}
+    )
+
+    for folder_filename, existing_file in existing_files.items():
+        print("Found {} from an earlier attempt.".format(folder_filename[1]))
+        yield pipeline.create_result_record(
+            reclaimed_files[folder_filename],
+            folder_filename[1],
+            existing_file,
+            get_url_format(config),
+        )
+
+    # copy the template for every other job
+    existing_job_keys = {
+        reclaimed_files[folder_filename] for folder_filename in existing_files
+    }
+    yield from generate_files(
+        config,
+        [job["item"] for job in jobs if job["job_key"] not in existing_job_keys],
+        gdrive_service,
+        copy_controller,
+    )
+
+
+def run_worker(
+    gdrive_service,
+    lease_file,
+    run_id,
+    batch_size=DEFAULT_BATCH_SIZE,
+    lease_seconds=leases.DEFAULT_LEASE_SECONDS,
+    poll_interval=DEFAULT_POLL_INTERVAL,
+    gslides_service=None,
+    copy_controller=None,
+    populate_controller=None,
+):
+    """
+    Claims and processes batches of a run's jobs until every job is done (or failed).
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param lease_file: string filepath of SQLite lease file.
+    :param run_id: string id of run.
+    :param batch_size: int number of jobs to claim at a time.
+    :param lease_seconds: float seconds each lease lasts, unless renewed.
+    :param poll_interval: float seconds to wait between checks for expired leases, once there are no pending jobs.
+    :param gslides_service: optional Google Slides v1 authentication object. runs that personalize Weekly Templates
+        authenticate one if it is not given.
+    :param copy_controller: optional AdaptiveConcurrencyController for copies.
+    :param populate_controller: optional AdaptiveConcurrencyController for Slides batch updates.
+    :return: int number of jobs this worker completed.
+    """
+    worker_id = get_worker_id()
+    connection = leases.connect(lease_file)
+    copy_controller = copy_controller or concurrency.AdaptiveConcurrencyController(
+        "copy"
+    )
+    populate_controller = (
+        populate_controller or concurrency.AdaptiveConcurrencyController("populate")
+    )
+    completed_count = 0
+
+    try:
+        config = leases.get_run_config(connection, run_id)
+        if config.get("personalize", False) and gslides_service is None:
+            gslides_service = helpers.auth_gslides(
+                concurrency.get_pool_size(copy_controller, populate_controller)
+            )
+
+        while True:
+            jobs = leases.claim_jobs(
+                connection, run_id, worker_id, batch_size, lease_seconds
+            )
+
+            if not jobs:
+                # stop once no other worker holds a lease that could expire and need redoing
+                if leases.count_jobs(connection, run_id)["leased"] == 0:
+                    break
+
+                time.sleep(poll_interval)
+                continue
+
+            # keep the batch's leases while its files are generated
+            with leases.keep_leases_alive(
+                lease_file,
+                run_id,
+                worker_id,
+                [job["job_key"] for job in jobs],
+                lease_seconds,
+            ):
+                for job_key, record in process_jobs(
+                    config,
+                    jobs,
+                    gdrive_service,
+                    copy_controller,
+                    gslides_service,
+                    populate_controller,
+                ):
+                    print(pipeline.format_result_record(record))
+
+                    # let another attempt retry failed copies and personalizations
+                    if record["file_id"] is None or "error" in record:
+                        leases.release_job(connection, run_id, worker_id, job_key)
+                    elif leases.complete_job(
+                        connection, run_id, worker_id, job_key, record
+                    ):
+                        completed_count += 1
+                    else:
+                        print(
+                            "Lost the lease on {job}, so {filename} may be a duplicate.".format(
+                                job=job_key, filename=record["filename"]
+                            )
+                        )
+    finally:
+        connection.close()
+
+    print(
+        "Worker {worker} completed {completed} jobs.".format(
+            worker=worker_id, completed=completed_count
+        )
+    )
+    return completed_count
+
+
+def print_status(lease_file, run_id):
+    """
+    Prints how many of a run's jobs are in each status.
+
+    :param lease_file: string filepath of SQLite lease file.
+    :param run_id: string id of run.
+    :return: dict from leases.count_jobs.
+    """
+    connection = leases.connect(lease_file)
+    try:
+        job_counts = leases.count_jobs(connection, run_id)
+    finally:
+        connection.close()
+
+    print(
+        "{run}: {pending} pending, {leased} leased, {done} done, {failed} failed.".format(
+            run=run_id, **job_counts
+        )
+    )
+    return job_counts
+
+
+def enqueue(lease_file, run_id, config, items):
+    """
+    Adds a run and its jobs to the lease file.
+
+    :param lease_file: string filepath of SQLite lease file.
+    :param run_id: string id of run.
+    :param config: dict of run config (file_type, template_url, folder_url, and template_name and personalize for
+        Weekly Templates).
+    :param items: iterable of students or teams (with their team info from add_team_info, for personalized runs).
+    :return: int number of jobs added.
+    """
+    connection = leases.connect(lease_file)
+    try:
+        added_count = leases.create_run(connection, run_id, config, items)
+    finally:
+        connection.close()
+
+    print("Added {added} jobs to {run}.".format(added=added_count, run=run_id))
+    return added_count
+
+
+def main(lease_file, run_id, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Authenticates and works on a run until every job is done.
+
+    :param lease_file: string filepath of SQLite lease file.
+    :param run_id: string id of run.
+    :param batch_size: int number of jobs to claim at a time.
+    :return: int number of jobs this worker completed.
+    """
+    # pool enough connections for the most copies and personalizations in flight at once
+    copy_controller = concurrency.AdaptiveConcurrencyController("copy")
+    populate_controller = concurrency.AdaptiveConcurrencyController("populate")
+    pool_size = concurrency.get_pool_size(copy_controller, populate_controller)
+
+    # authenticate for Google Drive v3 API
+    gdrive_service = helpers.auth_gdrive(pool_size)
+
+    return run_worker(
+        gdrive_service,
+        lease_file,
+        run_id,
+        batch_size,
+        copy_controller=copy_controller,
+        populate_controller=populate_controller,
+    )
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+    input_mode = sys.argv[1] if arg_count > 0 else None
+
+    # add a run to the lease file
+    if input_mode == "enqueue":
+        if arg_count not in (7, 8, 11):
+            raise Exception(
+                "Invalid number of arguments. Expected 7, 8, or 11 "
+                "(enqueue, Lease filepath, Run ID, File Type, template URL, folder URL, "
+                "Student or Team List as JSON, or - to read NDJSON from stdin, Template Name for Weekly Templates, "
+                "and Studio Roster URL, Student Info sheet name, Team Info sheet name to personalize Weekly "
+                "Templates) got {}.".format(arg_count)
+            )
+
+        # inputs for the run
+        input_config = {
+            "file_type": sys.argv[4],
+            "template_url": sys.argv[5],
+            "folder_url": sys.argv[6],
+        }
+        if input_config["file_type"] not in FILE_TYPES:
+            raise Exception(
+                "Invalid File Type. Expected one of {} got {}.".format(
+                    list(FILE_TYPES), input_config["file_type"]
+                )
+            )
+        input_items = pipeline.parse_items_argument(sys.argv[7])
+        if input_config["file_type"] == "weekly-template":
+            if arg_count == 7:
+                raise Exception("Weekly Template runs need a Template Name.")
+            input_config["template_name"] = sys.argv[8]
+        elif arg_count != 7:
+            raise Exception("Only Weekly Template runs take a Template Name.")
+
+        # store each team's info in its job, so workers personalize decks without fetching the roster
+        if arg_count == 11:
+            input_config["personalize"] = True
+            with create_weekly_templates.open_team_info_lookup(
+                sys.argv[9], sys.argv[10], sys.argv[11]
+            ) as find_team_info:
+                enqueue(
+                    sys.argv[2],
+                    sys.argv[3],
+                    input_config,
+                    add_team_info(input_items, find_team_info),
+                )
+        else:
+            enqueue(sys.argv[2], sys.argv[3], input_config, input_items)
+
+    # work on a run until it is done
+    elif input_mode == "work":
+        if arg_count not in (3, 4):
+            raise Exception(
+                "Invalid number of arguments. Expected 3 or 4 "
+                "(work, Lease filepath, Run ID, optional Batch Size) got {}.".format(
+                    arg_count
+                )
+            )
+
+        input_batch_size = int(sys.argv[4]) if arg_count == 4 else DEFAULT_BATCH_SIZE
+
+        with profiling.profile_run("distributed_worker", should_profile):
+            main(sys.argv[2], sys.argv[3], input_batch_size)
+
+    # print a run's progress
+    elif input_mode == "status":
+        if arg_count != 3:
+            raise Exception(
+                "Invalid number of arguments. Expected 3 (status, Lease filepath, Run ID) got {}.".format(
+                    arg_count
+                )
+            )
+
+        print_status(sys.argv[2], sys.argv[3])
+
+    else:
+        raise Exception(
+            "Invalid mode. Expected 'enqueue', 'work', or 'status' got {}.".format(
+                input_mode
+            )
+        )
@@ -0,0 +1,307 @@
+"""
+This script is used to harvest the answers from every student's Self-Assessment into a single CSV, joined with the
+Studio Roster, so instructors do not need to open each copy by hand.
+
+Every copy in the Self-Assessment folder is read with one values.batchGet request, several copies at a time. Each
+non-empty cell in the harvested ranges becomes a column named by its sheet and cell (e.g., "Basic Info!B2").
+"""
+
+import csv
+import json
+import sys
+from gspread.utils import a1_to_rowcol, rowcol_to_a1
+import helpers.imports as helpers
+import helpers.concurrency as concurrency
+import helpers.drive as drive
+import helpers.naming as naming
+import helpers.profiling as profiling
+import roster_to_json as studio_db
+
+# kinds of generated files that can be harvested, and the ranges read from each by default
+DEFAULT_RANGES = {
+    "self-assessment": ["Basic Info", "Sprint"],
+    "mid-quarter-self-assessment": ["Basic Info"],
+}
+
+# roster columns written before the harvested cells
+ROSTER_COLUMNS = [
+    "student_name",
+    "email_address",
+    "team_name",
+    "file_name",
+    "file_url",
+]
+
+# url of a harvested file, given its id
+FILE_URL_FORMAT = "https://docs.google.com/spreadsheets/d/{id}/edit"
+
+
+def find_self_assessments(gdrive_service, folder_url, file_type):
+    """
+    Finds every Self-Assessment copy in a folder.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folder_url: string url of folder with Self-Assessments.
+    :param file_type: string "self-assessment" or "mid-quarter-self-assessment".
+    :return: list of file dicts (with id, name, and owner short name).
+    """
+    folder_id = helpers.get_folder_id_from_url(folder_url)
+
+    output = []
+    for curr_file in drive.list_files(gdrive_service, drive.folder_query(folder_id)):
+        owner = naming.match_generated_filename(curr_file["name"], file_type)
+        if owner is not None:
+            output.append(dict(curr_file, owner=owner))
+
+    return output
+
+
+def parse_value_ranges(value_ranges):
+    """
+    Flattens a values.batchGet response into one value per non-empty cell.
+
+    :param value_ranges: list of valueRange dicts from a values.batchGet response, in the order ranges were requested.
+    :return: dict of (range index, row, column) to tuple of (string column name, string value).
+    """
+    output = {}
+
+    for range_index, value_range in enumerate(value_ranges):
+        # the response range is always "<sheet>!<start>:<end>", even when a whole sheet was requested
+        sheet_name, cell_range = value_range["range"].rsplit("!", 1)
+        sheet_name = sheet_name.strip("'").replace("''", "'")
+        start_row, start_col = a1_to_rowcol(cell_range.split(":")[0])
+
+        for row_offset, row in enumerate(value_range.get("values", [])):
+            for col_offset, value in enumerate(row):
+                if value == "":
+                    continue
+
+                curr_row = start_row + row_offset
+                curr_col = start_col + col_offset
+                output[(range_index, curr_row, curr_col)] = (
+                    "{sheet}!{cell}".format(
+                        sheet=sheet_name, cell=rowcol_to_a1(curr_row, curr_col)
+                    ),
+                    value,
+                )
+
+    return output
+
+
+def harvest_self_assessment(gspreadsheets_service, file_id, ranges):
+    """
+    Reads every range from a single Self-Assessment in one request.
+
+    :param gspreadsheets_service: gspread authentication object.
+    :param file_id: string id of Self-Assessment spreadsheet.
+    :param ranges: list of string A1 ranges (or sheet names) to read.
+    :return: dict from parse_value_ranges.
+    """
+    with profiling.phase("harvest"):
+        response = gspreadsheets_service.http_client.values_batch_get(file_id, ranges)
+
+    return parse_value_ranges(response.get("valueRanges", []))
+
+
+def join_with_roster(self_assessment, studio_db_dict, short_name_index):
+    """
+    Finds the roster columns for a harvested Self-Assessment.
+
+    :param self_assessment: file dict from find_self_assessments.
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param short_name_index: dict from naming.index_students_by_short_name.
+    :return: dict of roster column name to value. student columns are empty if the owner is unknown or ambiguous.
+    """
+    output = {
+        "student_name": "",
+        "email_address": "",
+        "team_name": "",
+        "file_name": self_assessment["name"],
+        "file_url": FILE_URL_FORMAT.format(id=self_assessment["id"]),
+    }
+
+    student_names = short_name_index.get(self_assessment["owner"], [])
+    if len(student_names) != 1:
+        print(
+            "Could not match {filename} to a single student ({count} matches).".format(
+                filename=self_assessment["name"], count=len(student_names)
+            )
+        )
+        return output
+
+    student_info = studio_db_dict[student_names[0]]
+    output["student_name"] = student_names[0]
+    output["email_address"] = student_info["email_address"]
+    output["team_name"] = student_info["team_info"]["team_name"]
+    return output
+
+
+def harvest_self_assessments(
+    gdrive_service,
+    gspreadsheets_service,
+    studio_db_dict,
+    folder_url,
+    file_type,
+    ranges,
+    output_file,
+):
+    """
+    Harvests every Self-Assessment in a folder into a single CSV, with one row per Self-Assessment.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param gspreadsheets_service: gspread authentication object.
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param folder_url: string url of folder with Self-Assessments.
+    :param file_type: string "self-assessment" or "mid-quarter-self-assessment".
+    :param ranges: list of string A1 ranges (or sheet names) to read from each Self-Assessment.
+    :param output_file: string filepath to write CSV to.
+    :return: int number of Self-Assessments harvested.
+    """
+    self_assessments = find_self_assessments(gdrive_service, folder_url, file_type)
+    short_name_index = naming.index_students_by_short_name(studio_db_dict.keys())
+    harvest_controller = concurrency.AdaptiveConcurrencyController("harvest")
+
+    def harvest(self_assessment):
+        try:
+            cells = harvest_controller.call(
+                harvest_self_assessment,
+                gspreadsheets_service,
+                self_assessment["id"],
+                ranges,
+            )
+        except Exception as error:
+            print("Could not harvest {}: {}".format(self_assessment["name"], error))
+            return None
+
+        return (
+            join_with_roster(self_assessment, studio_db_dict, short_name_index),
+            cells,
+        )
+
+    # read several Self-Assessments at a time
+    rows = [
+        result
+        for result in concurrency.run_concurrently(
+            harvest, self_assessments, harvest_controller.max_limit
+        )
+        if result is not None
+    ]
+
+    # every cell that is filled in any Self-Assessment gets a column, in sheet order
+    cell_columns = {}
+    for _, cells in rows:
+        for cell_key, (column_name, _) in cells.items():
+            cell_columns[cell_key] = column_name
+    fieldnames = ROSTER_COLUMNS + [
+        cell_columns[cell_key] for cell_key in sorted(cell_columns.keys())
+    ]
+
+    # write rows sorted by student, so the CSV is stable between runs
+    rows.sort(key=lambda row: (row[0]["student_name"], row[0]["file_name"]))
+    with open(output_file, "w", newline="") as outfile:
+        writer = csv.DictWriter(outfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for roster_columns, cells in rows:
+            writer.writerow(
+                dict(
+                    roster_columns,
+                    **{column_name: value for column_name, value in cells.values()}
+                )
+            )
+
+    print(harvest_controller.summary())
+    print(
+        "Harvested {harvested} of {total} Self-Assessments to {path}.".format(
+            harvested=len(rows), total=len(self_assessments), path=output_file
+        )
+    )
+    return len(rows)
+
+
+def main(
+    file_type,
+    folder_url,
+    output_file,
+    roster_spreadsheet_url,
+    student_info_sheet_name,
+    team_info_sheet_name,
+    ranges=None,
+):
+    """
+    Fetches info from Studio Roster, and uses it to harvest every Self-Assessment in a folder into a CSV.
+
+    :param file_type: string "self-assessment" or "mid-quarter-self-assessment".
+    :param folder_url: string url of folder with Self-Assessments.
+    :param output_file: string filepath to write CSV to.
+    :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet.
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :param ranges: optional list of string A1 ranges (or sheet names) to read. defaults to DEFAULT_RANGES.
+    :return: int number of Self-Assessments harvested.
+    """
+    # authenticate for Google Drive v3 and Google Spreadsheets APIs
+    gdrive_service = helpers.auth_gdrive()
+    gspreadsheets_service = helpers.auth_gsheets()
+
+    # generate studio database from roster
+    studio_db_dict = studio_db.main(
+        roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+    )
+
+    return harvest_self_assessments(
+        gdrive_service,
+        gspreadsheets_service,
+        studio_db_dict,
+        folder_url,
+        file_type,
+        ranges if ranges is not None else DEFAULT_RANGES[file_type],
+        output_file,
+    )
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count not in (6, 7):
+        raise Exception(
+            "Invalid number of arguments. Expected 6 or 7 "
+            "(File Type, Self-Assessment folder URL, Output CSV filepath, "
+            "Studio Roster URL, Student Info sheet name, Team Info sheet name, optional Ranges list) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for harvesting self-assessments
+    input_file_type = sys.argv[1]
+    input_folder_url = sys.argv[2]
+    input_output_file = sys.argv[3]
+    input_ranges = json.loads(sys.argv[7]) if arg_count == 7 else None
+
+    # inputs for generating studio database
+    input_studio_db_url = sys.argv[4]
+    input_student_info_sheet_name = sys.argv[5]
+    input_team_info_sheet_name = sys.argv[6]
+
+    # check for a known file type
+    if input_file_type not in DEFAULT_RANGES:
+        raise Exception(
+            "Invalid File Type. Expected one of {} got {}.".format(
+                list(DEFAULT_RANGES.keys()), input_file_type
+            )
+        )
+
+    with profiling.profile_run("harvest_self_assessments", should_profile):
+        main(
+            input_file_type,
+            input_folder_url,
+            input_output_file,
+            input_studio_db_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+            input_ranges,
+        )
@@ -0,0 +1,240 @@
+"""
+This module includes an adaptive (AIMD) concurrency controller for stages that call Google APIs, and a runner that
+calls a function for many items at once. The controller raises the number of calls in flight while calls are fast
+and succeed, and cuts it back when Google starts throttling, so runs stay near the highest sustainable throughput
+without tuning a worker count by hand.
+"""
+
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import gspread
+import requests
+from googleapiclient import errors
+
+import helpers.drive as drive
+import helpers.profiling as profiling
+
+# defaults for the number of calls in flight
+DEFAULT_INITIAL_LIMIT = 4
+DEFAULT_MIN_LIMIT = 1
+DEFAULT_MAX_LIMIT = 32
+
+# calls slower than this multiple of the fastest call seen are unhealthy, so concurrency stops increasing
+DEFAULT_LATENCY_TOLERANCE = 3.0
+
+# concurrency is multiplied by this factor when calls are throttled
+DEFAULT_DECREASE_FACTOR = 0.5
+
+# number of times a throttled call is retried before giving up
+DEFAULT_MAX_RETRIES = 6
+
+# weight of each new limit when smoothing the limit reported as the settled concurrency
+SETTLED_LIMIT_WEIGHT = 0.1
+
+
+def is_throttling_error(error):
+    """
+    Checks if an error from a Google API means the call was throttled (or the server was overloaded).
+
+    :param error: exception raised by a Google API call.
+    :return: boolean whether the call should be retried with less concurrency.
+    """
+    if isinstance(error, errors.HttpError):
+        return drive.is_retryable_error(error)
+
+    if isinstance(error, gspread.exceptions.APIError):
+        status = error.response.status_code
+        return status == 429 or status >= 500
+
+    # raw requests (e.g., streamed downloads) report rate limits the same way as the Google Drive API
+    if isinstance(error, requests.exceptions.HTTPError):
+        status = error.response.status_code
+        if status == 429 or status >= 500:
+            return True
+        return status == 403 and b"ratelimitexceeded" in error.response.content.lower()
+
+    return False
+
+
+class AdaptiveConcurrencyController:
+    """
+    Limits the number of calls in flight, adjusting the limit with additive increase / multiplicative decrease.
+    """
+
+    def __init__(
+        self,
+        name,
+        initial_limit=DEFAULT_INITIAL_LIMIT,
+        min_limit=DEFAULT_MIN_LIMIT,
+        max_limit=DEFAULT_MAX_LIMIT,
+        latency_tolerance=DEFAULT_LATENCY_TOLERANCE,
+        decrease_factor=DEFAULT_DECREASE_FACTOR,
+    ):
+        """
+        :param name: string name of the stage being controlled (e.g., "copy"), used in the run summary.
+        :param initial_limit: int number of calls allowed in flight at the start.
+        :param min_limit: int fewest calls allowed in flight.
+        :param max_limit: int most calls allowed in flight.
+        :param latency_tolerance: float multiple of the fastest call seen above which calls are unhealthy.
+        :param decrease_factor: float factor to multiply the limit by when calls are throttled.
+        """
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.decrease_factor = decrease_factor
+
+        # stats for the run summary
+        self.settled_limit = float(initial_limit)
+        self.completed_count = 0
+        self.throttled_count = 0
+        self.error_count = 0
+
+        self._in_flight = 0
+        self._fastest_latency = None
+        self._last_decrease_time = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+        """
+        Waits until another call is allowed in flight.
+
+        :return: float time the call started, to pass to release.
+        """
+        with self._condition:
+            while self._in_flight >= int(self.limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+        return time.monotonic()
+
+    def release(self, start_time, outcome):
+        """
+        Records the outcome of a call, and adjusts the limit.
+
+        :param start_time: float time the call started, from acquire.
+        :param outcome: string "success", "throttled", or "error".
+        :return: None
+        """
+        latency = time.monotonic() - start_time
+
+        with self._condition:
+            self._in_flight -= 1
+
+            if outcome == "throttled":
+                self.throttled_count += 1
+
+                # calls that started before the last decrease were sent at the old limit, so don't decrease again
+                if start_time > self._last_decrease_time:
+                    self.limit = max(self.min_limit, self.limit * self.decrease_factor)
+                    self._last_decrease_time = time.monotonic()
+
+            elif outcome == "success":
+                self.completed_count += 1
+                if self._fastest_latency is None or latency < self._fastest_latency:
+                    self._fastest_latency = latency
+
+                # increase by about one call for every limit's worth of fast, successful calls
+                if latency <= self._fastest_latency * self.latency_tolerance:
+                    self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+            else:
+                self.error_count += 1
+
+            self.settled_limit += SETTLED_LIMIT_WEIGHT * (
+                self.limit - self.settled_limit
+            )
+            self._condition.notify_all()
+
+    def call(self, function, *args, max_retries=DEFAULT_MAX_RETRIES, **kwargs):
+        """
+        Calls a function once a call is allowed in flight, retrying with backoff if the call is throttled.
+
+        :param function: function that makes a Google API call.
+        :param args: positional arguments for function.
+        :param max_retries: int number of times to retry a throttled call before raising its error.
+        :param kwargs: keyword arguments for function.
+        :return: return value of function.
+        """
+        attempt = 0
+
+        while True:
+            start_time = self.acquire()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as error:
+                throttled = is_throttling_error(error)
+                self.release(start_time, "throttled" if throttled else "error")
+
+                if not throttled or attempt >= max_retries:
+                    raise
+
+                # back off exponentially (with jitter) before retrying
+                with profiling.phase("throttle backoff"):
+                    time.sleep(min(2**attempt, 32) + random.random())
+                attempt += 1
+                continue
+
+            self.release(start_time, "success")
+            return result
+
+    def summary(self):
+        """
+        :return: string summary of the calls made and the concurrency the controller settled on.
+        """
+        return "{name}: {completed} calls, settled concurrency {limit} ({throttled} throttled, {errors} errors)".format(
+            name=self.name,
+            completed=self.completed_count,
+            limit=round(self.settled_limit),
+            throttled=self.throttled_count,
+            errors=self.error_count,
+        )
+
+
+def get_pool_size(*controllers):
+    """
+    Gets the number of pooled connections needed for every controller to have its most calls in flight at once, so
+    that no call waits for (or opens and throws away) a connection beyond the pool.
+
+    :param controllers: AdaptiveConcurrencyController for each stage that shares the connection pool.
+    :return: int number of keep-alive connections to pool per host.
+    """
+    return sum(controller.max_limit for controller in controllers)
+
+
+def run_concurrently(function, items, max_workers):
+    """
+    Calls a function for each item on a pool of threads, yielding results as they finish. Items are only taken from
+    the iterable as threads free up, so it can be a lazily-read stream.
+
+    :param function: function to call with each item. concurrency is usually limited inside it by a controller.
+    :param items: iterable of items.
+    :param max_workers: int number of threads (and so the most items in progress at once).
+    :return: generator of function results, in the order they finish.
+    """
+    items = iter(items)
+    items_remaining = True
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = set()
+
+        while True:
+            # keep every thread busy, without reading ahead of them
+            while items_remaining and len(pending) < max_workers:
+                try:
+                    item = next(items)
+                except StopIteration:
+                    items_remaining = False
+                    break
+                pending.add(executor.submit(function, item))
+
+            if len(pending) == 0:
+                return
+
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
@@ -0,0 +1,178 @@
+"""
+This module includes a credential manager that keeps Google API credentials fresh in the background, so that long runs
+never stall on a token refresh, and library functions for storing OAuth tokens as JSON.
+"""
+
+import datetime
+import os
+import threading
+
+from google.oauth2.credentials import Credentials
+
+# refresh tokens this many seconds before they expire (google-auth treats tokens as expired a few minutes early)
+DEFAULT_REFRESH_MARGIN = 600
+
+# minimum number of seconds between background refresh attempts, including retries after a failed refresh
+MIN_REFRESH_INTERVAL = 30
+
+# how often to check credentials that do not report an expiry
+UNKNOWN_EXPIRY_INTERVAL = 300
+
+# credential managers are shared by every client (and worker thread) in a run
+_managers_lock = threading.Lock()
+_managers = {}
+
+
+def load_token(token_path, scopes):
+    """
+    Loads OAuth user credentials saved as JSON.
+
+    :param token_path: string filepath of saved token.
+    :param scopes: list of string scopes the credentials are used for.
+    :return: google.oauth2 Credentials if the token exists. None otherwise.
+    """
+    if not os.path.exists(token_path):
+        return None
+
+    return Credentials.from_authorized_user_file(token_path, scopes)
+
+
+def save_token(credentials, token_path):
+    """
+    Saves OAuth user credentials as JSON. The file is replaced atomically so readers never see a partial token.
+
+    :param credentials: google.oauth2 Credentials to save.
+    :param token_path: string filepath to save token to.
+    :return: None
+    """
+    temp_path = "{path}.tmp".format(path=token_path)
+    with open(temp_path, "w") as token:
+        token.write(credentials.to_json())
+    os.replace(temp_path, token_path)
+
+
+class CredentialManager:
+    """
+    Keeps a set of credentials valid by refreshing them on a background thread before they expire.
+    """
+
+    def __init__(
+        self,
+        credentials,
+        refresh_request,
+        token_path=None,
+        refresh_margin=DEFAULT_REFRESH_MARGIN,
+    ):
+        """
+        :param credentials: google.auth credentials to keep valid.
+        :param refresh_request: google.auth transport Request used to refresh credentials.
+        :param token_path: optional string filepath to save refreshed OAuth user tokens to.
+        :param refresh_margin: int number of seconds before expiry to refresh credentials.
+        """
+        self.credentials = credentials
+        self.refresh_request = refresh_request
+        self.token_path = token_path
+        self.refresh_margin = refresh_margin
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def seconds_until_refresh(self):
+        """
+        Calculates how long until the credentials should be refreshed.
+
+        :return: float number of seconds (zero or less if a refresh is due). None if the expiry is unknown.
+        """
+        if not self.credentials.token:
+            return 0
+
+        if self.credentials.expiry is None:
+            return None
+
+        # google-auth stores expiry as a naive UTC datetime
+        now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        return (self.credentials.expiry - now).total_seconds() - self.refresh_margin
+
+    def refresh_if_needed(self):
+        """
+        Refreshes the credentials if they are about to expire. Safe to call from any thread.
+
+        :return: boolean whether the credentials were refreshed.
+        """
+        with self._lock:
+            remaining = self.seconds_until_refresh()
+            if remaining is None or remaining > 0:
+                return False
+
+            self.credentials.refresh(self.refresh_request)
+
+            if self.token_path is not None:
+                save_token(self.credentials, self.token_path)
+
+            return True
+
+    def start(self):
+        """
+        Makes sure the credentials are valid, then starts refreshing them in the background.
+
+        :return: this CredentialManager.
+        """
+        self.refresh_if_needed()
+
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._refresh_loop, name="credential-refresh", daemon=True
+            )
+            self._thread.start()
+
+        return self
+
+    def stop(self):
+        """
+        Stops refreshing credentials in the background.
+
+        :return: None
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _refresh_loop(self):
+        """
+        Sleeps until the credentials are due for a refresh, then refreshes them, until stopped.
+
+        :return: None
+        """
+        while not self._stop_event.is_set():
+            remaining = self.seconds_until_refresh()
+            if remaining is None:
+                wait_time = UNKNOWN_EXPIRY_INTERVAL
+            else:
+                wait_time = max(remaining, MIN_REFRESH_INTERVAL)
+
+            # stop waiting early if the manager is stopped
+            if self._stop_event.wait(wait_time):
+                break
+
+            # a failed refresh is retried on the next loop, while the current token is still valid
+            try:
+                self.refresh_if_needed()
+            except Exception as error:
+                print("Could not refresh credentials: {}".format(error))
+
+
+def get_credential_manager(name, create_manager):
+    """
+    Gets the running credential manager for a set of credentials, creating and starting it if needed.
+
+    :param name: string name identifying the credentials (e.g., "gdrive").
+    :param create_manager: function that returns a new CredentialManager for the credentials.
+    :return: running CredentialManager shared by every caller in this run.
+    """
+    with _managers_lock:
+        if name not in _managers:
+            _managers[name] = create_manager().start()
+
+        return _managers[name]
@@ -0,0 +1,186 @@
+"""
+This module includes library functions for listing files and batching requests with the Google Drive v3 API.
+"""
+
+import random
+import time
+
+from googleapiclient import errors
+
+import helpers.profiling as profiling
+
+# maximum number of calls that Google Drive accepts in a single batch request
+MAX_BATCH_SIZE = 100
+
+# mime type used by Google Drive for folders
+FOLDER_MIME_TYPE = "application/vnd.google-apps.folder"
+
+# number of folders listed in each files.list query, to keep queries well under Google's length limit
+FOLDERS_PER_QUERY = 20
+
+
+def folder_query(folder_id):
+    """
+    Creates a files.list query for all (non-trashed) files directly inside a folder.
+
+    :param folder_id: string id of Google Drive folder.
+    :return: string query for files.list.
+    """
+    return "'{folder_id}' in parents and trashed = false".format(folder_id=folder_id)
+
+
+def folders_query(folder_ids):
+    """
+    Creates a files.list query for all (non-trashed) files directly inside any of several folders, so they can be
+    listed together.
+
+    :param folder_ids: list of string ids of Google Drive folders.
+    :return: string query for files.list.
+    """
+    parents = " or ".join(
+        "'{folder_id}' in parents".format(folder_id=folder_id)
+        for folder_id in folder_ids
+    )
+    return "({parents}) and trashed = false".format(parents=parents)
+
+
+def list_files(service, query, fields="id, name", page_size=1000):
+    """
+    Lists every file matching a query, following pagination until all pages have been fetched.
+
+    :param service: Google Drive v3 authentication object.
+    :param query: string files.list query (e.g., from folder_query).
+    :param fields: string fields mask for each returned file.
+    :param page_size: int number of files to request per page.
+    :return: list of file dicts with the requested fields.
+    """
+    output = []
+    page_token = None
+
+    while True:
+        response = (
+            service.files()
+            .list(
+                q=query,
+                fields="nextPageToken, files({fields})".format(fields=fields),
+                pageSize=page_size,
+                pageToken=page_token,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+            )
+            .execute()
+        )
+        output.extend(response.get("files", []))
+
+        # stop once there are no more pages
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+
+    return output
+
+
+def list_files_in_folders(
+    service, folder_ids, extra_query=None, fields="id, name, parents"
+):
+    """
+    Lists every file directly inside any of several folders, using one files.list query per FOLDERS_PER_QUERY folders.
+
+    :param service: Google Drive v3 authentication object.
+    :param folder_ids: list of string ids of Google Drive folders.
+    :param extra_query: optional string condition every file must also match (e.g., a mimeType condition).
+    :param fields: string fields mask for each returned file. include parents to tell which folder a file is in.
+    :return: list of file dicts with the requested fields.
+    """
+    output = []
+    for start in range(0, len(folder_ids), FOLDERS_PER_QUERY):
+        query = folders_query(folder_ids[start : start + FOLDERS_PER_QUERY])
+        if extra_query is not None:
+            query = "{query} and {extra_query}".format(
+                query=query, extra_query=extra_query
+            )
+        output.extend(list_files(service, query, fields=fields))
+
+    return output
+
+
+def is_retryable_error(error):
+    """
+    Checks if an error from the Google Drive API is a rate limit or server error that is worth retrying.
+
+    :param error: googleapiclient HttpError.
+    :return: boolean whether the request should be retried after backing off.
+    """
+    status = int(error.resp.status)
+    if status == 429 or status >= 500:
+        return True
+
+    # Drive reports most rate limits (including sharing limits) as 403s with a *RateLimitExceeded reason
+    return status == 403 and b"ratelimitexceeded" in (error.content or b"").lower()
+
+
+def execute_batched(service, requests, chunk_size=MAX_BATCH_SIZE, max_retries=5):
+    """
+    Executes requests using Google Drive batch requests, retrying any calls that were rate limited.
+
+    :param service: Google Drive v3 authentication object.
+    :param requests: list of (key, HttpRequest) tuples. keys are used to report responses and errors.
+    :param chunk_size: int maximum number of calls to send in each batch request.
+    :param max_retries: int number of times to retry rate limited calls before giving up.
+    :return: tuple of (dict of key to response, dict of key to error) for successful and failed calls.
+    """
+    responses = {}
+    failures = {}
+
+    # batch request ids must be unique strings, so map them back to the caller's keys
+    pending = list(requests)
+    attempt = 0
+
+    while pending:
+        retry_list = []
+
+        for chunk_start in range(0, len(pending), chunk_size):
+            chunk = {
+                str(chunk_start + offset): key_request
+                for offset, key_request in enumerate(
+                    pending[chunk_start : chunk_start + chunk_size]
+                )
+            }
+
+            def callback(request_id, response, exception, chunk=chunk):
+                key, request = chunk[request_id]
+                if exception is None:
+                    responses[key] = response
+                elif isinstance(exception, errors.HttpError) and is_retryable_error(
+                    exception
+                ):
+                    retry_list.append((key, request))
+                    failures[key] = exception
+                else:
+                    failures[key] = exception
+
+            batch = service.new_batch_http_request(callback=callback)
+            for request_id, (key, request) in chunk.items():
+                batch.add(request, request_id=request_id)
+
+            # the whole batch can be rejected (e.g., when rate limited), in which case retry all of its calls
+            try:
+                batch.execute()
+            except errors.HttpError as error:
+                for key, request in chunk.values():
+                    failures[key] = error
+                    if is_retryable_error(error):
+                        retry_list.append((key, request))
+
+        # back off exponentially (with jitter) before retrying rate limited calls
+        if retry_list and attempt < max_retries:
+            with profiling.phase("throttle backoff"):
+                time.sleep(2**attempt + random.random())
+            for key, _ in retry_list:
+                failures.pop(key, None)
+            pending = retry_list
+            attempt += 1
+        else:
+            pending = []
+
+    return responses, failures
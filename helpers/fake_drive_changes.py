@@ -0,0 +1,163 @@
+"""
+This module includes a local fake of the Google Drive changes feed, for feeding watch_roster.py hand-made changes.
+It also serves the files.list and files.copy calls the watcher makes when it generates missing files, from an
+in-memory set of files, so the watcher never reaches the real Google Drive.
+
+Run it with `python -m helpers.fake_drive_changes <port>`, set "api_endpoint" in the watcher config to
+"http://localhost:<port>", and record a change to a file with:
+
+    curl -X POST "http://localhost:<port>/_touch?fileId=<file_id>"
+"""
+
+import json
+import re
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeChangesFeed:
+    """
+    Holds an in-memory log of changed file ids. Page tokens are positions in the log.
+    """
+
+    def __init__(self):
+        self.changed_file_ids = []
+        self.request_count = 0
+        self.files_by_id = {}
+        self._lock = threading.Lock()
+
+    def touch(self, file_id):
+        """
+        Records a change to a file.
+
+        :param file_id: string id of changed file.
+        :return: None
+        """
+        with self._lock:
+            self.changed_file_ids.append(file_id)
+
+    def start_page_token(self):
+        """
+        :return: string page token for the current end of the log.
+        """
+        with self._lock:
+            self.request_count += 1
+            return str(len(self.changed_file_ids))
+
+    def list_changes(self, page_token):
+        """
+        :param page_token: string page token from a previous request.
+        :return: dict response in the same format as changes.list.
+        """
+        with self._lock:
+            self.request_count += 1
+            return {
+                "changes": [
+                    {"kind": "drive#change", "fileId": file_id}
+                    for file_id in self.changed_file_ids[int(page_token) :]
+                ],
+                "newStartPageToken": str(len(self.changed_file_ids)),
+            }
+
+    def list_files(self, query):
+        """
+        :param query: string files.list query. only the folder conditions ("'<id>' in parents") are used.
+        :return: dict response in the same format as files.list.
+        """
+        parent_ids = set(re.findall(r"'([^']+)' in parents", query))
+
+        with self._lock:
+            self.request_count += 1
+            return {
+                "files": [
+                    dict(curr_file, id=file_id)
+                    for file_id, curr_file in self.files_by_id.items()
+                    if parent_ids & set(curr_file["parents"])
+                ]
+            }
+
+    def copy_file(self, file_id, body):
+        """
+        :param file_id: string id of file to copy. it does not need to have been added to the fake first.
+        :param body: dict files.copy request body with name and parents.
+        :return: dict response in the same format as files.copy.
+        """
+        with self._lock:
+            self.request_count += 1
+            copied_file_id = "copy-{}".format(len(self.files_by_id) + 1)
+            self.files_by_id[copied_file_id] = {
+                "name": body["name"],
+                "parents": body.get("parents", []),
+            }
+            return {"id": copied_file_id, "name": body["name"]}
+
+
+def create_fake_changes_server(feed, port=0):
+    """
+    Creates (but does not start) a local http server that serves a fake changes feed.
+
+    :param feed: FakeChangesFeed to serve.
+    :param port: int port to listen on. 0 picks any free port.
+    :return: ThreadingHTTPServer. call serve_forever() to start it.
+    """
+
+    class FakeChangesHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            content = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            # the path prefix depends on how the api endpoint was configured, so only match the end
+            if url.path.endswith("/changes/startPageToken"):
+                self.send_json(200, {"startPageToken": feed.start_page_token()})
+            elif url.path.endswith("/changes"):
+                self.send_json(200, feed.list_changes(query["pageToken"][0]))
+            elif url.path.endswith("/files"):
+                self.send_json(200, feed.list_files(query.get("q", [""])[0]))
+            else:
+                self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def do_POST(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+
+            copy_match = re.search(r"/files/([^/]+)/copy$", url.path)
+            if url.path.endswith("/_touch"):
+                feed.touch(query["fileId"][0])
+                self.send_json(200, {})
+            elif copy_match is not None:
+                content_length = int(self.headers.get("Content-Length", 0))
+                body = json.loads(self.rfile.read(content_length) or b"{}")
+                self.send_json(200, feed.copy_file(copy_match.group(1), body))
+            else:
+                self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+        def log_message(self, format, *args):
+            return
+
+    return ThreadingHTTPServer(("localhost", port), FakeChangesHandler)
+
+
+if __name__ == "__main__":
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count != 1:
+        raise Exception(
+            "Invalid number of arguments. Expected 1 (Port) got {}.".format(arg_count)
+        )
+
+    # serve fake changes feed until stopped
+    input_port = int(sys.argv[1])
+    print("Serving fake Google Drive changes feed on port {}".format(input_port))
+    create_fake_changes_server(FakeChangesFeed(), input_port).serve_forever()
@@ -5,58 +5,219 @@ This module includes library functions that are useful for other scripts.
 import pickle
 import os.path
 import re
+import threading
 
 import gspread
+import httplib2
+import requests
 from googleapiclient.discovery import build
 from google_auth_oauthlib.flow import InstalledAppFlow
-from google.auth.transport.requests import Request
+from google.auth.transport.requests import AuthorizedSession, Request
+from google.oauth2 import service_account
+from requests.adapters import HTTPAdapter
+
+import helpers.concurrency as concurrency
+import helpers.credentials as credentials
+import helpers.profiling as profiling
 
 # scopes for data access: https://developers.google.com/drive/api/v3/about-auth
-# if you modify these, delete token.pickle
+# if you modify these, delete token.json
 SCOPES = [
     "https://www.googleapis.com/auth/drive",
     "https://www.googleapis.com/auth/drive.appdata",
 ]
 
+# number of keep-alive connections pooled per host. the pool is shared by every client in a run, so it fits one
+# controller's most calls in flight. runs with several controllers pass a larger size (see concurrency.get_pool_size).
+DEFAULT_POOL_SIZE = concurrency.DEFAULT_MAX_LIMIT
+
+# the shared connection pool is created by whichever client is authenticated first
+_transport_lock = threading.Lock()
+_shared_adapter = None
 
-def auth_gdrive():
+
+def get_shared_adapter(pool_size=DEFAULT_POOL_SIZE):
     """
-    Authenticates client to use the Google Drive v3 API.
+    Gets the connection pool shared by every Google API client in this run, creating it if needed.
 
-    :return: Service object with authentication for Google Drive v3 API.
+    :param pool_size: int number of keep-alive connections to pool per host. only used when creating the pool.
+    :return: requests HTTPAdapter holding the shared connection pool.
+    """
+    global _shared_adapter
+
+    with _transport_lock:
+        if _shared_adapter is None:
+            _shared_adapter = HTTPAdapter(
+                pool_connections=pool_size, pool_maxsize=pool_size
+            )
+
+    return _shared_adapter
+
+
+def create_refresh_request(pool_size=DEFAULT_POOL_SIZE):
     """
-    # store credentials
-    creds = None
+    Creates a google.auth transport request for refreshing tokens over the shared pool.
+
+    :param pool_size: int number of keep-alive connections to pool per host.
+    :return: google.auth transport Request using the shared connection pool.
+    """
+    adapter = get_shared_adapter(pool_size)
+
+    refresh_session = requests.Session()
+    refresh_session.mount("https://", adapter)
+    refresh_session.mount("http://", adapter)
+
+    return Request(refresh_session)
+
+
+def create_authorized_session(creds, pool_size=DEFAULT_POOL_SIZE):
+    """
+    Creates an authorized requests session that sends requests (including token refreshes) over the shared pool.
+
+    :param creds: google.auth credentials to authorize requests with.
+    :param pool_size: int number of keep-alive connections to pool per host.
+    :return: AuthorizedSession using the shared connection pool.
+    """
+    adapter = get_shared_adapter(pool_size)
+
+    session = AuthorizedSession(creds, auth_request=create_refresh_request(pool_size))
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+
+    return session
+
+
+class SessionHttp:
+    """
+    Adapts a requests session to the httplib2.Http interface that googleapiclient expects, so that Google API
+    discovery clients can share the pooled, thread-safe session instead of opening their own httplib2 connections.
+    """
+
+    def __init__(self, session, timeout=None):
+        """
+        :param session: requests session (usually an AuthorizedSession) to send requests with.
+        :param timeout: optional float number of seconds to wait for a response.
+        """
+        self.session = session
+        self.timeout = timeout
+
+    def request(self, uri, method="GET", body=None, headers=None, **kwargs):
+        """
+        Sends a request, returning the response the same way httplib2.Http.request does.
 
-    # the file token.pickle stores the user's access and refresh tokens, and is created automatically when the
-    # authorization flow completes for the first time.
-    if os.path.exists("token.pickle"):
-        with open("token.pickle", "rb") as token:
-            creds = pickle.load(token)
+        :param uri: string url to request.
+        :param method: string http method.
+        :param body: optional request body.
+        :param headers: optional dict of request headers.
+        :return: tuple of (httplib2.Response, bytes content).
+        """
+        response = self.session.request(
+            method, uri, data=body, headers=headers, timeout=self.timeout
+        )
 
-    # if there are no (valid) credentials available, let the user log in.
-    if not creds or not creds.valid:
-        if creds and creds.expired and creds.refresh_token:
-            creds.refresh(Request())
-        else:
+        # requests has already decoded the content, so don't pass its encoding on
+        info = {
+            key: value
+            for key, value in response.headers.items()
+            if key.lower() != "content-encoding"
+        }
+        info["status"] = str(response.status_code)
+
+        http_response = httplib2.Response(info)
+        http_response.reason = response.reason
+        return http_response, response.content
+
+
+def get_user_credentials(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Gets the user's OAuth credentials, logging in if needed.
+    Credentials are kept valid in the background for the rest of the run (see helpers.credentials).
+
+    :param pool_size: int number of keep-alive connections to pool per host.
+    :return: google.oauth2 Credentials shared by every Google API client in this run.
+    """
+
+    def create_manager():
+        # the file token.json stores the user's access and refresh tokens, and is created automatically when the
+        # authorization flow completes for the first time.
+        creds = credentials.load_token("token.json", SCOPES)
+
+        # tokens saved by earlier versions of these scripts were pickled, so convert them to json
+        if creds is None and os.path.exists("token.pickle"):
+            with open("token.pickle", "rb") as token:
+                creds = pickle.load(token)
+            credentials.save_token(creds, "token.json")
+
+        # if there are no credentials that can be refreshed, let the user log in.
+        if not creds or (not creds.valid and not creds.refresh_token):
             flow = InstalledAppFlow.from_client_secrets_file("credentials.json", SCOPES)
             creds = flow.run_local_server(port=0)
 
-        # Save the credentials for the next run
-        with open("token.pickle", "wb") as token:
-            pickle.dump(creds, token)
+            # Save the credentials for the next run
+            credentials.save_token(creds, "token.json")
+
+        return credentials.CredentialManager(
+            creds, create_refresh_request(pool_size), token_path="token.json"
+        )
+
+    return credentials.get_credential_manager("gdrive", create_manager).credentials
+
+
+def auth_gdrive(pool_size=DEFAULT_POOL_SIZE, api_endpoint=None):
+    """
+    Authenticates client to use the Google Drive v3 API.
 
+    :param pool_size: int number of keep-alive connections to pool per host.
+    :param api_endpoint: optional string url to send requests to instead of Google (e.g., a local fake for testing).
+    :return: Service object with authentication for Google Drive v3 API.
+    """
     # auth user and return the authentication service for other functions
-    return build("drive", "v3", credentials=creds)
+    with profiling.phase("auth"):
+        creds = get_user_credentials(pool_size)
 
+    with profiling.phase("build"):
+        session = create_authorized_session(creds, pool_size)
+        client_options = {"api_endpoint": api_endpoint} if api_endpoint else None
+        return build(
+            "drive", "v3", http=SessionHttp(session), client_options=client_options
+        )
+
+
+def auth_gslides(pool_size=DEFAULT_POOL_SIZE):
+    """
+    Authenticates client to use the Google Slides v1 API, with the same user credentials as Google Drive.
 
-def auth_gsheets():
+    :param pool_size: int number of keep-alive connections to pool per host.
+    :return: Service object with authentication for Google Slides v1 API.
+    """
+    with profiling.phase("auth"):
+        creds = get_user_credentials(pool_size)
+
+    with profiling.phase("build"):
+        session = create_authorized_session(creds, pool_size)
+        return build("slides", "v1", http=SessionHttp(session))
+
+
+def auth_gsheets(pool_size=DEFAULT_POOL_SIZE):
     """
     Authenticates client to read and write data to Google Spreadsheets.
+    Credentials are kept valid in the background for the rest of the run (see helpers.credentials).
 
+    :param pool_size: int number of keep-alive connections to pool per host.
     :return: gspread authentication object.
     """
-    return gspread.service_account("service_account.json")
+
+    def create_manager():
+        creds = service_account.Credentials.from_service_account_file(
+            "service_account.json", scopes=gspread.auth.DEFAULT_SCOPES
+        )
+        return credentials.CredentialManager(creds, create_refresh_request(pool_size))
+
+    # send gspread requests over the same connection pool as the Google Drive client
+    with profiling.phase("auth"):
+        manager = credentials.get_credential_manager("gsheets", create_manager)
+    session = create_authorized_session(manager.credentials, pool_size)
+    return gspread.Client(auth=manager.credentials, session=session)
 
 
 def get_file_id_from_url(file_url):
@@ -0,0 +1,65 @@
+"""
+This module includes library functions for journaling the files that scripts create in Google Drive, so that
+everything a run created can be found (and cleaned up) later.
+
+Journaling is enabled by setting the HCI_STUDIO_JOURNAL environment variable to a filepath. Each created file is
+appended to that file as a line of JSON.
+"""
+
+import json
+import os
+import threading
+
+# environment variable holding the journal filepath
+JOURNAL_ENV_VAR = "HCI_STUDIO_JOURNAL"
+
+# journal writes can come from several threads at once
+_journal_lock = threading.Lock()
+
+
+def get_journal_path():
+    """
+    Gets the journal filepath for the current run.
+
+    :return: string filepath if journaling is enabled. None otherwise.
+    """
+    return os.environ.get(JOURNAL_ENV_VAR) or None
+
+
+def record_created_file(file_id, file_name, parent_id, journal_path=None):
+    """
+    Appends a created file to the journal, if journaling is enabled.
+
+    :param file_id: string id of created file.
+    :param file_name: string name of created file.
+    :param parent_id: string id of folder the file was created in.
+    :param journal_path: optional string filepath of journal. defaults to the HCI_STUDIO_JOURNAL environment variable.
+    :return: None
+    """
+    journal_path = journal_path or get_journal_path()
+    if journal_path is None:
+        return
+
+    record = {"id": file_id, "name": file_name, "parent": parent_id}
+    with _journal_lock:
+        with open(journal_path, "a") as journal:
+            journal.write(json.dumps(record) + "\n")
+
+
+def read_journal(journal_path):
+    """
+    Reads every file recorded in a journal.
+
+    :param journal_path: string filepath of journal.
+    :return: list of dicts with the id, name, and parent of each created file.
+    """
+    output = []
+    with open(journal_path, "r") as journal:
+        for line in journal:
+            # skip blank lines, and a partially-written last line if a run was interrupted
+            try:
+                output.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+
+    return output
@@ -0,0 +1,295 @@
+"""
+This module includes a lease table, stored in a shared SQLite file, for splitting a large run across several worker
+processes (on one or more machines that can all reach the file).
+
+Each job (one student or team) is claimed by a single worker at a time with a lease that expires unless the worker
+keeps renewing it. If a worker dies, its leases expire and other workers claim its jobs again, so no work is lost.
+Claims happen inside a write transaction, so two workers never hold the same job. A job is only marked done by the
+worker currently holding its lease.
+
+SQLite relies on file locking, so the lease file must be on a filesystem where locking works (a local disk, or a
+network filesystem with working locks).
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import helpers.pipeline as pipeline
+
+# seconds a lease lasts unless it is renewed
+DEFAULT_LEASE_SECONDS = 120
+
+# seconds to wait for another worker's write transaction before giving up
+BUSY_TIMEOUT = 60
+
+# number of times a job is claimed before it is marked failed
+DEFAULT_MAX_ATTEMPTS = 3
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id TEXT PRIMARY KEY,
+    config TEXT
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    run_id TEXT,
+    job_key TEXT,
+    item TEXT,
+    status TEXT,
+    worker_id TEXT,
+    lease_expires REAL,
+    attempts INTEGER,
+    result TEXT,
+    PRIMARY KEY (run_id, job_key)
+);
+CREATE INDEX IF NOT EXISTS jobs_run_id_status ON jobs (run_id, status);
+"""
+
+
+def connect(lease_file):
+    """
+    Opens (and creates, if needed) a lease table.
+
+    :param lease_file: string filepath of SQLite lease file.
+    :return: sqlite3 connection. commits are managed by this module.
+    """
+    connection = sqlite3.connect(lease_file, timeout=BUSY_TIMEOUT, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    connection.executescript(SCHEMA)
+    return connection
+
+
+@contextmanager
+def write_transaction(connection):
+    """
+    Runs a block in a transaction that holds the database's write lock from the start, so reads inside it cannot be
+    changed by another worker before the block's writes are committed.
+
+    :param connection: sqlite3 connection from connect.
+    :return: context manager.
+    """
+    connection.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+    except BaseException:
+        connection.execute("ROLLBACK")
+        raise
+    connection.execute("COMMIT")
+
+
+def create_run(connection, run_id, config, items):
+    """
+    Adds a run and its jobs. Adding the same run again keeps its existing jobs (and their progress), and only adds
+    jobs for new items, so every worker can safely be started with the same list.
+
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :param config: dict of run config, shared by every worker (e.g., template and folder urls).
+    :param items: iterable of students or teams (see helpers/pipeline.py for item formats).
+    :return: int number of jobs added.
+    """
+    with write_transaction(connection):
+        connection.execute(
+            "INSERT OR REPLACE INTO runs VALUES (?, ?)", (run_id, json.dumps(config))
+        )
+
+        added_count = 0
+        for item in items:
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO jobs VALUES (?, ?, ?, 'pending', NULL, NULL, 0, NULL)",
+                (run_id, pipeline.get_item_name(item), json.dumps(item)),
+            )
+            added_count += cursor.rowcount
+
+    return added_count
+
+
+def get_run_config(connection, run_id):
+    """
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :return: dict of run config.
+    :raises Exception: if the run does not exist.
+    """
+    row = connection.execute(
+        "SELECT config FROM runs WHERE run_id = ?", (run_id,)
+    ).fetchone()
+
+    if row is None:
+        raise Exception("Run not found in lease file: {}".format(run_id))
+
+    return json.loads(row["config"])
+
+
+def claim_jobs(
+    connection,
+    run_id,
+    worker_id,
+    batch_size,
+    lease_seconds=DEFAULT_LEASE_SECONDS,
+    max_attempts=DEFAULT_MAX_ATTEMPTS,
+):
+    """
+    Leases a batch of pending jobs (or jobs whose lease expired) to a worker.
+
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :param worker_id: string id of worker claiming jobs.
+    :param batch_size: int maximum number of jobs to claim.
+    :param lease_seconds: float seconds until the leases expire, unless renewed.
+    :param max_attempts: int number of times a job is claimed before it is marked failed.
+    :return: list of dicts with each claimed job's job_key, item, and attempts (including this one). a job with more
+        than one attempt was claimed by a worker that may have finished part of it.
+    """
+    now = time.time()
+
+    with write_transaction(connection):
+        # jobs whose worker died too many times are not retried
+        connection.execute(
+            "UPDATE jobs SET status = 'failed' WHERE run_id = ? AND status = 'leased' AND lease_expires < ? "
+            "AND attempts >= ?",
+            (run_id, now, max_attempts),
+        )
+
+        rows = connection.execute(
+            "SELECT job_key, item, attempts FROM jobs WHERE run_id = ? "
+            "AND (status = 'pending' OR (status = 'leased' AND lease_expires < ?)) ORDER BY rowid LIMIT ?",
+            (run_id, now, batch_size),
+        ).fetchall()
+
+        connection.executemany(
+            "UPDATE jobs SET status = 'leased', worker_id = ?, lease_expires = ?, attempts = attempts + 1 "
+            "WHERE run_id = ? AND job_key = ?",
+            ((worker_id, now + lease_seconds, run_id, row["job_key"]) for row in rows),
+        )
+
+    return [
+        {
+            "job_key": row["job_key"],
+            "item": json.loads(row["item"]),
+            "attempts": row["attempts"] + 1,
+        }
+        for row in rows
+    ]
+
+
+def renew_leases(
+    connection, run_id, worker_id, job_keys, lease_seconds=DEFAULT_LEASE_SECONDS
+):
+    """
+    Extends a worker's leases on jobs it is still working on.
+
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :param worker_id: string id of worker holding the leases.
+    :param job_keys: list of string job keys to renew.
+    :param lease_seconds: float seconds from now until the leases expire.
+    :return: int number of leases renewed. leases lost to another worker are not renewed.
+    """
+    with write_transaction(connection):
+        cursor = connection.executemany(
+            "UPDATE jobs SET lease_expires = ? WHERE run_id = ? AND job_key = ? AND worker_id = ? "
+            "AND status = 'leased'",
+            (
+                (time.time() + lease_seconds, run_id, job_key, worker_id)
+                for job_key in job_keys
+            ),
+        )
+
+    return cursor.rowcount
+
+
+def complete_job(connection, run_id, worker_id, job_key, result):
+    """
+    Marks a job done, if the worker still holds its lease.
+
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :param worker_id: string id of worker holding the lease.
+    :param job_key: string job key.
+    :param result: dict result record to store with the job.
+    :return: boolean whether the job was marked done. False if the lease was lost to another worker.
+    """
+    with write_transaction(connection):
+        cursor = connection.execute(
+            "UPDATE jobs SET status = 'done', result = ?, lease_expires = NULL "
+            "WHERE run_id = ? AND job_key = ? AND worker_id = ? AND status = 'leased'",
+            (json.dumps(result), run_id, job_key, worker_id),
+        )
+
+    return cursor.rowcount == 1
+
+
+def release_job(
+    connection, run_id, worker_id, job_key, max_attempts=DEFAULT_MAX_ATTEMPTS
+):
+    """
+    Gives up a job that failed, so another worker (or this one) can retry it, unless it has been tried too many times.
+
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :param worker_id: string id of worker holding the lease.
+    :param job_key: string job key.
+    :param max_attempts: int number of times a job is claimed before it is marked failed.
+    :return: None
+    """
+    with write_transaction(connection):
+        connection.execute(
+            "UPDATE jobs SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+            "worker_id = NULL, lease_expires = NULL "
+            "WHERE run_id = ? AND job_key = ? AND worker_id = ? AND status = 'leased'",
+            (max_attempts, run_id, job_key, worker_id),
+        )
+
+
+def count_jobs(connection, run_id):
+    """
+    :param connection: sqlite3 connection from connect.
+    :param run_id: string id of run.
+    :return: dict of status ("pending", "leased", "done", "failed") to int number of jobs.
+    """
+    output = {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+    for row in connection.execute(
+        "SELECT status, COUNT(*) AS job_count FROM jobs WHERE run_id = ? GROUP BY status",
+        (run_id,),
+    ):
+        output[row["status"]] = row["job_count"]
+
+    return output
+
+
+@contextmanager
+def keep_leases_alive(
+    lease_file, run_id, worker_id, job_keys, lease_seconds=DEFAULT_LEASE_SECONDS
+):
+    """
+    Renews a worker's leases in the background while a block runs, so long batches do not lose their leases. The
+    thread uses its own connection, since SQLite connections cannot be shared between threads.
+
+    :param lease_file: string filepath of SQLite lease file.
+    :param run_id: string id of run.
+    :param worker_id: string id of worker holding the leases.
+    :param job_keys: list of string job keys to renew.
+    :param lease_seconds: float seconds each renewal extends the leases by.
+    :return: context manager.
+    """
+    stop_event = threading.Event()
+
+    def renew_loop():
+        connection = connect(lease_file)
+        try:
+            # renew well before the leases expire, so one slow renewal does not lose them
+            while not stop_event.wait(lease_seconds / 3):
+                renew_leases(connection, run_id, worker_id, job_keys, lease_seconds)
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=renew_loop, name="lease renewal", daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop_event.set()
+        thread.join()
@@ -0,0 +1,132 @@
+"""
+This module includes an assignment engine that places students into Mysore sessions, given each student's parsed
+availability and each session's capacity.
+
+Assignments are a maximum matching: as many students as possible get a session they are available for. Students are
+placed one at a time. If none of a student's sessions has room, the engine searches for a chain of moves (e.g., move a
+student from Mon 10am to Tue 2pm, freeing a seat in Mon 10am) that ends in a session with room, using a breadth-first
+search over sessions. A student no chain can make room for cannot be placed by any assignment, without unplacing
+someone else. The sessions that search reached stay full, and no placed student can ever move out of them, so later
+searches skip them.
+
+The search runs over sessions rather than students: for each pair of sessions, the engine keeps the students placed
+in the first who are also available for the second. Each search is bounded by the number of session pairs, so
+thousands of students and dozens of sessions are assigned in milliseconds.
+"""
+
+from collections import deque
+
+
+def _place(student, session, placements, movable, availability):
+    """
+    Places a student in a session, updating which students can move between sessions.
+
+    :param student: string student name.
+    :param session: string session name.
+    :param placements: dict of student name to session name, updated in place.
+    :param movable: dict of from session to dict of to session to set of students placed in from session who are
+        available for to session, updated in place.
+    :param availability: dict of student name to list of session names.
+    :return: None
+    """
+    previous_session = placements.get(student)
+    for other_session in availability[student]:
+        if previous_session is not None and other_session != previous_session:
+            movable[previous_session][other_session].discard(student)
+        if other_session != session:
+            movable[session].setdefault(other_session, set()).add(student)
+
+    placements[student] = session
+
+
+def _find_move_chain(sources, remaining, movable, full_sessions):
+    """
+    Finds the shortest chain of sessions, starting from any of sources and ending in a session with room, where a
+    student can move from each session to the next. If there is no chain, every session the search reached is added
+    to full_sessions.
+
+    :param sources: list of string session names to start from.
+    :param remaining: dict of session name to int number of open seats.
+    :param movable: dict of from session to dict of to session to set of movable students.
+    :param full_sessions: set of session names that can never make room, updated in place.
+    :return: list of session names from a source to a session with room, or None if there is no such chain.
+    """
+    parents = {source: None for source in sources if source not in full_sessions}
+    queue = deque(parents.keys())
+
+    while queue:
+        curr_session = queue.popleft()
+        for next_session, movable_students in movable[curr_session].items():
+            if (
+                not movable_students
+                or next_session in parents
+                or next_session in full_sessions
+            ):
+                continue
+
+            parents[next_session] = curr_session
+            if remaining[next_session] > 0:
+                # walk back to the source to get the chain in order
+                chain = [next_session]
+                while parents[chain[-1]] is not None:
+                    chain.append(parents[chain[-1]])
+                return chain[::-1]
+
+            queue.append(next_session)
+
+    full_sessions.update(parents.keys())
+    return None
+
+
+def assign_sessions(availability, capacities):
+    """
+    Assigns as many students as possible to a session they are available for, without going over any session's
+    capacity.
+
+    :param availability: dict of student name to list of string session names the student is available for.
+        sessions that are not in capacities are ignored.
+    :param capacities: dict of session name to int number of students it can hold.
+    :return: dict of student name to string session name, or None if the student could not be placed.
+    """
+    remaining = dict(capacities)
+    placements = {}
+    movable = {session: {} for session in capacities}
+    full_sessions = set()
+
+    # only sessions with a capacity can be assigned
+    availability = {
+        student: [session for session in student_sessions if session in capacities]
+        for student, student_sessions in availability.items()
+    }
+
+    # place students with the fewest options first, so the direct placements need fewer chains of moves later
+    for student in sorted(
+        availability, key=lambda student: (len(availability[student]), student)
+    ):
+        student_sessions = availability[student]
+        if not student_sessions:
+            continue
+
+        # place directly in the emptiest session with room
+        open_sessions = [
+            session for session in student_sessions if remaining[session] > 0
+        ]
+        if open_sessions:
+            session = max(open_sessions, key=lambda session: remaining[session])
+            _place(student, session, placements, movable, availability)
+            remaining[session] -= 1
+            continue
+
+        # otherwise make room with a chain of moves that ends in a session with room
+        chain = _find_move_chain(student_sessions, remaining, movable, full_sessions)
+        if chain is None:
+            continue
+
+        # move one student along each step of the chain, starting from the end so each move has a seat
+        for from_session, to_session in reversed(list(zip(chain, chain[1:]))):
+            moved_student = next(iter(movable[from_session][to_session]))
+            _place(moved_student, to_session, placements, movable, availability)
+        remaining[chain[-1]] -= 1
+        _place(student, chain[0], placements, movable, availability)
+
+    return {student: placements.get(student) for student in availability}
@@ -0,0 +1,158 @@
+"""
+This module includes the filename conventions used by the generator scripts, so that other scripts can map
+generated files back to the students and teams in the Studio Roster.
+"""
+
+import re
+
+# regex patterns for each kind of generated file. the "owner" group is a student's short name (first name and last
+# initial) for per-student files, or a team name for per-team files.
+GENERATED_FILE_PATTERNS = {
+    "ipm": re.compile(r"^\[(?P<owner>[^\]]+)\] Individual Progress Map \(IPM\)$"),
+    "self-assessment": re.compile(
+        r"^(?P<owner>.+?) -- HCI Studio EOQ Self-Assessment$"
+    ),
+    "mid-quarter-self-assessment": re.compile(
+        r"^(?P<owner>.+?) -- Mid-Quarter Self-Assessment$"
+    ),
+    "in-class-activity": re.compile(
+        r"^\[(?P<owner>[^\]]+)\] Steve Jobs iPhone Activity -- Design Argument$"
+    ),
+    "weekly-template": re.compile(r"^\[(?P<owner>[^\]]+)\] (?P<template_name>.+)$"),
+}
+
+# whether each kind of generated file belongs to a single student or to a project team
+GENERATED_FILE_OWNERS = {
+    "ipm": "student",
+    "self-assessment": "student",
+    "mid-quarter-self-assessment": "student",
+    "in-class-activity": "student",
+    "weekly-template": "team",
+}
+
+
+def student_short_name(student_name):
+    """
+    Creates the short name used in generated filenames from a student's full name.
+
+    :param student_name: string full name of student.
+    :return: string of student's first name and last initial (e.g., "John D.").
+    """
+    student_name_split = student_name.split(" ")
+    return "{first} {lasti}.".format(
+        first=student_name_split[0], lasti=student_name_split[-1][0]
+    )
+
+
+def ipm_filename(student_name):
+    """
+    Creates the filename for a student's Individual Progress Map.
+
+    :param student_name: string full name of student.
+    :return: string filename.
+    """
+    return "[{short_name}] Individual Progress Map (IPM)".format(
+        short_name=student_short_name(student_name)
+    )
+
+
+def self_assessment_filename(student_name):
+    """
+    Creates the filename for a student's end-of-quarter Self-Assessment.
+
+    :param student_name: string full name of student.
+    :return: string filename.
+    """
+    return "{short_name} -- HCI Studio EOQ Self-Assessment".format(
+        short_name=student_short_name(student_name)
+    )
+
+
+def mid_quarter_self_assessment_filename(student_name):
+    """
+    Creates the filename for a student's Mid-Quarter Self-Assessment.
+
+    :param student_name: string full name of student.
+    :return: string filename.
+    """
+    return "{short_name} -- Mid-Quarter Self-Assessment".format(
+        short_name=student_short_name(student_name)
+    )
+
+
+def activity_filename(student_name):
+    """
+    Creates the filename for a student's In-Class Activity.
+
+    :param student_name: string full name of student.
+    :return: string filename.
+    """
+    return "[{short_name}] Steve Jobs iPhone Activity -- Design Argument".format(
+        short_name=student_short_name(student_name)
+    )
+
+
+def weekly_template_filename(team_name, template_name):
+    """
+    Creates the filename for a project team's Weekly Template.
+
+    :param team_name: string name of project team.
+    :param template_name: string name of weekly template.
+    :return: string filename.
+    """
+    return "[{team_name}] {template_name}".format(
+        team_name=team_name, template_name=template_name
+    )
+
+
+def match_generated_filename(filename, file_type):
+    """
+    Checks if a filename follows the naming convention for a kind of generated file.
+
+    :param filename: string name of a file in Google Drive.
+    :param file_type: string kind of generated file (key of GENERATED_FILE_PATTERNS).
+    :return: string owner (student short name or team name) if the filename matches. None otherwise.
+    """
+    # weekly templates use the most general pattern, so make sure the file is not another kind of generated file
+    if file_type == "weekly-template" and any(
+        pattern.match(filename)
+        for curr_type, pattern in GENERATED_FILE_PATTERNS.items()
+        if curr_type != file_type
+    ):
+        return None
+
+    results = GENERATED_FILE_PATTERNS[file_type].match(filename)
+
+    if results:
+        return results.group("owner")
+
+    return None
+
+
+def find_generated_file_type(filename):
+    """
+    Finds which kind of generated file a filename is, if any.
+
+    :param filename: string name of a file in Google Drive.
+    :return: tuple of (string kind of generated file, string owner), or None if the filename is not a generated file.
+    """
+    for file_type in GENERATED_FILE_PATTERNS:
+        owner = match_generated_filename(filename, file_type)
+        if owner is not None:
+            return file_type, owner
+
+    return None
+
+
+def index_students_by_short_name(student_names):
+    """
+    Creates a lookup from the short names used in generated filenames to students' full names.
+
+    :param student_names: iterable of string full names of students.
+    :return: dict of short name to list of full names. lists with more than one name are ambiguous.
+    """
+    output = {}
+    for student_name in student_names:
+        output.setdefault(student_short_name(student_name), []).append(student_name)
+
+    return output
@@ -0,0 +1,125 @@
+"""
+This module includes library functions for streaming students and teams into the generators, and for the result
+records the generators yield, so scripts can be composed without building intermediate lists.
+
+Generators accept any iterable of items, where each item is one of:
+    - a string name (e.g., "John Doe").
+    - a dict with a "name" key (e.g., a line of NDJSON).
+    - a (name, info) tuple (e.g., from roster_to_json.iter_student_info).
+
+Dict items (or the info dict of a tuple) can route their file to a folder of their own, such as a team folder from
+provision_team_folders.py, with a "folder_id" or "folder_url" key. Other items are copied to the generator's folder.
+"""
+
+import json
+import sys
+
+# command line argument for reading items as NDJSON from stdin, instead of a JSON list
+STDIN_ARGUMENT = "-"
+
+# url of a folder, given its id
+FOLDER_URL_FORMAT = "https://drive.google.com/drive/folders/{id}"
+
+
+def get_item_name(item):
+    """
+    Gets the student or team name from a generator input item.
+
+    :param item: string name, dict with a "name" key, or (name, info) tuple.
+    :return: string name.
+    """
+    if isinstance(item, str):
+        return item
+
+    if isinstance(item, dict):
+        return item["name"]
+
+    if isinstance(item, (tuple, list)):
+        return item[0]
+
+    raise Exception("Unsupported item (expected name, dict, or tuple): {}".format(item))
+
+
+def get_item_folder_url(item, default_folder_url):
+    """
+    Gets the folder a generator copies an item's file to, without any lookups.
+
+    :param item: string name, dict, or (name, info) tuple.
+    :param default_folder_url: string url of the generator's folder, for items without a folder of their own.
+    :return: string folder url.
+    """
+    # the info dict of a tuple holds the folder, like a dict item does
+    if isinstance(item, (tuple, list)) and len(item) > 1:
+        item = item[1]
+
+    if isinstance(item, dict):
+        if item.get("folder_id"):
+            return FOLDER_URL_FORMAT.format(id=item["folder_id"])
+
+        if item.get("folder_url"):
+            return item["folder_url"]
+
+    return default_folder_url
+
+
+def read_ndjson(infile):
+    """
+    Reads newline-delimited JSON lazily, one item per line. Blank lines are skipped.
+
+    :param infile: file object to read from (e.g., sys.stdin).
+    :return: generator of parsed items.
+    """
+    for line in infile:
+        if line.strip() != "":
+            yield json.loads(line)
+
+
+def parse_items_argument(argument, infile=None):
+    """
+    Parses a command line list of students or teams. "-" streams NDJSON from stdin instead of parsing a JSON list.
+
+    :param argument: string JSON list, or "-".
+    :param infile: optional file object to read NDJSON from. defaults to stdin.
+    :return: iterable of items.
+    """
+    if argument == STDIN_ARGUMENT:
+        return read_ndjson(infile if infile is not None else sys.stdin)
+
+    return json.loads(argument)
+
+
+def create_result_record(name, filename, copied_file, url_format):
+    """
+    Creates the result record a generator yields for one copied file.
+
+    :param name: string student or team name the file was generated for.
+    :param filename: string name of the generated file.
+    :param copied_file: copied file from copy_file, or None if the copy failed.
+    :param url_format: string format for the file url, with an {id} field.
+    :return: dict with name, filename, file_id, and url. file_id and url are None if the copy failed.
+    """
+    if copied_file is None:
+        return {"name": name, "filename": filename, "file_id": None, "url": None}
+
+    return {
+        "name": name,
+        "filename": filename,
+        "file_id": copied_file["id"],
+        "url": url_format.format(id=copied_file["id"]),
+    }
+
+
+def format_result_record(record):
+    """
+    :param record: dict result record from a generator.
+    :return: string line describing the generated file, for printing.
+    """
+    if record["url"] is None:
+        return "{filename}: copy failed".format(filename=record["filename"])
+
+    if "error" in record:
+        return "{filename}: {url} (personalization failed)".format(
+            filename=record["filename"], url=record["url"]
+        )
+
+    return "{filename}: {url}".format(filename=record["filename"], url=record["url"])
@@ -0,0 +1,312 @@
+"""
+This module includes a built-in profiling mode for the scripts, enabled by passing --profile on the command line.
+
+While profiling, a background thread samples the stack of every thread, and each run is split into phases (auth,
+build, roster fetch, parse, copy, populate, and throttle backoff) by the phase context manager. At the end of the run:
+    - the samples are written as collapsed (folded) stacks, one "frame;frame;frame count" line per stack, which can
+      be rendered as a flamegraph by flamegraph.pl or speedscope. each stack starts with the phase it was sampled in.
+    - a breakdown of wall time, CPU time, and waiting time per phase is printed. time spent in throttle backoff means
+      a run is quota-bound, time waiting in other phases means it is latency-bound, and CPU time means it is CPU-bound.
+
+When profiling is off, phase does nothing but check a module variable, so it is safe to leave in the scripts.
+"""
+
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+PROFILE_FLAG = "--profile"
+
+# seconds between stack samples
+DEFAULT_SAMPLE_INTERVAL = 0.005
+
+# phase for samples taken outside of any phase
+UNKNOWN_PHASE = "other"
+
+# stacks whose innermost frame is in one of these modules are waiting on the network
+NETWORK_WAIT_MODULES = ("socket.py", "ssl.py", "selectors.py")
+
+# the profile for the current run, if profiling is enabled
+_active_profile = None
+
+
+def pop_profile_flag(argv):
+    """
+    Removes the --profile flag from command line arguments, so scripts can check their argument counts as usual.
+
+    :param argv: list of string command line arguments (e.g., sys.argv). modified in place.
+    :return: boolean whether the flag was given.
+    """
+    if PROFILE_FLAG not in argv:
+        return False
+
+    while PROFILE_FLAG in argv:
+        argv.remove(PROFILE_FLAG)
+    return True
+
+
+def format_frame(frame):
+    """
+    :param frame: Python stack frame.
+    :return: string name for the frame in a collapsed stack (e.g., "copy_gdrive_file.py:copy_file").
+    """
+    return "{file}:{function}".format(
+        file=os.path.basename(frame.f_code.co_filename), function=frame.f_code.co_name
+    )
+
+
+def is_network_wait(frame):
+    """
+    Checks if a sampled stack is waiting on the network, based on its innermost frame.
+
+    :param frame: innermost Python stack frame of a sample.
+    :return: boolean whether the stack is blocked in socket, ssl, or selector code.
+    """
+    return os.path.basename(frame.f_code.co_filename) in NETWORK_WAIT_MODULES
+
+
+class PhaseStats:
+    """
+    Holds the totals for one phase. Phases run on several threads at once are summed across threads, so their
+    wall time can be longer than the run itself.
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.samples = 0
+        self.network_wait_samples = 0
+
+
+class Profile:
+    """
+    Samples the stacks of every thread in the background, and totals time spent in each phase.
+    """
+
+    def __init__(self, sample_interval=DEFAULT_SAMPLE_INTERVAL):
+        """
+        :param sample_interval: float seconds between stack samples.
+        """
+        self.sample_interval = sample_interval
+        self.phases = {}
+        self.stack_counts = {}
+        self.start_time = None
+        self.start_cpu_time = None
+        self.end_time = None
+        self.end_cpu_time = None
+
+        # innermost phase for each thread, by thread id, so the sampler can label other threads' stacks
+        self._thread_phases = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Starts sampling in a background daemon thread.
+
+        :return: None
+        """
+        self.start_time = time.monotonic()
+        self.start_cpu_time = time.process_time()
+        self._thread = threading.Thread(
+            target=self._sample_loop, name="profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stops sampling, and records the run's total wall and CPU time.
+
+        :return: None
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.end_time = time.monotonic()
+        self.end_cpu_time = time.process_time()
+
+    def _sample_loop(self):
+        sampler_id = threading.get_ident()
+
+        while not self._stop_event.wait(self.sample_interval):
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != sampler_id:
+                    self.record_sample(thread_id, frame)
+
+    def record_sample(self, thread_id, frame):
+        """
+        Adds one stack sample, labelled with the phase its thread is in.
+
+        :param thread_id: int id of sampled thread.
+        :param frame: innermost Python stack frame of sampled thread.
+        :return: None
+        """
+        network_wait = is_network_wait(frame)
+
+        # collapsed stacks list frames from outermost to innermost
+        frames = []
+        while frame is not None:
+            frames.append(format_frame(frame))
+            frame = frame.f_back
+
+        with self._lock:
+            phase_stack = self._thread_phases.get(thread_id)
+            phase_name = phase_stack[-1] if phase_stack else UNKNOWN_PHASE
+
+            stack = ";".join(["[{}]".format(phase_name)] + frames[::-1])
+            self.stack_counts[stack] = self.stack_counts.get(stack, 0) + 1
+
+            stats = self.phases.setdefault(phase_name, PhaseStats())
+            stats.samples += 1
+            if network_wait:
+                stats.network_wait_samples += 1
+
+    def enter_phase(self, name):
+        """
+        :param name: string name of phase the current thread is starting.
+        :return: None
+        """
+        with self._lock:
+            self._thread_phases.setdefault(threading.get_ident(), []).append(name)
+
+    def exit_phase(self, name, wall_time, cpu_time):
+        """
+        :param name: string name of phase the current thread is finishing.
+        :param wall_time: float seconds the phase took.
+        :param cpu_time: float seconds of CPU time the current thread used in the phase.
+        :return: None
+        """
+        with self._lock:
+            self._thread_phases[threading.get_ident()].pop()
+
+            stats = self.phases.setdefault(name, PhaseStats())
+            stats.calls += 1
+            stats.wall_time += wall_time
+            stats.cpu_time += cpu_time
+
+    def write_collapsed_stacks(self, output_file):
+        """
+        Writes the samples as collapsed stacks, for rendering as a flamegraph.
+
+        :param output_file: string filepath to write collapsed stacks to.
+        :return: None
+        """
+        with self._lock:
+            stack_counts = sorted(self.stack_counts.items())
+
+        with open(output_file, "w") as outfile:
+            for stack, count in stack_counts:
+                outfile.write("{stack} {count}\n".format(stack=stack, count=count))
+
+    def format_report(self):
+        """
+        :return: string table of wall, CPU, and waiting time per phase, with totals for the run.
+        """
+        lines = [
+            "{:<18} {:>6} {:>10} {:>10} {:>10} {:>8} {:>9}".format(
+                "phase",
+                "calls",
+                "wall (s)",
+                "cpu (s)",
+                "wait (s)",
+                "samples",
+                "net wait",
+            )
+        ]
+
+        with self._lock:
+            phases = sorted(
+                self.phases.items(), key=lambda item: item[1].wall_time, reverse=True
+            )
+
+        for name, stats in phases:
+            # share of the phase's samples that were blocked on the network
+            network_share = (
+                "{:.0%}".format(stats.network_wait_samples / stats.samples)
+                if stats.samples > 0
+                else "-"
+            )
+            # time outside of any phase is only sampled, not timed
+            if stats.calls > 0:
+                times = [
+                    "{:.3f}".format(stats.wall_time),
+                    "{:.3f}".format(stats.cpu_time),
+                    "{:.3f}".format(max(0.0, stats.wall_time - stats.cpu_time)),
+                ]
+            else:
+                times = ["-", "-", "-"]
+
+            lines.append(
+                "{:<18} {:>6} {:>10} {:>10} {:>10} {:>8} {:>9}".format(
+                    name, stats.calls, *times, stats.samples, network_share
+                )
+            )
+
+        lines.append(
+            "run: {wall:.3f}s wall, {cpu:.3f}s cpu".format(
+                wall=self.end_time - self.start_time,
+                cpu=self.end_cpu_time - self.start_cpu_time,
+            )
+        )
+        return "\n".join(lines)
+
+
+@contextmanager
+def phase(name):
+    """
+    Times a phase of the run on the current thread, if profiling is enabled.
+
+    :param name: string name of phase (e.g., "copy").
+    :return: context manager.
+    """
+    profile = _active_profile
+    if profile is None:
+        yield
+        return
+
+    profile.enter_phase(name)
+    start_time = time.monotonic()
+    start_cpu_time = time.thread_time()
+    try:
+        yield
+    finally:
+        profile.exit_phase(
+            name,
+            time.monotonic() - start_time,
+            time.thread_time() - start_cpu_time,
+        )
+
+
+@contextmanager
+def profile_run(script_name, enabled):
+    """
+    Profiles a whole run if enabled, writing collapsed stacks to <script_name>.profile.folded and printing the phase
+    breakdown when the run finishes (or fails).
+
+    :param script_name: string name of the script being run (e.g., "create_ipm").
+    :param enabled: boolean whether to profile the run.
+    :return: context manager.
+    """
+    global _active_profile
+
+    if not enabled:
+        yield
+        return
+
+    profile = Profile()
+    _active_profile = profile
+    profile.start()
+    try:
+        yield
+    finally:
+        profile.stop()
+        _active_profile = None
+
+        output_file = "{name}.profile.folded".format(name=script_name)
+        profile.write_collapsed_stacks(output_file)
+        print(profile.format_report())
+        print("Sampled stacks written to {}".format(output_file))
@@ -0,0 +1,361 @@
+"""
+This module includes library functions for storing the Studio Database in SQLite, and for querying it. Lookups by
+student name, email, team, Mysore session, and week are indexed, so tools can find one student or team without
+loading the whole roster.
+"""
+
+import json
+import os
+import re
+import sqlite3
+
+# file extensions that are exported as (and loaded from) SQLite rather than json
+SQLITE_EXTENSIONS = (".db", ".sqlite", ".sqlite3")
+
+SCHEMA = """
+CREATE TABLE students (
+    name TEXT PRIMARY KEY,
+    email_address TEXT,
+    team_name TEXT,
+    learning_goals TEXT,
+    individual_progress_map_link TEXT,
+    self_assessment_link TEXT,
+    mysore_availability TEXT,
+    mysore_session TEXT
+);
+CREATE TABLE teams (
+    team_name TEXT PRIMARY KEY,
+    final_presentation_link TEXT
+);
+CREATE TABLE weekly_templates (
+    team_name TEXT,
+    week INTEGER,
+    position INTEGER,
+    name TEXT,
+    link TEXT
+);
+CREATE INDEX students_email_address ON students (email_address COLLATE NOCASE);
+CREATE INDEX students_team_name ON students (team_name);
+CREATE INDEX students_mysore_session ON students (mysore_session);
+CREATE INDEX weekly_templates_team_name_week ON weekly_templates (team_name, week);
+CREATE INDEX weekly_templates_week ON weekly_templates (week);
+"""
+
+
+def is_sqlite_path(filepath):
+    """
+    Checks if a filepath should be stored as SQLite, based on its extension.
+
+    :param filepath: string filepath.
+    :return: boolean whether the filepath has a SQLite extension.
+    """
+    return filepath.lower().endswith(SQLITE_EXTENSIONS)
+
+
+def parse_week_number(template_name):
+    """
+    Parses the week number from a weekly template column name (e.g., "Week 01 Templates").
+
+    :param template_name: string name of weekly template column.
+    :return: int week number, or None if the name has no week number.
+    """
+    results = re.search(r"Week (\d+)", template_name)
+
+    if results:
+        return int(results.group(1))
+
+    return None
+
+
+def export_studio_db(studio_db_dict, output_file, team_info_dict=None):
+    """
+    Writes a Studio Database dict to a new SQLite file, replacing any existing file once the export is complete.
+
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param output_file: string filepath to write SQLite database to.
+    :param team_info_dict: optional dict of parsed Team Info (e.g., from roster_to_json.fetch_team_info), so teams
+        without any students are exported too. otherwise only teams with students are exported.
+    :return: None
+    """
+    export_studio_db_records(studio_db_dict.items(), output_file, team_info_dict)
+
+
+def export_studio_db_records(studio_db_records, output_file, team_info_dict=None):
+    """
+    Writes streamed Studio Database records to a new SQLite file one student at a time, replacing any existing file
+    once the export is complete. If a student's name is repeated, the last record wins, like it does in a dict.
+
+    :param studio_db_records: iterable of (student name, dict of student info) tuples (e.g., from
+        roster_to_json.iter_studio_db).
+    :param output_file: string filepath to write SQLite database to.
+    :param team_info_dict: optional dict of parsed Team Info, so teams without any students are exported too.
+    :return: None
+    """
+    # write to a temporary file, so readers never see a partially-written database
+    temp_file = "{path}.tmp".format(path=output_file)
+    if os.path.exists(temp_file):
+        os.remove(temp_file)
+
+    connection = sqlite3.connect(temp_file)
+    try:
+        connection.executescript(SCHEMA)
+
+        # each student in a team shares the same team info, so only write each team once
+        teams = dict(team_info_dict or {})
+
+        def create_student_rows():
+            for student_name, student_info in studio_db_records:
+                teams[student_info["team_info"]["team_name"]] = student_info[
+                    "team_info"
+                ]
+                yield (
+                    student_name,
+                    student_info["email_address"],
+                    student_info["team_info"]["team_name"],
+                    student_info["learning_goals"],
+                    student_info["individual_progress_map_link"],
+                    student_info["self_assessment_link"],
+                    json.dumps(student_info["mysore_availability"]),
+                    student_info.get("mysore_session", ""),
+                )
+
+        # students are written as they are streamed, and their teams are written once every student is
+        connection.executemany(
+            # a repeated name keeps its first row (so its place in the order) but takes the last record, like a dict
+            "INSERT INTO students VALUES (?, ?, ?, ?, ?, ?, ?, ?) ON CONFLICT (name) DO UPDATE SET "
+            "email_address = excluded.email_address, team_name = excluded.team_name, "
+            "learning_goals = excluded.learning_goals, "
+            "individual_progress_map_link = excluded.individual_progress_map_link, "
+            "self_assessment_link = excluded.self_assessment_link, "
+            "mysore_availability = excluded.mysore_availability, mysore_session = excluded.mysore_session",
+            create_student_rows(),
+        )
+        connection.executemany(
+            "INSERT INTO teams VALUES (?, ?)",
+            (
+                (team_name, team_info.get("final_presentation_link", ""))
+                for team_name, team_info in teams.items()
+            ),
+        )
+        connection.executemany(
+            "INSERT INTO weekly_templates VALUES (?, ?, ?, ?, ?)",
+            (
+                (
+                    team_name,
+                    parse_week_number(template["name"]),
+                    position,
+                    template["name"],
+                    template["link"],
+                )
+                for team_name, team_info in teams.items()
+                for position, template in enumerate(team_info["weekly_templates"])
+            ),
+        )
+        connection.commit()
+    except BaseException:
+        # don't leave a partially-written database behind
+        connection.close()
+        os.remove(temp_file)
+        raise
+    connection.close()
+
+    os.replace(temp_file, output_file)
+
+
+def connect(db_file):
+    """
+    Opens a SQLite Studio Database for querying.
+
+    :param db_file: string filepath of SQLite database.
+    :return: sqlite3 connection.
+    """
+    if not os.path.exists(db_file):
+        raise Exception("Studio Database not found: {}".format(db_file))
+
+    connection = sqlite3.connect(db_file)
+    connection.row_factory = sqlite3.Row
+    return connection
+
+
+def _mysore_session_from_row(row):
+    """
+    :param row: sqlite3 Row from the students table.
+    :return: string Mysore session the student is assigned to, or "" if they are not assigned (or the database was
+        exported before sessions were assigned).
+    """
+    if "mysore_session" not in row.keys():
+        return ""
+
+    return row["mysore_session"] or ""
+
+
+def _student_from_row(connection, row):
+    """
+    Creates a student info dict, in the same format as the Studio Database dict, from a students row.
+
+    :param connection: sqlite3 connection.
+    :param row: sqlite3 Row from the students table.
+    :return: dict of student info, including team_info.
+    """
+    return {
+        "name": row["name"],
+        "email_address": row["email_address"],
+        "mysore_availability": json.loads(row["mysore_availability"]),
+        "mysore_session": _mysore_session_from_row(row),
+        "learning_goals": row["learning_goals"],
+        "individual_progress_map_link": row["individual_progress_map_link"],
+        "self_assessment_link": row["self_assessment_link"],
+        "team_info": find_team(connection, row["team_name"]),
+    }
+
+
+def find_student(connection, student_name):
+    """
+    Finds a student by full name.
+
+    :param connection: sqlite3 connection from connect.
+    :param student_name: string full name of student.
+    :return: dict of student info (including team_info), or None if not found.
+    """
+    row = connection.execute(
+        "SELECT * FROM students WHERE name = ?", (student_name,)
+    ).fetchone()
+
+    return _student_from_row(connection, row) if row is not None else None
+
+
+def find_student_by_email(connection, email_address):
+    """
+    Finds a student by email address (ignoring case).
+
+    :param connection: sqlite3 connection from connect.
+    :param email_address: string email address of student.
+    :return: dict of student info (including team_info), or None if not found.
+    """
+    row = connection.execute(
+        "SELECT * FROM students WHERE email_address = ? COLLATE NOCASE",
+        (email_address,),
+    ).fetchone()
+
+    return _student_from_row(connection, row) if row is not None else None
+
+
+def find_team_members(connection, team_name):
+    """
+    Finds the students in a team.
+
+    :param connection: sqlite3 connection from connect.
+    :param team_name: string name of team.
+    :return: list of string full names of students in team.
+    """
+    return [
+        row["name"]
+        for row in connection.execute(
+            "SELECT name FROM students WHERE team_name = ? ORDER BY rowid",
+            (team_name,),
+        )
+    ]
+
+
+def find_team(connection, team_name):
+    """
+    Finds a team, in the same format as team_info in the Studio Database dict.
+
+    :param connection: sqlite3 connection from connect.
+    :param team_name: string name of team.
+    :return: dict of team info, or None if not found.
+    """
+    row = connection.execute(
+        "SELECT * FROM teams WHERE team_name = ?", (team_name,)
+    ).fetchone()
+
+    if row is None:
+        return None
+
+    return {
+        "team_name": row["team_name"],
+        "team_members": find_team_members(connection, team_name),
+        "weekly_templates": [
+            {"name": template_row["name"], "link": template_row["link"]}
+            for template_row in connection.execute(
+                "SELECT name, link FROM weekly_templates WHERE team_name = ? ORDER BY position",
+                (team_name,),
+            )
+        ],
+        "final_presentation_link": row["final_presentation_link"],
+    }
+
+
+def find_mysore_session_students(connection, mysore_session):
+    """
+    Finds the students assigned to a Mysore session.
+
+    :param connection: sqlite3 connection from connect.
+    :param mysore_session: string name of Mysore session.
+    :return: list of string full names of students in the session.
+    """
+    return [
+        row["name"]
+        for row in connection.execute(
+            "SELECT name FROM students WHERE mysore_session = ? ORDER BY rowid",
+            (mysore_session,),
+        )
+    ]
+
+
+def find_weekly_templates(connection, week):
+    """
+    Finds every team's weekly template link for a week.
+
+    :param connection: sqlite3 connection from connect.
+    :param week: int week number.
+    :return: dict of team name to string weekly template link.
+    """
+    return {
+        row["team_name"]: row["link"]
+        for row in connection.execute(
+            "SELECT team_name, link FROM weekly_templates WHERE week = ?", (week,)
+        )
+    }
+
+
+def load_team_info_dict(connection):
+    """
+    Loads every team, including teams without any students, in the same format as roster_to_json.fetch_team_info
+    (with team_members added).
+
+    :param connection: sqlite3 connection from connect.
+    :return: dict of team name to dict of team info.
+    """
+    return {
+        row["team_name"]: find_team(connection, row["team_name"])
+        for row in connection.execute("SELECT team_name FROM teams ORDER BY rowid")
+    }
+
+
+def load_studio_db_dict(connection):
+    """
+    Loads the whole Studio Database, in the same format as roster_to_json.create_studio_db_dict.
+
+    :param connection: sqlite3 connection from connect.
+    :return: dict of each student with all individual and team info.
+    """
+    # load each team once, since students in the same team share team info
+    teams = {}
+    output = {}
+    for row in connection.execute("SELECT * FROM students ORDER BY rowid"):
+        if row["team_name"] not in teams:
+            teams[row["team_name"]] = find_team(connection, row["team_name"])
+
+        output[row["name"]] = {
+            "name": row["name"],
+            "email_address": row["email_address"],
+            "mysore_availability": json.loads(row["mysore_availability"]),
+            "mysore_session": _mysore_session_from_row(row),
+            "learning_goals": row["learning_goals"],
+            "individual_progress_map_link": row["individual_progress_map_link"],
+            "self_assessment_link": row["self_assessment_link"],
+            "team_info": teams[row["team_name"]],
+        }
+
+    return output
@@ -0,0 +1,420 @@
+"""
+This script is used to create a folder for each project team (and, optionally, a folder for each week inside every team
+folder) in a root folder, so generated files can be sorted by team instead of all going into one flat folder.
+
+    - "provision" creates any team and week folders that are missing, and saves every folder's id to a cache file.
+      Folders already in the cache are not looked up again. Folders in Google Drive that are not cached yet are found
+      with a single listing of the root folder (and one listing of every team folder for weeks), and the rest are
+      created with batched files.create requests, up to 100 folders per request.
+    - "items" prints each student or team with their team folder's id as NDJSON, which the generator scripts read from
+      stdin (with -) to copy each file into its team's folder, without looking any folders up.
+
+The cache file is JSON:
+
+{
+    "root_folder_id": "<root_folder_id>",
+    "teams": {"<team_name>": {"folder_id": "<team_folder_id>", "weeks": {"<week_name>": "<week_folder_id>"}}}
+}
+
+If a cached folder is deleted in Google Drive, delete the cache file (or the team's entry) and provision again.
+"""
+
+import contextlib
+import json
+import os
+import sys
+import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.drive as drive
+import roster_to_json as studio_db
+
+# kinds of items the "items" mode prints
+ITEM_TYPES = ("students", "teams")
+
+
+def load_folder_cache(cache_path, root_folder_id):
+    """
+    Loads the cached folder ids for a root folder.
+
+    :param cache_path: string filepath of cache file.
+    :param root_folder_id: string id of root folder.
+    :return: dict of cache. empty if there is no cache file, or it was made for a different root folder.
+    """
+    empty_cache = {"root_folder_id": root_folder_id, "teams": {}}
+    if not os.path.exists(cache_path):
+        return empty_cache
+
+    with open(cache_path, "r") as infile:
+        cache = json.load(infile)
+
+    return cache if cache.get("root_folder_id") == root_folder_id else empty_cache
+
+
+def read_folder_cache(cache_path):
+    """
+    Reads a cache file for looking up folders only, taking its root folder from the file itself.
+
+    :param cache_path: string filepath of cache file.
+    :return: dict of cache.
+    """
+    with open(cache_path, "r") as infile:
+        return json.load(infile)
+
+
+def save_folder_cache(cache, cache_path):
+    """
+    Saves the cached folder ids, replacing the cache file atomically.
+
+    :param cache: dict of cache to save.
+    :param cache_path: string filepath of cache file.
+    :return: None
+    """
+    temp_path = "{path}.tmp".format(path=cache_path)
+    with open(temp_path, "w") as outfile:
+        json.dump(cache, outfile, indent=4)
+    os.replace(temp_path, cache_path)
+
+
+def find_child_folders(gdrive_service, parent_ids):
+    """
+    Finds the folders directly inside several folders, listing them together.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param parent_ids: list of string ids of parent folders.
+    :return: dict of parent folder id to dict of string folder name to folder id.
+    """
+    output = {parent_id: {} for parent_id in parent_ids}
+    for curr_folder in drive.list_files_in_folders(
+        gdrive_service,
+        parent_ids,
+        extra_query="mimeType = '{}'".format(drive.FOLDER_MIME_TYPE),
+    ):
+        for parent_id in curr_folder.get("parents", []):
+            # keep the first folder found if there are several with the same name
+            if parent_id in output:
+                output[parent_id].setdefault(curr_folder["name"], curr_folder["id"])
+
+    return output
+
+
+def create_folders(gdrive_service, folders):
+    """
+    Creates folders using batched files.create requests.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folders: list of (key, string folder name, string parent folder id) tuples.
+    :return: tuple of (dict of key to created folder id, dict of key to error) for created and failed folders.
+    """
+    requests = [
+        (
+            key,
+            gdrive_service.files().create(
+                body={
+                    "name": folder_name,
+                    "mimeType": drive.FOLDER_MIME_TYPE,
+                    "parents": [parent_id],
+                },
+                fields="id, name",
+                supportsAllDrives=True,
+            ),
+        )
+        for key, folder_name, parent_id in folders
+    ]
+
+    with profiling.phase("create folders"):
+        responses, failures = drive.execute_batched(gdrive_service, requests)
+
+    return {key: response["id"] for key, response in responses.items()}, failures
+
+
+def provision_folders(gdrive_service, cache, team_names, week_names=()):
+    """
+    Finds or creates a folder for each team in the cache's root folder, and a folder for each week in each team folder.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param cache: dict of cache from load_folder_cache. updated in place.
+    :param team_names: list of string team names.
+    :param week_names: optional list of string week names (e.g., ["Week 1", "Week 2"]).
+    :return: tuple of (int number of folders found, int number of folders created, dict of folder name to error).
+    """
+    root_folder_id = cache["root_folder_id"]
+    team_folders = cache["teams"]
+    found_count = 0
+    created_count = 0
+    failures = {}
+
+    # find uncached team folders with one listing of the root folder, and create the rest
+    missing_teams = [
+        team_name for team_name in team_names if team_name not in team_folders
+    ]
+    created_teams = {}
+    if missing_teams:
+        existing_folders = find_child_folders(gdrive_service, [root_folder_id])[
+            root_folder_id
+        ]
+        for team_name in missing_teams:
+            if team_name in existing_folders:
+                team_folders[team_name] = {
+                    "folder_id": existing_folders[team_name],
+                    "weeks": {},
+                }
+                found_count += 1
+
+        created_teams, team_failures = create_folders(
+            gdrive_service,
+            [
+                (team_name, team_name, root_folder_id)
+                for team_name in missing_teams
+                if team_name not in team_folders
+            ],
+        )
+        for team_name, folder_id in created_teams.items():
+            team_folders[team_name] = {"folder_id": folder_id, "weeks": {}}
+        created_count += len(created_teams)
+        failures.update(team_failures)
+
+    # find uncached week folders with one listing of every team folder. folders that were just created are empty.
+    missing_weeks = [
+        (team_name, week_name)
+        for team_name in team_names
+        if team_name in team_folders
+        for week_name in week_names
+        if week_name not in team_folders[team_name]["weeks"]
+    ]
+    if missing_weeks:
+        listed_team_ids = sorted(
+            {
+                team_folders[team_name]["folder_id"]
+                for team_name, _ in missing_weeks
+                if team_name not in created_teams
+            }
+        )
+        existing_folders = (
+            find_child_folders(gdrive_service, listed_team_ids)
+            if listed_team_ids
+            else {}
+        )
+
+        folders_to_create = []
+        for team_name, week_name in missing_weeks:
+            team_folder_id = team_folders[team_name]["folder_id"]
+            week_folder_id = existing_folders.get(team_folder_id, {}).get(week_name)
+            if week_folder_id is not None:
+                team_folders[team_name]["weeks"][week_name] = week_folder_id
+                found_count += 1
+            else:
+                folders_to_create.append(
+                    ((team_name, week_name), week_name, team_folder_id)
+                )
+
+        created_weeks, week_failures = create_folders(gdrive_service, folders_to_create)
+        for (team_name, week_name), folder_id in created_weeks.items():
+            team_folders[team_name]["weeks"][week_name] = folder_id
+        created_count += len(created_weeks)
+        failures.update(
+            {
+                "{team} / {week}".format(team=team_name, week=week_name): error
+                for (team_name, week_name), error in week_failures.items()
+            }
+        )
+
+    return found_count, created_count, failures
+
+
+def get_team_names(studio_db_dict):
+    """
+    :param studio_db_dict: dict containing all information for the studio database.
+    :return: sorted list of string team names.
+    """
+    return sorted(
+        {
+            student_info["team_info"]["team_name"]
+            for student_info in studio_db_dict.values()
+            if student_info["team_info"]["team_name"] != ""
+        }
+    )
+
+
+def get_team_folder_id(cache, team_name, week_name=None):
+    """
+    :param cache: dict of cache.
+    :param team_name: string team name.
+    :param week_name: optional string week name.
+    :return: string id of the team's folder (or the team's week folder), or None if it has not been provisioned.
+    """
+    team_folder = cache["teams"].get(team_name)
+    if team_folder is None:
+        return None
+
+    if week_name is not None:
+        return team_folder["weeks"].get(week_name)
+
+    return team_folder["folder_id"]
+
+
+def add_team_folders(studio_db_dict, cache, week_name=None):
+    """
+    Adds each student's team folder id to the studio database, so the self-assessment generators, which take the
+    studio database instead of a list of students, copy each student's file into their team's folder.
+
+    :param studio_db_dict: dict containing all information for the studio database. updated in place.
+    :param cache: dict of cache.
+    :param week_name: optional string week name, to use each team's week folder instead.
+    :return: None
+    """
+    for student_info in studio_db_dict.values():
+        folder_id = get_team_folder_id(
+            cache, student_info["team_info"]["team_name"], week_name
+        )
+        if folder_id is not None:
+            student_info["folder_id"] = folder_id
+
+
+def create_items(studio_db_dict, cache, item_type, week_name=None):
+    """
+    Creates an item for each student or team with their team folder's id (see helpers/pipeline.py for item formats).
+    Items without a provisioned folder have no folder_id, so their files go to the generator's folder.
+
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param cache: dict of cache.
+    :param item_type: string "students" or "teams".
+    :param week_name: optional string week name, to use each team's week folder instead.
+    :return: list of item dicts with name and, if provisioned, folder_id.
+    """
+    # skip empty rows in the roster
+    if item_type == "students":
+        names = [
+            (student_name, student_info["team_info"]["team_name"])
+            for student_name, student_info in studio_db_dict.items()
+            if student_name != ""
+        ]
+    else:
+        names = [(team_name, team_name) for team_name in get_team_names(studio_db_dict)]
+
+    output = []
+    for name, team_name in names:
+        item = {"name": name}
+        folder_id = get_team_folder_id(cache, team_name, week_name)
+        if folder_id is not None:
+            item["folder_id"] = folder_id
+        output.append(item)
+
+    return output
+
+
+def main(
+    root_folder_url,
+    cache_path,
+    spreadsheet_url,
+    student_info_sheet_name,
+    team_info_sheet_name,
+    week_names=(),
+):
+    """
+    Provisions a folder for each team in the Studio Roster (and each week in each team folder), and caches their ids.
+
+    :param root_folder_url: string url of folder to create team folders in.
+    :param cache_path: string filepath of cache file.
+    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio Database).
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :param week_names: optional list of string week names.
+    :return: dict of cache.
+    """
+    studio_db_dict = studio_db.main(
+        spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+    )
+
+    # authenticate for Google Drive v3 API
+    gdrive_service = helpers.auth_gdrive()
+
+    cache = load_folder_cache(
+        cache_path, helpers.get_folder_id_from_url(root_folder_url)
+    )
+    found_count, created_count, failures = provision_folders(
+        gdrive_service, cache, get_team_names(studio_db_dict), week_names
+    )
+
+    # save folders as they are provisioned, so failed folders are all that is left for the next run
+    save_folder_cache(cache, cache_path)
+
+    for folder_name, error in failures.items():
+        print("Could not create {name}: {error}".format(name=folder_name, error=error))
+    print(
+        "Found {found} folders, created {created}, and {failed} failed. Folder ids cached in {path}".format(
+            found=found_count,
+            created=created_count,
+            failed=len(failures),
+            path=cache_path,
+        )
+    )
+    return cache
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+    input_mode = sys.argv[1] if arg_count > 0 else None
+
+    # create team (and week) folders
+    if input_mode == "provision":
+        if arg_count not in (6, 7):
+            raise Exception(
+                "Invalid number of arguments. Expected 6 or 7 "
+                "(provision, root folder URL, Cache filepath, Studio Roster URL, Student Info sheet name, "
+                "Team Info sheet name, optional Week Names as JSON) got {}.".format(
+                    arg_count
+                )
+            )
+
+        input_week_names = json.loads(sys.argv[7]) if arg_count == 7 else []
+
+        with profiling.profile_run("provision_team_folders", should_profile):
+            main(
+                sys.argv[2],
+                sys.argv[3],
+                sys.argv[4],
+                sys.argv[5],
+                sys.argv[6],
+                input_week_names,
+            )
+
+    # print students or teams with their team folders, for the generator scripts
+    elif input_mode == "items":
+        if arg_count not in (6, 7):
+            raise Exception(
+                "Invalid number of arguments. Expected 6 or 7 "
+                "(items, Cache filepath, students or teams, Studio Roster URL, Student Info sheet name, "
+                "Team Info sheet name, optional Week Name) got {}.".format(arg_count)
+            )
+
+        input_item_type = sys.argv[3]
+        if input_item_type not in ITEM_TYPES:
+            raise Exception(
+                "Invalid item type. Expected one of {} got {}.".format(
+                    list(ITEM_TYPES), input_item_type
+                )
+            )
+
+        # the cache file is only read, so its root folder is taken from the file itself
+        input_cache = read_folder_cache(sys.argv[2])
+
+        # keep roster warnings out of the NDJSON output
+        with contextlib.redirect_stdout(sys.stderr):
+            input_studio_db_dict = studio_db.main(sys.argv[4], sys.argv[5], sys.argv[6])
+
+        for output_item in create_items(
+            input_studio_db_dict,
+            input_cache,
+            input_item_type,
+            sys.argv[7] if arg_count == 7 else None,
+        ):
+            print(json.dumps(output_item))
+
+    else:
+        raise Exception(
+            "Invalid mode. Expected 'provision' or 'items' got {}.".format(input_mode)
+        )
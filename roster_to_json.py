@@ -6,32 +6,33 @@ import sys
 import json
 import re
 import helpers.imports as helpers
-
-
-def fetch_student_info(spreadsheet, sheet_name):
+import helpers.profiling as profiling
+from gspread.utils import rowcol_to_a1
+import helpers.studio_db_sqlite as studio_db_sqlite
+
+# maps Student Info sheet column headers to fields in the parsed Studio Database
+STUDENT_HEADER_MAPPING = {
+    "Full Name": "student_name",
+    "Email": "email_address",
+    "Learning Goals": "learning_goals",
+    "Team Name": "team_name",
+    "Individual Progress Map": "individual_progress_map_link",
+    "Self-Assessment": "self_assessment_link",
+    "Mysore Availability": "mysore_availability",
+}
+
+# number of rows fetched per request when streaming the Student Info sheet
+DEFAULT_WINDOW_SIZE = 1000
+
+
+def create_header_index(header, header_mapping):
     """
-    Fetches information for each student from the Studio Roster Google Spreadsheet.
+    Creates a header index to lookup header_mapping keys by column index, and reports any unmapped columns.
 
-    :param spreadsheet:  gspread spreadsheet object for the Studio Roster.
-    :param sheet_name: string name of sheet where Student Info is stored.
-    :return: dict of students with info relevant specifically to them.
+    :param header: list of string column headers.
+    :param header_mapping: dict of column header to parsed field name.
+    :return: dict of column index to column header, for mapped columns only.
     """
-    # open correct worksheet and get all values to parse
-    student_info_worksheet = spreadsheet.worksheet(sheet_name)
-    values = student_info_worksheet.get_all_values()
-
-    # create header mapping object
-    header = values[0]
-    header_mapping = {
-        "Full Name": "student_name",
-        "Email": "email_address",
-        "Learning Goals": "learning_goals",
-        "Team Name": "team_name",
-        "Individual Progress Map": "individual_progress_map_link",
-        "Self-Assessment": "self_assessment_link",
-    }
-
-    # create a header index to lookup header_mapping keys by index number
     # track any header vals not including in mapping
     exclude_list = []
     header_index = {}
@@ -50,128 +51,294 @@ def fetch_student_info(spreadsheet, sheet_name):
             )
         )
 
-    # iterate over each row and parse data
-    output = {}
-    for student in values[1:]:
-        # hold the current student's name to use as a dict key later
-        curr_student_name = ""
-
-        # setup an object for holding current student information
-        curr_student = {
-            "name": "",
-            "email_address": "",
-            "team_name": "",
-            "mysore_availability": [],
-            "learning_goals": "",
-            "individual_progress_map_link": "",
-            "self_assessment_link": "",
-        }
+    return header_index
 
-        # parse each individual info field
-        for index, student_info in enumerate(student):
-            # check if index is in header_index before proceeding
-            if index not in header_index:
-                continue
 
-            # if Name, get current student's name
-            if header_index[index] == "Full Name":
-                curr_student_name = student_info
-            # if Mysore Availability, parse comma-separated string into a list
-            elif header_index[index] == "Mysore Availability":
-                mysore_availability_list = [
-                    mysore_time.strip() for mysore_time in student_info.split(",")
-                ]
-                curr_student[header_mapping[header_index[index]]].extend(
-                    mysore_availability_list
-                )
-            # else, add to appropriate field
-            else:
-                curr_student[header_mapping[header_index[index]]] = student_info.strip()
+def parse_student_row(student, header_index, header_mapping):
+    """
+    Parses a single row of the Student Info sheet.
 
-        # add to output
-        output[curr_student_name] = curr_student
+    :param student: list of string cell values for the row.
+    :param header_index: dict of column index to column header, from create_header_index.
+    :param header_mapping: dict of column header to parsed field name.
+    :return: tuple of (string student name, dict of student info).
+    """
+    # hold the current student's name to use as a dict key later
+    curr_student_name = ""
+
+    # setup an object for holding current student information
+    curr_student = {
+        "name": "",
+        "email_address": "",
+        "team_name": "",
+        "mysore_availability": [],
+        "mysore_session": "",
+        "learning_goals": "",
+        "individual_progress_map_link": "",
+        "self_assessment_link": "",
+    }
+
+    # parse each individual info field
+    for index, student_info in enumerate(student):
+        # check if index is in header_index before proceeding
+        if index not in header_index:
+            continue
+
+        # if Name, get current student's name
+        if header_index[index] == "Full Name":
+            curr_student_name = student_info
+        # if Mysore Availability, parse comma-separated string into a list, skipping blanks and repeated times
+        elif header_index[index] == "Mysore Availability":
+            for mysore_time in student_info.split(","):
+                mysore_time = mysore_time.strip()
+                if (
+                    mysore_time != ""
+                    and mysore_time not in curr_student["mysore_availability"]
+                ):
+                    curr_student["mysore_availability"].append(mysore_time)
+        # else, add to appropriate field
+        else:
+            curr_student[header_mapping[header_index[index]]] = student_info.strip()
+
+    return curr_student_name, curr_student
+
+
+def fetch_student_info(spreadsheet, sheet_name):
+    """
+    Fetches information for each student from the Studio Roster Google Spreadsheet.
+    Rows without a Full Name are skipped, and if a name is repeated, its last row is used.
+
+    :param spreadsheet:  gspread spreadsheet object for the Studio Roster.
+    :param sheet_name: string name of sheet where Student Info is stored.
+    :return: dict of students with info relevant specifically to them.
+    """
+    with profiling.phase("roster fetch"):
+        # open correct worksheet and get all values to parse
+        student_info_worksheet = spreadsheet.worksheet(sheet_name)
+        values = student_info_worksheet.get_all_values()
+
+    with profiling.phase("parse"):
+        # create header index object
+        header_index = create_header_index(values[0], STUDENT_HEADER_MAPPING)
+
+        # iterate over each row and parse data
+        output = {}
+        for student in values[1:]:
+            curr_student_name, curr_student = parse_student_row(
+                student, header_index, STUDENT_HEADER_MAPPING
+            )
+
+            # skip rows without a name (e.g., empty rows in the roster)
+            if curr_student_name == "":
+                continue
+
+            # add to output. if a name is repeated, the last row wins but keeps the first row's place
+            output[curr_student_name] = curr_student
 
     # output data
     return output
 
 
-def fetch_team_info(spreadsheet, sheet_name):
+def iter_student_info(spreadsheet, sheet_name, window_size=DEFAULT_WINDOW_SIZE):
     """
-    Fetches Team Information from Studio Roster.
+    Streams information for each student from the Studio Roster Google Spreadsheet, fetching a fixed-size window of
+    rows per request. Only one window (and the list of names) is held in memory at a time, so memory use does not grow
+    with the size of each student's info. Students are yielded exactly as fetch_student_info would parse them: rows
+    without a Full Name are skipped, and a repeated name is yielded once, in its first row's place, with its last row.
 
-    :param spreadsheet: gspread spreadsheet object for the Studio Database.
-    :param sheet_name: string name of sheet where Team Information is stored.
-    :return: dict of parsed Team Information.
+    :param spreadsheet:  gspread spreadsheet object for the Studio Roster.
+    :param sheet_name: string name of sheet where Student Info is stored.
+    :param window_size: int number of rows to fetch per request.
+    :return: generator of (string student name, dict of student info) tuples, in sheet order.
     """
-    # open correct worksheet and get all values to parse
-    studio_info_worksheet = spreadsheet.worksheet(sheet_name)
-    values = studio_info_worksheet.get_all_values()
-
-    # create header mapping object
-    header = values[0]
-    header_mapping = {
-        "Team Name": "team_name",
-        "Week 01 Templates": "week_01_template_link",
-        "Week 02 Templates": "week_02_template_link",
-        "Week 03 Templates": "week_03_template_link",
-        "Week 04 Templates": "week_04_template_link",
-        "Week 05 Templates": "week_05_template_link",
-        "Week 06 Templates": "week_06_template_link",
-        "Week 07 Templates": "week_07_template_link",
-        "Week 08 Templates": "week_08_template_link",
-        "Week 09 Templates": "week_09_template_link",
-        "Final Presentation": "final_presentation_link",
-    }
+    student_info_worksheet = spreadsheet.worksheet(sheet_name)
 
-    # create a header index to lookup header_mapping keys by index number
-    # track any header vals not including in mapping
-    exclude_list = []
-    header_index = {}
+    # create header index object from the first row
+    header = student_info_worksheet.row_values(1)
+    header_index = create_header_index(header, STUDENT_HEADER_MAPPING)
+    if "Full Name" not in header:
+        return
+
+    # find the last row of each name up front, so repeated names can be resolved as they are streamed
+    last_rows = find_last_student_rows(student_info_worksheet, header)
+    yielded_names = set()
+
+    # fetch and parse one window of rows at a time, up to the last row of the sheet
+    last_row = student_info_worksheet.row_count
+    for window_start in range(2, last_row + 1, window_size):
+        window_end = min(window_start + window_size - 1, last_row)
+        with profiling.phase("roster fetch"):
+            window = student_info_worksheet.get(
+                "{start}:{end}".format(start=window_start, end=window_end)
+            )
 
-    for curr_index, curr_val in enumerate(header):
-        if curr_val in header_mapping:
-            header_index[curr_index] = curr_val
-        else:
-            exclude_list.append(curr_val)
+        for row_offset, student in enumerate(window):
+            curr_student_name, curr_student = parse_student_row(
+                student, header_index, STUDENT_HEADER_MAPPING
+            )
+            if curr_student_name == "" or curr_student_name in yielded_names:
+                continue
 
-    if len(exclude_list) > 0:
-        print(
-            "The following columns were included in the Studio Roster Spreadsheet, but not in the header_mapping. "
-            "They will not be included in the parsed Studio Database: {}".format(
-                exclude_list
+            # if the name is repeated later in the sheet, use its last row instead
+            curr_last_row = last_rows[curr_student_name]
+            if curr_last_row != window_start + row_offset:
+                with profiling.phase("roster fetch"):
+                    last_student = student_info_worksheet.row_values(curr_last_row)
+                curr_student_name, curr_student = parse_student_row(
+                    last_student, header_index, STUDENT_HEADER_MAPPING
+                )
+
+            yielded_names.add(curr_student_name)
+            yield curr_student_name, curr_student
+
+
+def find_last_student_rows(student_info_worksheet, header):
+    """
+    Finds the last row of each student name in the Student Info sheet, downloading only the Full Name column.
+
+    :param student_info_worksheet: gspread worksheet object for the Student Info sheet.
+    :param header: list of string column headers from the first row of the sheet.
+    :return: dict of student name to int row number of its last row.
+    """
+    column_letter = rowcol_to_a1(1, header.index("Full Name") + 1)[:-1]
+    with profiling.phase("roster fetch"):
+        name_values = student_info_worksheet.get(
+            "{column}2:{column}{last}".format(
+                column=column_letter, last=student_info_worksheet.row_count
             )
         )
 
-    # iterate over each row and parse data
     output = {}
-    for team in values[1:]:
-        # hold the current team's name to use as a dict key later
-        curr_team_name = ""
+    for index, name_row in enumerate(name_values):
+        if len(name_row) > 0 and name_row[0] != "":
+            output[name_row[0]] = index + 2
 
-        # setup an object for holding current team information
-        curr_team = {"weekly_templates": []}
+    return output
 
-        # parse each individual info field
-        for index, sig_info in enumerate(team):
-            # check if index is in header_index before proceeding
-            if index not in header_index:
-                continue
 
-            # check if a weekly template column
-            pattern = re.compile(r"Week \d+ Template")
-            if pattern.match(header_index[index]):
-                curr_team["weekly_templates"].append(
-                    {"name": header_index[index], "link": sig_info.strip()}
-                )
-            # check if team name column
-            elif header_index[index] == "Team Name":
-                curr_team_name = sig_info.strip()
-            # else, add to appropriate field
+def fetch_team_members(spreadsheet, sheet_name):
+    """
+    Fetches the members of each team from the Student Info sheet, downloading only the Full Name and Team Name columns.
+
+    :param spreadsheet:  gspread spreadsheet object for the Studio Roster.
+    :param sheet_name: string name of sheet where Student Info is stored.
+    :return: dict of team name to list of student names, in sheet order. A repeated name is only listed once, in
+             the team from its last row, like fetch_student_info.
+    """
+    student_info_worksheet = spreadsheet.worksheet(sheet_name)
+
+    # find the name and team columns from the first row, and fetch both in a single request
+    header = student_info_worksheet.row_values(1)
+    column_ranges = []
+    for column_header in ("Full Name", "Team Name"):
+        column_letter = rowcol_to_a1(1, header.index(column_header) + 1)[:-1]
+        column_ranges.append(
+            "{column}2:{column}{last}".format(
+                column=column_letter, last=student_info_worksheet.row_count
+            )
+        )
+    with profiling.phase("roster fetch"):
+        name_values, team_values = student_info_worksheet.batch_get(column_ranges)
+
+    # trailing empty cells are left out of each column, so pad the shorter column
+    team_names = {}
+    for index in range(max(len(name_values), len(team_values))):
+        name_row = name_values[index] if index < len(name_values) else []
+        team_row = team_values[index] if index < len(team_values) else []
+
+        curr_student_name = name_row[0] if len(name_row) > 0 else ""
+        if curr_student_name == "":
+            continue
+
+        curr_team_name = team_row[0].strip() if len(team_row) > 0 else ""
+        team_names[curr_student_name] = curr_team_name
+
+    output = {}
+    for curr_student_name, curr_team_name in team_names.items():
+        output.setdefault(curr_team_name, []).append(curr_student_name)
+
+    return output
+
+
+def fetch_team_info(spreadsheet, sheet_name):
+    """
+    Fetches Team Information from Studio Roster.
+
+    :param spreadsheet: gspread spreadsheet object for the Studio Database.
+    :param sheet_name: string name of sheet where Team Information is stored.
+    :return: dict of parsed Team Information.
+    """
+    with profiling.phase("roster fetch"):
+        # open correct worksheet and get all values to parse
+        studio_info_worksheet = spreadsheet.worksheet(sheet_name)
+        values = studio_info_worksheet.get_all_values()
+
+    with profiling.phase("parse"):
+        # create header mapping object
+        header = values[0]
+        header_mapping = {
+            "Team Name": "team_name",
+            "Week 01 Templates": "week_01_template_link",
+            "Week 02 Templates": "week_02_template_link",
+            "Week 03 Templates": "week_03_template_link",
+            "Week 04 Templates": "week_04_template_link",
+            "Week 05 Templates": "week_05_template_link",
+            "Week 06 Templates": "week_06_template_link",
+            "Week 07 Templates": "week_07_template_link",
+            "Week 08 Templates": "week_08_template_link",
+            "Week 09 Templates": "week_09_template_link",
+            "Final Presentation": "final_presentation_link",
+        }
+
+        # create a header index to lookup header_mapping keys by index number
+        # track any header vals not including in mapping
+        exclude_list = []
+        header_index = {}
+
+        for curr_index, curr_val in enumerate(header):
+            if curr_val in header_mapping:
+                header_index[curr_index] = curr_val
             else:
-                curr_team[header_mapping[header_index[index]]] = sig_info.strip()
+                exclude_list.append(curr_val)
 
-        # add to output
-        output[curr_team_name] = curr_team
+        if len(exclude_list) > 0:
+            print(
+                "The following columns were included in the Studio Roster Spreadsheet, but not in the header_mapping. "
+                "They will not be included in the parsed Studio Database: {}".format(
+                    exclude_list
+                )
+            )
+
+        # iterate over each row and parse data
+        output = {}
+        for team in values[1:]:
+            # hold the current team's name to use as a dict key later
+            curr_team_name = ""
+
+            # setup an object for holding current team information
+            curr_team = {"weekly_templates": []}
+
+            # parse each individual info field
+            for index, sig_info in enumerate(team):
+                # check if index is in header_index before proceeding
+                if index not in header_index:
+                    continue
+
+                # check if a weekly template column
+                pattern = re.compile(r"Week \d+ Template")
+                if pattern.match(header_index[index]):
+                    curr_team["weekly_templates"].append(
+                        {"name": header_index[index], "link": sig_info.strip()}
+                    )
+                # check if team name column
+                elif header_index[index] == "Team Name":
+                    curr_team_name = sig_info.strip()
+                # else, add to appropriate field
+                else:
+                    curr_team[header_mapping[header_index[index]]] = sig_info.strip()
+
+            # add to output
+            output[curr_team_name] = curr_team
 
     # output data
     return output
@@ -211,6 +378,57 @@ def create_studio_db_dict(student_info_dict, team_info_dict):
     return output
 
 
+def iter_studio_db(student_records, team_info_dict, team_members):
+    """
+    Streams Studio Database records, combining each parsed student with their team's info.
+    Unlike create_studio_db_dict, the parsed students are not copied, so records can be exported one at a time.
+
+    :param student_records: iterable of (student name, dict of student info) tuples (e.g., from iter_student_info).
+    :param team_info_dict: dict of parsed Team Info from Studio Roster.
+    :param team_members: dict of team name to list of student names (e.g., from fetch_team_members).
+    :return: generator of (string student name, dict of student info with team_info) tuples.
+    """
+    for student_name, student_info in student_records:
+        # get team info for student, and add team name and members
+        curr_team_name = student_info.pop("team_name")
+        curr_team_info = team_info_dict[curr_team_name]
+        curr_team_info["team_name"] = curr_team_name
+        curr_team_info["team_members"] = team_members.get(curr_team_name, [])
+
+        # add in team_info
+        student_info["team_info"] = curr_team_info
+        yield student_name, student_info
+
+
+def export_studio_db_records_as_json(studio_db_records, output_file):
+    """
+    Exports streamed Studio Database records as json, writing one student at a time. The output is formatted the
+    same way as export_studio_db_as_json.
+
+    :param studio_db_records: iterable of (student name, dict of student info) tuples (e.g., from iter_studio_db).
+    :param output_file: string filepath to output json to.
+    :return: int number of students exported.
+    """
+    student_count = 0
+
+    with open(output_file, "w") as outfile:
+        outfile.write("[")
+
+        for student_name, student_info in studio_db_records:
+            # add the student's name to their info
+            student_info["name"] = student_name
+
+            # indent each student as an element of the top-level list
+            outfile.write("," if student_count > 0 else "")
+            outfile.write("\n    ")
+            outfile.write(json.dumps(student_info, indent=4).replace("\n", "\n    "))
+            student_count += 1
+
+        outfile.write("\n]" if student_count > 0 else "]")
+
+    return student_count
+
+
 def export_studio_db_as_json(studio_db_dict, output_file):
     """
     Exports Studio Database dict as a json object for other tools.
@@ -239,38 +457,172 @@ def export_studio_db_as_json(studio_db_dict, output_file):
     return json.dumps(output, indent=4)
 
 
-def main(spreadsheet_url, student_info_sheet_name, team_info_sheet_name):
+def export_studio_db_as_sqlite(studio_db_dict, output_file, team_info_dict=None):
     """
-    Generates a Studio Database dict, given a Studio Database spreadsheet.
+    Exports Studio Database dict as an indexed SQLite database for other tools.
+    See helpers/studio_db_sqlite.py for functions to query it.
+
+    :param studio_db_dict: dict containing all information for the studio database
+    :param output_file: string filepath to output SQLite database to.
+    :param team_info_dict: optional dict of parsed Team Info, so teams without any students are exported too.
+    :return: None
+    """
+    studio_db_sqlite.export_studio_db(studio_db_dict, output_file, team_info_dict)
+
 
-    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet.
+def export_studio_db_records_as_sqlite(
+    studio_db_records, output_file, team_info_dict=None
+):
+    """
+    Exports streamed Studio Database records as an indexed SQLite database, writing one student at a time.
+
+    :param studio_db_records: iterable of (student name, dict of student info) tuples (e.g., from iter_studio_db).
+    :param output_file: string filepath to output SQLite database to.
+    :param team_info_dict: optional dict of parsed Team Info, so teams without any students are exported too.
+    :return: None
+    """
+    studio_db_sqlite.export_studio_db_records(
+        studio_db_records, output_file, team_info_dict
+    )
+
+
+def stream_studio_db(
+    spreadsheet_url,
+    student_info_sheet_name,
+    team_info_sheet_name,
+    window_size=DEFAULT_WINDOW_SIZE,
+):
+    """
+    Streams Studio Database records from a Studio Database spreadsheet, fetching one window of Student Info rows at a
+    time (see iter_student_info), so memory use does not grow with roster length.
+    An exported SQLite Studio Database is loaded instead.
+
+    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio Database).
     :param student_info_sheet_name: string name of sheet where Student Information is stored.
     :param team_info_sheet_name: string name of sheet where Team Information is stored.
-    :return: dict of parsed studio database.
+    :param window_size: int number of Student Info rows to fetch per request.
+    :return: tuple of (iterable of (student name, dict of student info) records, dict of parsed Team Info).
+    """
+    # load a previously exported studio database
+    if studio_db_sqlite.is_sqlite_path(spreadsheet_url):
+        studio_db_dict, team_info_dict = fetch_studio_db(
+            spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+        )
+        return studio_db_dict.items(), team_info_dict
+
+    # authenticate gspread
+    gc = helpers.auth_gsheets()
+
+    # get spreadsheet
+    with profiling.phase("roster fetch"):
+        curr_spreadsheet = gc.open_by_url(spreadsheet_url)
+
+    # only team info and each team's members are fetched up front. students are fetched as they are streamed.
+    curr_team_info = fetch_team_info(curr_spreadsheet, team_info_sheet_name)
+    curr_team_members = fetch_team_members(curr_spreadsheet, student_info_sheet_name)
+
+    return (
+        iter_studio_db(
+            iter_student_info(curr_spreadsheet, student_info_sheet_name, window_size),
+            curr_team_info,
+            curr_team_members,
+        ),
+        curr_team_info,
+    )
+
+
+def stream_student_info(
+    spreadsheet_url, student_info_sheet_name, window_size=DEFAULT_WINDOW_SIZE
+):
+    """
+    Streams each student in the Studio Roster, fetching one window of Student Info rows at a time (see
+    iter_student_info). An exported SQLite Studio Database is loaded instead.
+
+    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio Database).
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param window_size: int number of Student Info rows to fetch per request.
+    :return: generator of (string student name, dict of student info) tuples.
     """
+    # load a previously exported studio database. the Team Info sheet is not needed to load it.
+    if studio_db_sqlite.is_sqlite_path(spreadsheet_url):
+        yield from main(spreadsheet_url, student_info_sheet_name, None).items()
+        return
+
     # authenticate gspread
     gc = helpers.auth_gsheets()
 
     # get spreadsheet
-    curr_spreadsheet = gc.open_by_url(spreadsheet_url)
+    with profiling.phase("roster fetch"):
+        curr_spreadsheet = gc.open_by_url(spreadsheet_url)
+
+    yield from iter_student_info(curr_spreadsheet, student_info_sheet_name, window_size)
+
+
+def fetch_studio_db(spreadsheet_url, student_info_sheet_name, team_info_sheet_name):
+    """
+    Generates a Studio Database dict, and the info for every team (including teams without any students), given a
+    Studio Database spreadsheet or the filepath of an exported SQLite Studio Database.
+
+    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio Database).
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :return: tuple of (dict of parsed studio database, dict of parsed Team Info).
+    """
+    # load a previously exported studio database
+    if studio_db_sqlite.is_sqlite_path(spreadsheet_url):
+        connection = studio_db_sqlite.connect(spreadsheet_url)
+        try:
+            with profiling.phase("roster fetch"):
+                return (
+                    studio_db_sqlite.load_studio_db_dict(connection),
+                    studio_db_sqlite.load_team_info_dict(connection),
+                )
+        finally:
+            connection.close()
+
+    # authenticate gspread
+    gc = helpers.auth_gsheets()
+
+    # get spreadsheet
+    with profiling.phase("roster fetch"):
+        curr_spreadsheet = gc.open_by_url(spreadsheet_url)
 
     # fetch student and team info
     curr_student_info = fetch_student_info(curr_spreadsheet, student_info_sheet_name)
     curr_team_info = fetch_team_info(curr_spreadsheet, team_info_sheet_name)
 
     # create and output a studio database dict
-    return create_studio_db_dict(curr_student_info, curr_team_info)
+    with profiling.phase("parse"):
+        return create_studio_db_dict(curr_student_info, curr_team_info), curr_team_info
+
+
+def main(spreadsheet_url, student_info_sheet_name, team_info_sheet_name):
+    """
+    Generates a Studio Database dict, given a Studio Database spreadsheet.
+    If given the filepath of an exported SQLite Studio Database instead, it is loaded without fetching the roster.
+
+    :param spreadsheet_url: string url of Studio Roster Google Spreadsheet (or filepath of SQLite Studio Database).
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :return: dict of parsed studio database.
+    """
+    return fetch_studio_db(
+        spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+    )[0]
 
 
 if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
     # get command line args
     arg_count = len(sys.argv) - 1
 
     # check for correct number of arguments
-    if arg_count != 3:
+    if arg_count not in (3, 4):
         raise Exception(
-            "Invalid number of arguments. Expected 3 "
-            "(Studio Roster URL, Student Info sheet name, Team Info sheet name) got {}.".format(
+            "Invalid number of arguments. Expected 3 or 4 "
+            "(Studio Roster URL, Student Info sheet name, Team Info sheet name, optional Output filepath) got {}.".format(
                 arg_count
             )
         )
@@ -279,17 +631,31 @@ if __name__ == "__main__":
     input_spreadsheet_url = sys.argv[1]
     input_student_info_sheet_name = sys.argv[2]
     input_team_info_sheet_name = sys.argv[3]
-    json_output_filepath = "hci_studio_db.json"
+    output_filepath = sys.argv[4] if arg_count == 4 else "hci_studio_db.json"
+
+    with profiling.profile_run("roster_to_json", should_profile):
+        # stream studio database records, one window of students at a time, and keep every team's info for the
+        # SQLite export
+        studio_database_records, team_info = stream_studio_db(
+            input_spreadsheet_url,
+            input_student_info_sheet_name,
+            input_team_info_sheet_name,
+        )
 
-    # generate studio database dict
-    studio_database_dict = main(
-        input_spreadsheet_url, input_student_info_sheet_name, input_team_info_sheet_name
-    )
+        # export as SQLite or json, depending on the output file's extension. students are fetched as they are
+        # exported.
+        with profiling.phase("export"):
+            if studio_db_sqlite.is_sqlite_path(output_filepath):
+                export_studio_db_records_as_sqlite(
+                    studio_database_records, output_filepath, team_info
+                )
+            else:
+                export_studio_db_records_as_json(
+                    studio_database_records, output_filepath
+                )
 
-    # export as json and print exported json
-    export_studio_db_as_json(studio_database_dict, json_output_filepath)
-    print(
-        "Studio Roster successfully parsed and exported to {}".format(
-            json_output_filepath
+        print(
+            "Studio Roster successfully parsed and exported to {}".format(
+                output_filepath
+            )
         )
-    )
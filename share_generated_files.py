@@ -0,0 +1,258 @@
+"""
+This script is used to share generated files (e.g., IPMs, Self-Assessments, Weekly Templates) with the students and
+project teams they were generated for, using batched Google Drive permission requests.
+"""
+
+import sys
+import helpers.imports as helpers
+import helpers.drive as drive
+import helpers.naming as naming
+import roster_to_json as studio_db
+
+
+def find_generated_files(gdrive_service, folder_url, file_type):
+    """
+    Finds all files in a folder that follow the naming convention for a kind of generated file.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folder_url: string url of folder that generated files were copied to.
+    :param file_type: string kind of generated file (e.g., "ipm", "weekly-template").
+    :return: list of (file dict, owner) tuples, where file dicts include existing permissions.
+    """
+    # list the folder once, including who each file is already shared with
+    folder_id = helpers.get_folder_id_from_url(folder_url)
+    folder_files = drive.list_files(
+        gdrive_service,
+        drive.folder_query(folder_id),
+        fields="id, name, permissions(type, emailAddress, domain)",
+    )
+
+    # only keep files that match the naming convention
+    output = []
+    for curr_file in folder_files:
+        curr_owner = naming.match_generated_filename(curr_file["name"], file_type)
+        if curr_owner is not None:
+            output.append((curr_file, curr_owner))
+
+    return output
+
+
+def get_permission_key(permission):
+    """
+    Creates a key for who a permission grants access to, so user, group, and domain permissions are never mistaken
+    for each other. Drive does not always include a permission's emailAddress (e.g., for domain permissions).
+
+    :param permission: dict of Google Drive permission, with type, emailAddress, and domain if set.
+    :return: tuple of (string permission type, string lowercase email address or domain).
+    """
+    return (
+        permission.get("type", ""),
+        (permission.get("emailAddress") or permission.get("domain") or "").lower(),
+    )
+
+
+def resolve_owner_emails(studio_db_dict, file_type):
+    """
+    Creates a lookup from the owner parsed from a generated filename to the email addresses it should be shared with.
+
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param file_type: string kind of generated file (e.g., "ipm", "weekly-template").
+    :return: dict of owner (student short name or team name) to list of email addresses.
+    """
+    output = {}
+
+    # team files are shared with every member of the team
+    if naming.GENERATED_FILE_OWNERS[file_type] == "team":
+        for student_info in studio_db_dict.values():
+            curr_team_name = student_info["team_info"]["team_name"]
+            output.setdefault(curr_team_name, []).append(student_info["email_address"])
+        return output
+
+    # student files are shared with the student, as long as their short name is not ambiguous
+    short_name_index = naming.index_students_by_short_name(studio_db_dict.keys())
+    for short_name, student_names in short_name_index.items():
+        if len(student_names) > 1:
+            print(
+                "Skipping files for {short_name}: matches more than one student ({students}).".format(
+                    short_name=short_name, students="; ".join(student_names)
+                )
+            )
+            continue
+
+        output[short_name] = [studio_db_dict[student_names[0]]["email_address"]]
+
+    return output
+
+
+def share_files(
+    gdrive_service,
+    file_emails,
+    send_notification,
+    existing_permissions=None,
+    role="writer",
+):
+    """
+    Shares files with email addresses using batched permission requests, skipping permissions that already exist.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param file_emails: dict of file id to list of email addresses to share file with.
+    :param send_notification: boolean whether Google Drive should send a notification email for each permission.
+    :param existing_permissions: optional dict of file id to set of permission keys (see get_permission_key) the file
+        is already shared with.
+    :param role: string role to grant (e.g., "writer", "commenter", "reader").
+    :return: tuple of (dict of created permissions, dict of errors), each keyed by (file id, email) tuples.
+    """
+    existing_permissions = existing_permissions or {}
+
+    # create a permission request for each file and email that is not already shared
+    permission_requests = []
+    for file_id, email_list in file_emails.items():
+        curr_existing = existing_permissions.get(file_id, set())
+
+        for email in email_list:
+            if email == "" or ("user", email.lower()) in curr_existing:
+                continue
+
+            permission_requests.append(
+                (
+                    (file_id, email),
+                    gdrive_service.permissions().create(
+                        fileId=file_id,
+                        body={"type": "user", "role": role, "emailAddress": email},
+                        sendNotificationEmail=send_notification,
+                        supportsAllDrives=True,
+                        fields="id",
+                    ),
+                )
+            )
+
+    # send all permission requests in batches
+    return drive.execute_batched(gdrive_service, permission_requests)
+
+
+def share_generated_files(
+    gdrive_service, studio_db_dict, folder_url, file_type, send_notification
+):
+    """
+    Shares every generated file of a given kind in a folder with the student or team it was generated for.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param studio_db_dict: dict containing all information for the studio database.
+    :param folder_url: string url of folder that generated files were copied to.
+    :param file_type: string kind of generated file (e.g., "ipm", "weekly-template").
+    :param send_notification: boolean whether Google Drive should send a notification email for each permission.
+    :return: tuple of (dict of created permissions, dict of errors), each keyed by (file id, email) tuples.
+    """
+    # find generated files, and who they belong to
+    generated_files = find_generated_files(gdrive_service, folder_url, file_type)
+    owner_emails = resolve_owner_emails(studio_db_dict, file_type)
+
+    # map each file to the emails it should be shared with, and who it is already shared with
+    file_emails = {}
+    existing_permissions = {}
+    for curr_file, curr_owner in generated_files:
+        if curr_owner not in owner_emails:
+            print(
+                "Skipping {filename}: no student or team in the Studio Roster matches '{owner}'.".format(
+                    filename=curr_file["name"], owner=curr_owner
+                )
+            )
+            continue
+
+        file_emails[curr_file["id"]] = owner_emails[curr_owner]
+        existing_permissions[curr_file["id"]] = {
+            get_permission_key(permission)
+            for permission in curr_file.get("permissions", [])
+        }
+
+    return share_files(
+        gdrive_service, file_emails, send_notification, existing_permissions
+    )
+
+
+def main(
+    file_type,
+    folder_url,
+    send_notification,
+    roster_spreadsheet_url,
+    student_info_sheet_name,
+    team_info_sheet_name,
+):
+    """
+    Fetches info from Studio Roster, and uses it to share generated files with students and teams.
+
+    :param file_type: string kind of generated file (e.g., "ipm", "weekly-template").
+    :param folder_url: string url of folder that generated files were copied to.
+    :param send_notification: boolean whether Google Drive should send a notification email for each permission.
+    :param roster_spreadsheet_url: string url of Studio Roster Google Spreadsheet.
+    :param student_info_sheet_name: string name of sheet where Student Information is stored.
+    :param team_info_sheet_name: string name of sheet where Team Information is stored.
+    :return: None
+    """
+    # authenticate for Google Drive v3 API
+    gdrive_service = helpers.auth_gdrive()
+
+    # generate studio database from roster
+    studio_db_dict = studio_db.main(
+        roster_spreadsheet_url, student_info_sheet_name, team_info_sheet_name
+    )
+
+    # share generated files
+    created_permissions, failed_permissions = share_generated_files(
+        gdrive_service, studio_db_dict, folder_url, file_type, send_notification
+    )
+
+    # print any failures, and a summary
+    for (file_id, email), error in failed_permissions.items():
+        print(
+            "Could not share {id} with {email}: {error}".format(
+                id=file_id, email=email, error=error
+            )
+        )
+    print(
+        "Created {created} permissions ({failed} failed).".format(
+            created=len(created_permissions), failed=len(failed_permissions)
+        )
+    )
+
+
+if __name__ == "__main__":
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count != 6:
+        raise Exception(
+            "Invalid number of arguments. Expected 6 "
+            "(File Type, Generated Files folder URL, Send Notification (boolean), "
+            "Studio Roster URL, Student Info sheet name, Team Info sheet name) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for sharing generated files
+    input_file_type = sys.argv[1]
+    input_folder_url = sys.argv[2]
+    input_send_notification = True if sys.argv[3] == "true" else False
+
+    # check for a known file type
+    if input_file_type not in naming.GENERATED_FILE_PATTERNS:
+        raise Exception(
+            "Invalid File Type. Expected one of {} got {}.".format(
+                list(naming.GENERATED_FILE_PATTERNS.keys()), input_file_type
+            )
+        )
+
+    # inputs for generating studio database
+    input_studio_db_url = sys.argv[4]
+    input_student_info_sheet_name = sys.argv[5]
+    input_team_info_sheet_name = sys.argv[6]
+
+    main(
+        input_file_type,
+        input_folder_url,
+        input_send_notification,
+        input_studio_db_url,
+        input_student_info_sheet_name,
+        input_team_info_sheet_name,
+    )
@@ -0,0 +1,213 @@
+"""
+This script sends jobs to a running studio_service.py, so small jobs finish without authenticating or fetching the
+roster again. It only uses the standard library, so it starts quickly.
+
+The service's url is read from the STUDIO_SERVICE_URL environment variable (default "http://localhost:8765"), and
+its token from the STUDIO_SERVICE_TOKEN environment variable, or the .studio_service_token file the service writes.
+"""
+
+import json
+import os
+import sys
+import urllib.error
+import urllib.request
+import helpers.pipeline as pipeline
+
+# environment variable holding the service's url, and the url used if it is not set
+SERVICE_URL_ENV_VAR = "STUDIO_SERVICE_URL"
+DEFAULT_SERVICE_URL = "http://localhost:8765"
+
+# environment variable holding the service's token, the file read if it is not set, and the header it is sent in.
+# these match studio_service.py, which is not imported so the client starts quickly.
+SERVICE_TOKEN_ENV_VAR = "STUDIO_SERVICE_TOKEN"
+SERVICE_TOKEN_FILEPATH = ".studio_service_token"
+SERVICE_TOKEN_HEADER = "X-Studio-Token"
+
+# expected arguments (after the command) for each command. optional arguments are in square brackets.
+COMMAND_ARGUMENTS = {
+    "health": [],
+    "roster": [],
+    "refresh": [],
+    "copy_file": ["file URL", "folder URL", "file name"],
+    "ipm": ["template URL", "folder URL", "[Student List as JSON, or -]"],
+    "in-class-activity": [
+        "template URL",
+        "folder URL",
+        "[Student List as JSON, or -]",
+    ],
+    "weekly-templates": [
+        "Template Name",
+        "template URL",
+        "folder URL",
+        "[Project Team Names List as JSON, or -]",
+        "[Personalize (boolean)]",
+    ],
+}
+
+
+def get_service_url():
+    """
+    :return: string url of the running service.
+    """
+    return os.environ.get(SERVICE_URL_ENV_VAR) or DEFAULT_SERVICE_URL
+
+
+def get_service_token():
+    """
+    :return: string token of the running service.
+    :raises Exception: if the token is not set, and the service's token file could not be read.
+    """
+    if os.environ.get(SERVICE_TOKEN_ENV_VAR):
+        return os.environ[SERVICE_TOKEN_ENV_VAR]
+
+    try:
+        with open(SERVICE_TOKEN_FILEPATH) as infile:
+            return infile.read().strip()
+    except FileNotFoundError:
+        raise Exception(
+            "No studio service token found. Set {env_var}, or run from the directory studio_service.py was "
+            "started in (it writes {filepath}).".format(
+                env_var=SERVICE_TOKEN_ENV_VAR, filepath=SERVICE_TOKEN_FILEPATH
+            )
+        )
+
+
+def send_job(method, path, body=None, service_url=None, token=None):
+    """
+    Sends a job to the service and waits for it to finish.
+
+    :param method: string http method.
+    :param path: string path of job (e.g., "/copy_file").
+    :param body: optional dict to send as the JSON request body.
+    :param service_url: optional string url of the service. defaults to get_service_url().
+    :param token: optional string token of the service. defaults to get_service_token().
+    :return: dict response body.
+    :raises Exception: if the service could not be reached, or the job failed.
+    """
+    request = urllib.request.Request(
+        (service_url or get_service_url()) + path,
+        data=json.dumps(body).encode("utf-8") if body is not None else None,
+        headers={
+            "Content-Type": "application/json",
+            SERVICE_TOKEN_HEADER: token or get_service_token(),
+        },
+        method=method,
+    )
+
+    try:
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        raise Exception(
+            "Job failed ({status}): {message}".format(
+                status=error.code, message=json.loads(error.read()).get("error")
+            )
+        )
+    except urllib.error.URLError as error:
+        raise Exception(
+            "Could not reach the studio service at {url}. Is studio_service.py running? ({reason})".format(
+                url=service_url or get_service_url(), reason=error.reason
+            )
+        )
+
+
+def create_job(command, args):
+    """
+    Creates the request for a command.
+
+    :param command: string command (key of COMMAND_ARGUMENTS).
+    :param args: list of string command line arguments after the command.
+    :return: tuple of (string http method, string path, dict body or None).
+    """
+    if command == "health":
+        return "GET", "/health", None
+
+    if command == "roster":
+        return "GET", "/roster", None
+
+    if command == "refresh":
+        return "POST", "/roster/refresh", None
+
+    if command == "copy_file":
+        return (
+            "POST",
+            "/copy_file",
+            {"file_url": args[0], "folder_url": args[1], "file_name": args[2]},
+        )
+
+    if command in ("ipm", "in-class-activity"):
+        body = {"template_url": args[0], "folder_url": args[1]}
+
+        # students default to everyone in the service's roster
+        if len(args) > 2:
+            body["students"] = list(pipeline.parse_items_argument(args[2]))
+        return "POST", "/" + command, body
+
+    # weekly templates
+    body = {"template_name": args[0], "template_url": args[1], "folder_url": args[2]}
+    if len(args) > 3:
+        body["teams"] = list(pipeline.parse_items_argument(args[3]))
+    if len(args) > 4:
+        body["personalize"] = True if args[4] == "true" else False
+    return "POST", "/weekly-templates", body
+
+
+def main(command, args):
+    """
+    Sends a command to the service and prints its result.
+
+    :param command: string command (key of COMMAND_ARGUMENTS).
+    :param args: list of string command line arguments after the command.
+    :return: dict response body.
+    """
+    response = send_job(*create_job(command, args))
+
+    # print generated files the same way the generator scripts do
+    if "records" in response:
+        for record in response["records"]:
+            print(pipeline.format_result_record(record))
+    elif command == "copy_file":
+        copied_file = response["file"]
+        print(
+            "{name}: {id}".format(name=copied_file["name"], id=copied_file["id"])
+            if copied_file is not None
+            else "copy failed"
+        )
+    else:
+        print(json.dumps(response, indent=4))
+
+    return response
+
+
+if __name__ == "__main__":
+    # get command line args
+    arg_count = len(sys.argv) - 1
+    input_command = sys.argv[1] if arg_count > 0 else None
+
+    # check for a known command
+    if input_command not in COMMAND_ARGUMENTS:
+        raise Exception(
+            "Invalid command. Expected one of {} got {}.".format(
+                list(COMMAND_ARGUMENTS.keys()), input_command
+            )
+        )
+
+    # check for correct number of arguments
+    expected_args = COMMAND_ARGUMENTS[input_command]
+    required_count = len([arg for arg in expected_args if not arg.startswith("[")])
+    input_args = sys.argv[2:]
+    if not required_count <= len(input_args) <= len(expected_args):
+        raise Exception(
+            "Invalid number of arguments for {command}. Expected {expected} ({names}) got {count}.".format(
+                command=input_command,
+                expected=(
+                    required_count
+                    if required_count == len(expected_args)
+                    else "{} to {}".format(required_count, len(expected_args))
+                ),
+                names=", ".join(expected_args),
+                count=len(input_args),
+            )
+        )
+
+    main(input_command, input_args)
@@ -0,0 +1,432 @@
+"""
+This script runs a local service that keeps the Google API clients, their connection pool, and (optionally) the
+parsed Studio Roster warm between commands, so small jobs (e.g., copying one file for a late-joining student) do not
+pay for interpreter startup, imports, authentication, discovery, and fetching the roster each time.
+
+Jobs are sent as JSON over HTTP, usually with studio_client.py. The service only listens on localhost, and rejects
+requests whose Host is not localhost or 127.0.0.1. Every request must send the token the service generates at startup
+in an X-Studio-Token header, and POST requests must be application/json. The token is written to
+.studio_service_token, readable only by the user who started the service.
+
+    GET  /health                health check, and whether a roster is loaded.
+    GET  /roster                the cached Studio Database dict.
+    POST /roster/refresh        re-fetches the Studio Roster.
+    POST /copy_file             {"file_url", "folder_url", "file_name"}
+    POST /ipm                   {"template_url", "folder_url", "students" (optional, defaults to the roster)}
+    POST /in-class-activity     {"template_url", "folder_url", "students" (optional, defaults to the roster)}
+    POST /weekly-templates      {"template_name", "template_url", "folder_url", "teams" (optional, defaults to the
+                                roster), "personalize" (optional boolean, uses the roster)}
+
+Generator jobs respond with {"records": [...]}, the same result records the generators yield.
+"""
+
+import hmac
+import importlib
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import helpers.imports as helpers
+import helpers.profiling as profiling
+import helpers.concurrency as concurrency
+import roster_to_json as studio_db
+from copy_gdrive_file import copy_file
+from create_ipm import generate_ipm
+from create_weekly_templates import (
+    generate_weekly_templates,
+    personalize_weekly_templates,
+)
+
+# the In-Class Activity generator's module name is not a valid identifier, so it cannot be imported with "import"
+create_activity_module = importlib.import_module("create_in-class-activity")
+
+# port the service listens on, unless another is given
+DEFAULT_PORT = 8765
+
+# header every request must send the service's token in, and the file the token is written to for studio_client.py
+TOKEN_HEADER = "X-Studio-Token"
+TOKEN_FILEPATH = ".studio_service_token"
+
+# hosts a request can be sent to. requests for any other host (e.g., a rebound DNS name) are rejected.
+ALLOWED_HOSTS = ("localhost", "127.0.0.1")
+
+
+class BadRequest(Exception):
+    """
+    Raised by a job when its request is missing something, so the service responds with a 400.
+    """
+
+
+def get_required(body, key):
+    """
+    :param body: dict of parsed JSON request body.
+    :param key: string key the job needs.
+    :return: value of key in body.
+    :raises BadRequest: if body does not have key.
+    """
+    if key not in body:
+        raise BadRequest("Missing '{}' in request.".format(key))
+
+    return body[key]
+
+
+class StudioService:
+    """
+    Holds the warm clients, roster, and copy and populate controllers that every job shares.
+    """
+
+    def __init__(self, roster_args=None):
+        """
+        Authenticates every client up front, and fetches the roster if one is given.
+
+        :param roster_args: optional tuple of (Studio Roster URL, Student Info sheet name, Team Info sheet name).
+        """
+        # the copy and populate limits learned by one job carry over to the next
+        self.copy_controller = concurrency.AdaptiveConcurrencyController("copy")
+        self.populate_controller = concurrency.AdaptiveConcurrencyController("populate")
+
+        # pool enough connections for the most copies and deck personalizations in flight at once
+        pool_size = concurrency.get_pool_size(
+            self.copy_controller, self.populate_controller
+        )
+        self.gdrive_service = helpers.auth_gdrive(pool_size)
+        self.gspreadsheets_service = helpers.auth_gsheets(pool_size)
+        self.gslides_service = helpers.auth_gslides(pool_size)
+
+        self.roster_args = roster_args
+        self.studio_db_dict = None
+        self.start_time = time.monotonic()
+        self._roster_lock = threading.Lock()
+
+        if roster_args is not None:
+            self.refresh_roster({})
+
+        # each route maps to the job that handles it
+        self.routes = {
+            ("GET", "/health"): self.health,
+            ("GET", "/roster"): self.get_roster,
+            ("POST", "/roster/refresh"): self.refresh_roster,
+            ("POST", "/copy_file"): self.copy_file,
+            ("POST", "/ipm"): self.generate_ipm,
+            ("POST", "/in-class-activity"): self.generate_activity,
+            ("POST", "/weekly-templates"): self.generate_weekly_templates,
+        }
+
+    def get_studio_db_dict(self):
+        """
+        :return: dict of the cached studio database.
+        :raises BadRequest: if the service was started without a roster.
+        """
+        if self.studio_db_dict is None:
+            raise BadRequest(
+                "No Studio Roster is loaded. Start the service with a roster, or give students or teams."
+            )
+
+        return self.studio_db_dict
+
+    def get_students(self, body):
+        """
+        :param body: dict of parsed JSON request body.
+        :return: list of students from the request, or every student in the cached roster.
+        """
+        if "students" in body:
+            return body["students"]
+
+        return [name for name in self.get_studio_db_dict().keys() if name != ""]
+
+    def get_team_info_dict(self):
+        """
+        :return: dict of team name to Team Info (including team_members), from the cached roster.
+        """
+        return {
+            student_info["team_info"]["team_name"]: student_info["team_info"]
+            for student_info in self.get_studio_db_dict().values()
+        }
+
+    def health(self, body):
+        """
+        :param body: dict of parsed JSON request body (unused).
+        :return: dict with the service's status, whether a roster is loaded, and its uptime in seconds.
+        """
+        return {
+            "status": "ok",
+            "roster_loaded": self.studio_db_dict is not None,
+            "uptime": time.monotonic() - self.start_time,
+        }
+
+    def get_roster(self, body):
+        """
+        :param body: dict of parsed JSON request body (unused).
+        :return: dict of the cached studio database.
+        """
+        return self.get_studio_db_dict()
+
+    def refresh_roster(self, body):
+        """
+        Re-fetches the Studio Roster the service was started with.
+
+        :param body: dict of parsed JSON request body (unused).
+        :return: dict with the number of students in the new roster.
+        """
+        if self.roster_args is None:
+            raise BadRequest("The service was started without a Studio Roster.")
+
+        # only one refresh at a time. jobs keep using the old roster until the new one is parsed.
+        with self._roster_lock:
+            self.studio_db_dict = studio_db.main(*self.roster_args)
+
+        return {"students": len(self.studio_db_dict)}
+
+    def copy_file(self, body):
+        """
+        Copies a single file, as copy_gdrive_file.py does.
+
+        :param body: dict of parsed JSON request body with file_url, folder_url, and file_name.
+        :return: dict with the copied file, or None if the copy failed.
+        """
+        copied_file = self.copy_controller.call(
+            copy_file,
+            self.gdrive_service,
+            get_required(body, "file_url"),
+            get_required(body, "folder_url"),
+            get_required(body, "file_name"),
+        )
+        return {"file": copied_file}
+
+    def generate_ipm(self, body):
+        """
+        :param body: dict of parsed JSON request body with template_url, folder_url, and optional students.
+        :return: dict with a list of result records.
+        """
+        records = generate_ipm(
+            self.get_students(body),
+            self.gdrive_service,
+            get_required(body, "template_url"),
+            get_required(body, "folder_url"),
+            self.copy_controller,
+        )
+        return {"records": list(records)}
+
+    def generate_activity(self, body):
+        """
+        :param body: dict of parsed JSON request body with template_url, folder_url, and optional students.
+        :return: dict with a list of result records.
+        """
+        records = create_activity_module.generate_activity(
+            self.get_students(body),
+            self.gdrive_service,
+            get_required(body, "template_url"),
+            get_required(body, "folder_url"),
+            self.copy_controller,
+        )
+        return {"records": list(records)}
+
+    def generate_weekly_templates(self, body):
+        """
+        :param body: dict of parsed JSON request body with template_name, template_url, folder_url, optional teams,
+            and optional personalize.
+        :return: dict with a list of result records.
+        """
+        teams = body["teams"] if "teams" in body else list(self.get_team_info_dict())
+        records = generate_weekly_templates(
+            teams,
+            self.gdrive_service,
+            get_required(body, "template_name"),
+            get_required(body, "template_url"),
+            get_required(body, "folder_url"),
+            self.copy_controller,
+        )
+
+        # personalize each deck with its team's info from the cached roster, as it is copied
+        if body.get("personalize", False):
+            records = personalize_weekly_templates(
+                self.gslides_service,
+                records,
+                self.get_team_info_dict().get,
+                get_required(body, "template_name"),
+                self.populate_controller,
+            )
+
+        return {"records": list(records)}
+
+    def handle(self, method, path, body):
+        """
+        Runs the job for a request.
+
+        :param method: string http method.
+        :param path: string request path.
+        :param body: dict of parsed JSON request body.
+        :return: tuple of (int http status, dict response body).
+        """
+        job = self.routes.get((method, path))
+        if job is None:
+            return 404, {"error": "Unknown job: {} {}".format(method, path)}
+
+        try:
+            return 200, job(body)
+        except BadRequest as error:
+            return 400, {"error": str(error)}
+        except Exception as error:
+            return 500, {"error": "{}: {}".format(type(error).__name__, error)}
+
+
+def write_token_file(token, filepath=TOKEN_FILEPATH):
+    """
+    Writes the service's token to a file that only the current user can read, replacing any earlier token.
+
+    :param token: string token requests must send.
+    :param filepath: string filepath to write the token to.
+    :return: None
+    """
+    if os.path.exists(filepath):
+        os.remove(filepath)
+
+    file_descriptor = os.open(filepath, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(file_descriptor, "w") as outfile:
+        outfile.write(token)
+
+
+def is_allowed_host(host):
+    """
+    :param host: string Host header of a request (e.g., "localhost:8765"), or None if it was not sent.
+    :return: boolean whether the request was sent to localhost or 127.0.0.1.
+    """
+    if host is None:
+        return False
+
+    return urllib.parse.urlsplit("//" + host).hostname in ALLOWED_HOSTS
+
+
+def create_service_server(service, token, port=DEFAULT_PORT):
+    """
+    Creates (but does not start) a local http server that runs jobs on a StudioService.
+
+    :param service: StudioService to run jobs on.
+    :param token: string token every request must send in the TOKEN_HEADER header.
+    :param port: int port to listen on. 0 picks any free port.
+    :return: ThreadingHTTPServer. call serve_forever() to start it.
+    """
+
+    class StudioServiceHandler(BaseHTTPRequestHandler):
+        def send_json(self, status, body):
+            content = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(content)))
+            self.end_headers()
+            self.wfile.write(content)
+
+        def check_request(self, method):
+            """
+            :param method: string http method.
+            :return: tuple of (int http status, dict response body) to reject the request with, or None to run it.
+            """
+            if not is_allowed_host(self.headers.get("Host")):
+                return 403, {"error": "Requests must be sent to localhost."}
+
+            if not hmac.compare_digest(
+                self.headers.get(TOKEN_HEADER, "").encode("utf-8"),
+                token.encode("utf-8"),
+            ):
+                return 401, {
+                    "error": "Missing or invalid {} header.".format(TOKEN_HEADER)
+                }
+
+            if (
+                method == "POST"
+                and self.headers.get_content_type() != "application/json"
+            ):
+                return 415, {"error": "Requests must be sent as application/json."}
+
+            return None
+
+        def run_job(self, method):
+            rejection = self.check_request(method)
+            if rejection is not None:
+                self.send_json(*rejection)
+                return
+
+            # requests without a body are treated as an empty JSON object
+            content_length = int(self.headers.get("Content-Length", 0))
+            try:
+                body = (
+                    json.loads(self.rfile.read(content_length))
+                    if content_length > 0
+                    else {}
+                )
+            except json.JSONDecodeError as error:
+                self.send_json(400, {"error": "Invalid JSON: {}".format(error)})
+                return
+
+            # every job takes its arguments as named fields
+            if not isinstance(body, dict):
+                self.send_json(400, {"error": "Request body must be a JSON object."})
+                return
+
+            # jobs are routed by path alone, so a query string does not change the job
+            self.send_json(
+                *service.handle(method, urllib.parse.urlsplit(self.path).path, body)
+            )
+
+        def do_GET(self):
+            self.run_job("GET")
+
+        def do_POST(self):
+            self.run_job("POST")
+
+    return ThreadingHTTPServer(("localhost", port), StudioServiceHandler)
+
+
+def main(port, roster_args=None):
+    """
+    Authenticates, fetches the roster (if given), and serves jobs until stopped.
+
+    :param port: int port to listen on.
+    :param roster_args: optional tuple of (Studio Roster URL, Student Info sheet name, Team Info sheet name).
+    :return: None
+    """
+    # a new token is generated each time the service starts, for studio_client.py to read
+    token = secrets.token_urlsafe(32)
+    server = create_service_server(StudioService(roster_args), token, port)
+    write_token_file(token)
+    print(
+        "Studio service listening on http://localhost:{port} (token in {filepath})".format(
+            port=port, filepath=TOKEN_FILEPATH
+        )
+    )
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(TOKEN_FILEPATH)
+
+
+if __name__ == "__main__":
+    # strip the optional --profile flag before checking arguments
+    should_profile = profiling.pop_profile_flag(sys.argv)
+
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count not in (1, 4):
+        raise Exception(
+            "Invalid number of arguments. Expected 1 (Port) or 4 "
+            "(Port, Studio Roster URL, Student Info sheet name, Team Info sheet name) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for running the service
+    input_port = int(sys.argv[1])
+    input_roster_args = tuple(sys.argv[2:5]) if arg_count == 4 else None
+
+    with profiling.profile_run("studio_service", should_profile):
+        main(input_port, input_roster_args)
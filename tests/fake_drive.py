@@ -0,0 +1,201 @@
+"""
+This module includes an in-memory fake of the parts of the Google Drive v3 client that the scripts use, so tests can
+run without Google.
+"""
+
+import itertools
+import re
+
+import helpers.drive as drive
+
+
+class FakeRequest:
+    """
+    Stands in for a googleapiclient HttpRequest. The call only happens when it is executed.
+    """
+
+    def __init__(self, service, method, function):
+        self.service = service
+        self.method = method
+        self.function = function
+
+    def execute(self):
+        self.service.calls.append(self.method)
+        return self.function()
+
+
+class FakeBatch:
+    """
+    Stands in for a googleapiclient BatchHttpRequest.
+    """
+
+    def __init__(self, service, callback):
+        self.service = service
+        self.callback = callback
+        self.requests = []
+
+    def add(self, request, request_id):
+        self.requests.append((request_id, request))
+
+    def execute(self):
+        self.service.batch_sizes.append(len(self.requests))
+        for request_id, request in self.requests:
+            self.callback(request_id, request.execute(), None)
+
+
+class FakeDriveService:
+    """
+    Holds files in memory, keyed by id. Each file is a dict with name, mimeType, parents, trashed, and permissions.
+    Every executed call's method is recorded in calls, and every batch's size in batch_sizes.
+    """
+
+    def __init__(self):
+        self.files_by_id = {}
+        self.calls = []
+        self.batch_sizes = []
+        self.changed_file_ids = []
+        self._ids = itertools.count()
+
+    def add_file(self, name, parent_id, mime_type="", permissions=None, **fields):
+        """
+        Adds a file without recording a call.
+
+        :return: string id of added file.
+        """
+        file_id = "file-{}".format(next(self._ids))
+        self.files_by_id[file_id] = dict(
+            name=name,
+            mimeType=mime_type,
+            parents=[parent_id],
+            trashed=False,
+            permissions=list(permissions or []),
+            **fields
+        )
+        return file_id
+
+    def add_folder(self, name, parent_id):
+        return self.add_file(name, parent_id, mime_type=drive.FOLDER_MIME_TYPE)
+
+    def find_files(self, name=None, parent_id=None):
+        """
+        :return: list of (string file id, file dict) tuples for non-trashed files matching a name and parent.
+        """
+        return [
+            (file_id, curr_file)
+            for file_id, curr_file in self.files_by_id.items()
+            if not curr_file["trashed"]
+            and (name is None or curr_file["name"] == name)
+            and (parent_id is None or parent_id in curr_file["parents"])
+        ]
+
+    def touch(self, file_id):
+        """
+        Records a change to a file in the changes feed.
+        """
+        self.changed_file_ids.append(file_id)
+
+    def files(self):
+        return self
+
+    def changes(self):
+        return FakeChanges(self)
+
+    def permissions(self):
+        return FakePermissions(self)
+
+    def new_batch_http_request(self, callback):
+        return FakeBatch(self, callback)
+
+    def list(self, q, fields, pageSize, pageToken, **kwargs):
+        # only the query shapes built by helpers/drive.py are supported
+        parent_ids = re.findall(r"'([^']+)' in parents", q)
+        mime_types = re.findall(r"mimeType = '([^']+)'", q)
+
+        def run():
+            return {
+                "files": [
+                    dict(curr_file, id=file_id)
+                    for file_id, curr_file in self.files_by_id.items()
+                    if not curr_file["trashed"]
+                    and set(curr_file["parents"]) & set(parent_ids)
+                    and (not mime_types or curr_file["mimeType"] in mime_types)
+                ]
+            }
+
+        return FakeRequest(self, "files.list", run)
+
+    def create(self, body, fields=None, **kwargs):
+        def run():
+            file_id = self.add_file(
+                body["name"], body["parents"][0], body.get("mimeType", "")
+            )
+            return {"id": file_id, "name": body["name"]}
+
+        return FakeRequest(self, "files.create", run)
+
+    def copy(self, fileId, body, fields=None, **kwargs):
+        def run():
+            # templates do not need to be added to the fake first
+            source = self.files_by_id.get(fileId, {})
+            file_id = self.add_file(
+                body["name"], body["parents"][0], source.get("mimeType", "")
+            )
+            return {"id": file_id, "name": body["name"]}
+
+        return FakeRequest(self, "files.copy", run)
+
+    def update(self, fileId, body=None, addParents=None, removeParents=None, **kwargs):
+        def run():
+            curr_file = self.files_by_id[fileId]
+            curr_file.update(body or {})
+            if removeParents is not None:
+                curr_file["parents"] = [
+                    parent_id
+                    for parent_id in curr_file["parents"]
+                    if parent_id != removeParents
+                ]
+            if addParents is not None:
+                curr_file["parents"].append(addParents)
+            return {"id": fileId, "name": curr_file["name"]}
+
+        return FakeRequest(self, "files.update", run)
+
+
+class FakePermissions:
+    def __init__(self, service):
+        self.service = service
+
+    def create(self, fileId, body, **kwargs):
+        def run():
+            self.service.files_by_id[fileId]["permissions"].append(dict(body))
+            return {"id": "permission-{}".format(len(self.service.calls))}
+
+        return FakeRequest(self.service, "permissions.create", run)
+
+
+class FakeChanges:
+    """
+    Serves the service's changed file ids as a changes feed. Page tokens are positions in the list of changes.
+    """
+
+    def __init__(self, service):
+        self.service = service
+
+    def getStartPageToken(self, **kwargs):
+        return FakeRequest(
+            self.service,
+            "changes.getStartPageToken",
+            lambda: {"startPageToken": str(len(self.service.changed_file_ids))},
+        )
+
+    def list(self, pageToken, **kwargs):
+        def run():
+            return {
+                "changes": [
+                    {"fileId": file_id}
+                    for file_id in self.service.changed_file_ids[int(pageToken) :]
+                ],
+                "newStartPageToken": str(len(self.service.changed_file_ids)),
+            }
+
+        return FakeRequest(self.service, "changes.list", run)
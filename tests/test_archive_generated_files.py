@@ -0,0 +1,61 @@
+import unittest
+
+from archive_generated_files import add_member_names, create_member_name
+
+
+def create_archive_file(file_id, name, folder_name, extension="pdf"):
+    return {
+        "id": file_id,
+        "name": name,
+        "folder_name": folder_name,
+        "extension": extension,
+    }
+
+
+class TestMemberNames(unittest.TestCase):
+    def test_slashes_do_not_create_directories(self):
+        self.assertEqual(
+            create_member_name("IPMs/Fall", "[John D.] IPM", "pdf"),
+            "IPMs-Fall/[John D.] IPM.pdf",
+        )
+
+    def test_unique_names_are_kept(self):
+        archive_files = [
+            create_archive_file("a", "[John D.] IPM", "IPMs"),
+            create_archive_file("b", "[Jane D.] IPM", "IPMs"),
+            create_archive_file("c", "[John D.] IPM", "Self-Assessments"),
+        ]
+
+        add_member_names(archive_files)
+
+        self.assertEqual(
+            [archive_file["member_name"] for archive_file in archive_files],
+            [
+                "IPMs/[John D.] IPM.pdf",
+                "IPMs/[Jane D.] IPM.pdf",
+                "Self-Assessments/[John D.] IPM.pdf",
+            ],
+        )
+
+    def test_duplicate_names_get_file_ids(self):
+        # folders with the same name, owned by different people
+        archive_files = [
+            create_archive_file("a", "[John D.] IPM", "IPMs"),
+            create_archive_file("b", "[John D.] IPM", "IPMs"),
+            create_archive_file("c", "[John D.] IPM", "IPMs", extension=None),
+        ]
+
+        add_member_names(archive_files)
+
+        self.assertEqual(
+            [archive_file["member_name"] for archive_file in archive_files],
+            [
+                "IPMs/[John D.] IPM-a.pdf",
+                "IPMs/[John D.] IPM-b.pdf",
+                "IPMs/[John D.] IPM",
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,103 @@
+import unittest
+
+import cleanup_generated_files
+from tests.fake_drive import FakeDriveService
+
+STUDIO_DB_DICT = {
+    "John Doe": {"team_info": {"team_name": "Milky Way"}},
+    "Jane Doe": {"team_info": {"team_name": "Andromeda"}},
+}
+
+
+def create_file(file_id, name, modified_time="2024-01-01T00:00:00Z"):
+    return {"id": file_id, "name": name, "modifiedTime": modified_time}
+
+
+class TestFindDuplicatesAndOrphans(unittest.TestCase):
+    def test_keeps_most_recent_copy(self):
+        folder_files = [
+            create_file("old", "[John D.] Individual Progress Map (IPM)"),
+            create_file(
+                "new",
+                "[John D.] Individual Progress Map (IPM)",
+                "2024-02-01T00:00:00Z",
+            ),
+            create_file("orphan", "[Sam S.] Individual Progress Map (IPM)"),
+            create_file("other", "Meeting notes"),
+        ]
+
+        duplicates, orphans = cleanup_generated_files.find_duplicates_and_orphans(
+            folder_files, "ipm", STUDIO_DB_DICT
+        )
+
+        self.assertEqual([curr_file["id"] for curr_file in duplicates], ["old"])
+        self.assertEqual([curr_file["id"] for curr_file in orphans], ["orphan"])
+
+    def test_weekly_templates_only_match_template_name(self):
+        folder_files = [
+            create_file("week-1", "[Milky Way] Template 01"),
+            create_file("week-2", "[Milky Way] Template 02"),
+            create_file("orphan", "[Old Team] Template 01"),
+            create_file("unrelated", "[Old Team] Design Review"),
+        ]
+
+        duplicates, orphans = cleanup_generated_files.find_duplicates_and_orphans(
+            folder_files, "weekly-template", STUDIO_DB_DICT, "Template 01"
+        )
+
+        self.assertEqual(duplicates, [])
+        self.assertEqual([curr_file["id"] for curr_file in orphans], ["orphan"])
+
+    def test_weekly_templates_need_template_name(self):
+        with self.assertRaises(Exception):
+            cleanup_generated_files.find_duplicates_and_orphans(
+                [], "weekly-template", STUDIO_DB_DICT
+            )
+
+
+class TestCleanupFolder(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeDriveService()
+        self.old_id = self.service.add_file(
+            "[John D.] Individual Progress Map (IPM)",
+            "folder",
+            modifiedTime="2024-01-01T00:00:00Z",
+        )
+        self.new_id = self.service.add_file(
+            "[John D.] Individual Progress Map (IPM)",
+            "folder",
+            modifiedTime="2024-02-01T00:00:00Z",
+        )
+        self.orphan_id = self.service.add_file(
+            "[Sam S.] Individual Progress Map (IPM)",
+            "folder",
+            modifiedTime="2024-01-01T00:00:00Z",
+        )
+
+    def cleanup(self, trash_orphans):
+        return cleanup_generated_files.cleanup_folder(
+            self.service,
+            STUDIO_DB_DICT,
+            "https://drive.google.com/drive/folders/folder",
+            "ipm",
+            dry_run=False,
+            trash_orphans=trash_orphans,
+        )
+
+    def test_orphans_are_kept_by_default(self):
+        trashed = self.cleanup(trash_orphans=False)
+
+        self.assertEqual([curr_file["id"] for curr_file in trashed], [self.old_id])
+        self.assertFalse(self.service.files_by_id[self.orphan_id]["trashed"])
+        self.assertFalse(self.service.files_by_id[self.new_id]["trashed"])
+
+    def test_orphans_are_trashed_when_asked(self):
+        self.cleanup(trash_orphans=True)
+
+        self.assertTrue(self.service.files_by_id[self.old_id]["trashed"])
+        self.assertTrue(self.service.files_by_id[self.orphan_id]["trashed"])
+        self.assertFalse(self.service.files_by_id[self.new_id]["trashed"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest import mock
+
+import helpers.naming as naming
+from create_self_assessments import (
+    TEAM_COPY_FILENAME_FORMAT,
+    generate_self_assessment,
+    generate_self_assessment_per_team,
+)
+from tests.fake_drive import FakeDriveService
+
+TEMPLATE_URL = "https://docs.google.com/spreadsheets/d/template/edit"
+
+
+def create_student_info(team_name):
+    return {
+        "email_address": "student@example.edu",
+        "learning_goals": "",
+        "individual_progress_map_link": "",
+        "team_info": {
+            "team_name": team_name,
+            "team_members": [],
+            "weekly_templates": [{"name": "Week 01 Templates", "link": ""}],
+            "final_presentation_link": "",
+        },
+    }
+
+
+STUDIO_DB_DICT = {
+    "John Doe": create_student_info("Milky Way"),
+    "Jane Doe": create_student_info("Andromeda"),
+    "Sam Smith": create_student_info("Andromeda"),
+}
+
+
+class FakeHttpClient:
+    def __init__(self, gdrive_service, failing_name=None):
+        self.gdrive_service = gdrive_service
+        self.failing_name = failing_name
+
+    def values_batch_update(self, spreadsheet_id, body):
+        if self.gdrive_service.files_by_id[spreadsheet_id]["name"] == (
+            self.failing_name
+        ):
+            raise ValueError("populate failed")
+
+
+class FakeSheetsClient:
+    def __init__(self, gdrive_service, failing_name=None):
+        self.http_client = FakeHttpClient(gdrive_service, failing_name)
+
+
+class TestPerTeamSelfAssessments(unittest.TestCase):
+    def setUp(self):
+        self.gdrive_service = FakeDriveService()
+        self.folder_id = self.gdrive_service.add_folder("Self-Assessments", "root")
+        self.folder_url = "https://drive.google.com/drive/folders/{id}".format(
+            id=self.folder_id
+        )
+
+    def get_untrashed_names(self):
+        return sorted(
+            curr_file["name"]
+            for _, curr_file in self.gdrive_service.find_files(parent_id=self.folder_id)
+        )
+
+    def test_team_copies_are_trashed(self):
+        generate_self_assessment_per_team(
+            STUDIO_DB_DICT,
+            self.gdrive_service,
+            FakeSheetsClient(self.gdrive_service),
+            TEMPLATE_URL,
+            self.folder_url,
+        )
+
+        self.assertEqual(
+            self.get_untrashed_names(),
+            sorted(
+                naming.self_assessment_filename(student_name)
+                for student_name in STUDIO_DB_DICT
+            ),
+        )
+
+    def test_team_copies_are_trashed_when_populating_fails(self):
+        with self.assertRaises(ValueError):
+            generate_self_assessment_per_team(
+                STUDIO_DB_DICT,
+                self.gdrive_service,
+                FakeSheetsClient(
+                    self.gdrive_service,
+                    TEAM_COPY_FILENAME_FORMAT.format(team_name="Andromeda"),
+                ),
+                TEMPLATE_URL,
+                self.folder_url,
+            )
+
+        # every team copy that was made is trashed, including the one that failed
+        self.assertEqual(self.get_untrashed_names(), [])
+
+
+class TestSelfAssessments(unittest.TestCase):
+    def test_failed_copy_does_not_stop_the_others(self):
+        failing_filename = naming.self_assessment_filename("Jane Doe")
+
+        def copy_file(gdrive_service, file_url, folder_url, file_name):
+            if file_name == failing_filename:
+                return None
+            return {"id": file_name}
+
+        with mock.patch("create_self_assessments.copy_file", copy_file):
+            with mock.patch("builtins.print") as mock_print:
+                generate_self_assessment(
+                    STUDIO_DB_DICT,
+                    None,
+                    None,
+                    TEMPLATE_URL,
+                    "https://drive.google.com/drive/folders/self-assessments",
+                    False,
+                )
+
+        printed_lines = [call.args[0] for call in mock_print.call_args_list]
+        self.assertIn("{}: copy failed".format(failing_filename), printed_lines)
+        self.assertEqual(
+            len([line for line in printed_lines if "docs.google.com" in line]), 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,118 @@
+import unittest
+from unittest import mock
+
+import httplib2
+from apiclient import errors
+
+from create_weekly_templates import (
+    PREVIOUS_WEEK_LINK_PLACEHOLDER,
+    create_replacement_requests,
+    find_previous_week_link,
+    parse_template_week_number,
+    personalize_weekly_templates,
+)
+
+TEAM_INFO = {
+    "team_members": ["John Doe", "Jane Doe"],
+    "weekly_templates": [
+        {"name": "Week 01 Templates", "link": "https://example.com/1"},
+        {"name": "Week 02 Templates", "link": ""},
+        {"name": "Week 03 Templates", "link": "https://example.com/3"},
+    ],
+}
+
+
+class TestPreviousWeekLink(unittest.TestCase):
+    def test_parse_template_week_number(self):
+        self.assertEqual(
+            parse_template_week_number(
+                "Template 02: Needfinding and Analysis On Your Own"
+            ),
+            2,
+        )
+        self.assertEqual(parse_template_week_number("Week 1"), 1)
+        self.assertIsNone(parse_template_week_number("Final Presentation"))
+
+    def test_previous_week_is_chosen_by_week_number(self):
+        # the latest link in the roster is week 3's, but week 2's deck links to week 1
+        self.assertEqual(
+            find_previous_week_link(TEAM_INFO, "Template 02: Prototyping"),
+            "https://example.com/1",
+        )
+
+    def test_missing_previous_week_is_blank(self):
+        self.assertEqual(find_previous_week_link(TEAM_INFO, "Template 03: Testing"), "")
+        self.assertEqual(find_previous_week_link(TEAM_INFO, "Template 01: Intro"), "")
+        self.assertEqual(find_previous_week_link(TEAM_INFO, "Final Presentation"), "")
+
+    def test_replacement_requests(self):
+        requests = create_replacement_requests(
+            "Milky Way", TEAM_INFO, "Template 04: Iteration"
+        )
+        replacements = {
+            request["replaceAllText"]["containsText"]["text"]: request[
+                "replaceAllText"
+            ]["replaceText"]
+            for request in requests
+        }
+
+        self.assertEqual(
+            replacements[PREVIOUS_WEEK_LINK_PLACEHOLDER], "https://example.com/3"
+        )
+        self.assertEqual(replacements["{{team_members}}"], "John Doe, Jane Doe")
+
+
+class FailingSlidesService:
+    """
+    Stands in for a Google Slides service whose batchUpdate is rate limited for some decks.
+    """
+
+    def __init__(self, failing_presentation_ids):
+        self.failing_presentation_ids = failing_presentation_ids
+
+    def presentations(self):
+        return self
+
+    def batchUpdate(self, presentationId, body):
+        return FailingSlidesRequest(presentationId in self.failing_presentation_ids)
+
+
+class FailingSlidesRequest:
+    def __init__(self, should_fail):
+        self.should_fail = should_fail
+
+    def execute(self):
+        if self.should_fail:
+            raise errors.HttpError(httplib2.Response({"status": 400}), b"Bad Request")
+        return {}
+
+
+class TestPersonalizeWeeklyTemplates(unittest.TestCase):
+    def setUp(self):
+        # keep error messages out of the test output
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_failed_deck_does_not_stop_the_others(self):
+        copied_templates = [
+            {"name": team, "filename": team, "file_id": team, "url": team}
+            for team in ("Milky Way", "Andromeda", "Triangulum")
+        ]
+
+        records = personalize_weekly_templates(
+            FailingSlidesService({"Andromeda"}),
+            copied_templates,
+            {team: TEAM_INFO for team in ("Milky Way", "Andromeda", "Triangulum")}.get,
+            "Template 02: Prototyping",
+        )
+        records = {record["name"]: record for record in records}
+
+        self.assertTrue(records["Milky Way"]["personalized"])
+        self.assertTrue(records["Triangulum"]["personalized"])
+        self.assertFalse(records["Andromeda"]["personalized"])
+        self.assertIn("Bad Request", records["Andromeda"]["error"])
+
+
+if __name__ == "__main__":
+    unittest.main()
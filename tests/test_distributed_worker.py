@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+
+import httplib2
+from apiclient import errors
+
+import helpers.leases as leases
+import helpers.naming as naming
+from distributed_worker import add_team_info, run_worker
+from tests.fake_drive import FakeDriveService
+
+RUN_ID = "weekly-templates"
+TEMPLATE_NAME = "Template 02: Prototyping"
+
+TEAM_INFO = {
+    "Milky Way": {
+        "team_members": ["John Doe"],
+        "weekly_templates": [
+            {"name": "Week 01 Templates", "link": "https://example.com/milky-way"}
+        ],
+    },
+    "Andromeda": {
+        "team_members": ["Jane Doe"],
+        "weekly_templates": [
+            {"name": "Week 01 Templates", "link": "https://example.com/andromeda"}
+        ],
+    },
+}
+
+
+class FakeSlidesService:
+    def __init__(self, failure_count=0):
+        """
+        :param failure_count: int number of batchUpdate calls that fail before the rest succeed.
+        """
+        self.batch_updates = {}
+        self.failure_count = failure_count
+
+    def presentations(self):
+        return self
+
+    def batchUpdate(self, presentationId, body):
+        self.batch_updates[presentationId] = body["requests"]
+        return self
+
+    def execute(self):
+        if self.failure_count > 0:
+            self.failure_count -= 1
+            raise errors.HttpError(httplib2.Response({"status": 400}), b"Bad Request")
+        return {}
+
+
+class TestDistributedWorker(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.lease_file = os.path.join(temp_dir.name, "leases.db")
+
+        self.gdrive_service = FakeDriveService()
+        self.folder_id = self.gdrive_service.add_folder("Weekly Templates", "root")
+        self.gslides_service = FakeSlidesService()
+
+        self.connection = leases.connect(self.lease_file)
+        self.addCleanup(self.connection.close)
+        leases.create_run(
+            self.connection,
+            RUN_ID,
+            {
+                "file_type": "weekly-template",
+                "template_url": "https://docs.google.com/presentation/d/template/edit",
+                "folder_url": "https://drive.google.com/drive/folders/{id}".format(
+                    id=self.folder_id
+                ),
+                "template_name": TEMPLATE_NAME,
+                "personalize": True,
+            },
+            add_team_info(["Andromeda", {"name": "Milky Way"}], TEAM_INFO.get),
+        )
+
+    def get_replacements(self, file_id):
+        return {
+            request["replaceAllText"]["containsText"]["text"]: request[
+                "replaceAllText"
+            ]["replaceText"]
+            for request in self.gslides_service.batch_updates[file_id]
+        }
+
+    def test_decks_are_personalized_before_jobs_are_done(self):
+        # a worker died after copying Andromeda's deck, but before personalizing it
+        leases.claim_jobs(self.connection, RUN_ID, "dead-worker", 1)
+        self.connection.execute("UPDATE jobs SET lease_expires = 0")
+        reused_file_id = self.gdrive_service.add_file(
+            naming.weekly_template_filename("Andromeda", TEMPLATE_NAME),
+            self.folder_id,
+        )
+
+        completed_count = run_worker(
+            self.gdrive_service,
+            self.lease_file,
+            RUN_ID,
+            poll_interval=0,
+            gslides_service=self.gslides_service,
+        )
+
+        self.assertEqual(completed_count, 2)
+        self.assertEqual(
+            len(self.gdrive_service.find_files(parent_id=self.folder_id)), 2
+        )
+
+        # the reused deck is personalized again
+        self.assertEqual(
+            self.get_replacements(reused_file_id)["{{previous_week_link}}"],
+            "https://example.com/andromeda",
+        )
+
+        (milky_way_file_id,) = [
+            file_id
+            for file_id, _ in self.gdrive_service.find_files(
+                naming.weekly_template_filename("Milky Way", TEMPLATE_NAME),
+                self.folder_id,
+            )
+        ]
+        self.assertEqual(
+            self.get_replacements(milky_way_file_id)["{{team_members}}"], "John Doe"
+        )
+
+    def test_failed_personalization_is_retried(self):
+        self.gslides_service.failure_count = 1
+
+        completed_count = run_worker(
+            self.gdrive_service,
+            self.lease_file,
+            RUN_ID,
+            poll_interval=0,
+            gslides_service=self.gslides_service,
+        )
+
+        self.assertEqual(self.gslides_service.failure_count, 0)
+
+        # the job whose deck failed is released, and the next attempt reuses and personalizes its deck
+        self.assertEqual(completed_count, 2)
+        self.assertEqual(leases.count_jobs(self.connection, RUN_ID)["done"], 2)
+        self.assertEqual(
+            len(self.gdrive_service.find_files(parent_id=self.folder_id)), 2
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
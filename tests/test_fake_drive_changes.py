@@ -0,0 +1,56 @@
+import threading
+import unittest
+
+import httplib2
+from googleapiclient.discovery import build
+
+import watch_roster
+from copy_gdrive_file import copy_file_request
+from helpers.fake_drive_changes import FakeChangesFeed, create_fake_changes_server
+
+FOLDER_URL = "https://drive.google.com/drive/folders/ipm-folder"
+
+
+class TestFakeDriveChangesServer(unittest.TestCase):
+    def setUp(self):
+        self.feed = FakeChangesFeed()
+        server = create_fake_changes_server(self.feed, 0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        # a real Drive client, pointed at the fake like the watcher's api_endpoint config
+        self.gdrive_service = build(
+            "drive",
+            "v3",
+            http=httplib2.Http(),
+            client_options={
+                "api_endpoint": "http://localhost:{}".format(server.server_address[1])
+            },
+            static_discovery=True,
+        )
+
+    def test_changes_feed(self):
+        page_token = watch_roster.get_start_page_token(self.gdrive_service)
+        self.feed.touch("roster")
+
+        changed_file_ids, _ = watch_roster.poll_changes(self.gdrive_service, page_token)
+
+        self.assertEqual(changed_file_ids, {"roster"})
+
+    def test_watcher_file_calls(self):
+        copy_file_request(
+            self.gdrive_service, "template", "ipm-folder", "[John D.] IPM"
+        )
+
+        missing_owners = watch_roster.find_missing_files(
+            self.gdrive_service,
+            FOLDER_URL,
+            {"[John D.] IPM": "John Doe", "[Jane D.] IPM": "Jane Doe"},
+        )
+
+        self.assertEqual(missing_owners, ["Jane Doe"])
+
+
+if __name__ == "__main__":
+    unittest.main()
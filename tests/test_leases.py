@@ -0,0 +1,145 @@
+import os
+import tempfile
+import unittest
+
+import helpers.leases as leases
+
+RUN_ID = "ipm-fall"
+
+
+class TestLeases(unittest.TestCase):
+    def setUp(self):
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        self.lease_file = os.path.join(temp_dir.name, "leases.db")
+
+        self.connection = leases.connect(self.lease_file)
+        self.addCleanup(self.connection.close)
+        leases.create_run(
+            self.connection,
+            RUN_ID,
+            {"file_type": "ipm"},
+            ["John Doe", {"name": "Jane Doe"}, "Sam Smith"],
+        )
+
+    def get_job(self, job_key):
+        return self.connection.execute(
+            "SELECT * FROM jobs WHERE run_id = ? AND job_key = ?", (RUN_ID, job_key)
+        ).fetchone()
+
+    def expire_leases(self):
+        self.connection.execute("UPDATE jobs SET lease_expires = 0")
+
+    def test_create_run_only_adds_new_items(self):
+        added_count = leases.create_run(
+            self.connection, RUN_ID, {"file_type": "ipm"}, ["John Doe", "Ana Lee"]
+        )
+
+        self.assertEqual(added_count, 1)
+        self.assertEqual(leases.count_jobs(self.connection, RUN_ID)["pending"], 4)
+        self.assertEqual(
+            leases.get_run_config(self.connection, RUN_ID), {"file_type": "ipm"}
+        )
+
+    def test_claims_do_not_overlap(self):
+        first_jobs = leases.claim_jobs(self.connection, RUN_ID, "worker-1", 2)
+        second_jobs = leases.claim_jobs(self.connection, RUN_ID, "worker-2", 2)
+
+        self.assertEqual(
+            [job["job_key"] for job in first_jobs], ["John Doe", "Jane Doe"]
+        )
+        self.assertEqual([job["job_key"] for job in second_jobs], ["Sam Smith"])
+        self.assertEqual(first_jobs[1]["item"], {"name": "Jane Doe"})
+        self.assertEqual(first_jobs[0]["attempts"], 1)
+        self.assertEqual(leases.claim_jobs(self.connection, RUN_ID, "worker-3", 2), [])
+        self.assertEqual(leases.count_jobs(self.connection, RUN_ID)["leased"], 3)
+
+    def test_only_lease_holder_completes_and_renews(self):
+        leases.claim_jobs(self.connection, RUN_ID, "worker-1", 1)
+
+        self.assertEqual(
+            leases.renew_leases(
+                self.connection, RUN_ID, "worker-2", ["John Doe"], lease_seconds=600
+            ),
+            0,
+        )
+        self.assertFalse(
+            leases.complete_job(self.connection, RUN_ID, "worker-2", "John Doe", {})
+        )
+        self.assertEqual(
+            leases.renew_leases(
+                self.connection, RUN_ID, "worker-1", ["John Doe"], lease_seconds=600
+            ),
+            1,
+        )
+        self.assertTrue(
+            leases.complete_job(
+                self.connection, RUN_ID, "worker-1", "John Doe", {"file_id": "a"}
+            )
+        )
+
+        job = self.get_job("John Doe")
+        self.assertEqual(job["status"], "done")
+        self.assertEqual(job["result"], '{"file_id": "a"}')
+
+        # a done job cannot be completed again, or renewed
+        self.assertFalse(
+            leases.complete_job(self.connection, RUN_ID, "worker-1", "John Doe", {})
+        )
+        self.assertEqual(
+            leases.renew_leases(self.connection, RUN_ID, "worker-1", ["John Doe"]), 0
+        )
+
+    def test_released_job_is_claimed_again(self):
+        leases.claim_jobs(self.connection, RUN_ID, "worker-1", 1)
+        leases.release_job(self.connection, RUN_ID, "worker-1", "John Doe")
+
+        self.assertEqual(self.get_job("John Doe")["status"], "pending")
+
+        jobs = leases.claim_jobs(self.connection, RUN_ID, "worker-2", 1)
+        self.assertEqual(jobs[0]["job_key"], "John Doe")
+        self.assertEqual(jobs[0]["attempts"], 2)
+
+    def test_expired_lease_is_reclaimed(self):
+        leases.claim_jobs(self.connection, RUN_ID, "worker-1", 1)
+        self.expire_leases()
+
+        jobs = leases.claim_jobs(self.connection, RUN_ID, "worker-2", 1)
+
+        self.assertEqual(jobs[0]["job_key"], "John Doe")
+        self.assertEqual(jobs[0]["attempts"], 2)
+
+        # the dead worker lost its lease, so it can no longer complete the job
+        self.assertFalse(
+            leases.complete_job(self.connection, RUN_ID, "worker-1", "John Doe", {})
+        )
+        self.assertTrue(
+            leases.complete_job(self.connection, RUN_ID, "worker-2", "John Doe", {})
+        )
+
+    def test_job_fails_after_max_attempts(self):
+        for _ in range(2):
+            leases.claim_jobs(self.connection, RUN_ID, "worker-1", 1, max_attempts=2)
+            self.expire_leases()
+
+        # the job expired on its last attempt, so it is failed instead of claimed again
+        jobs = leases.claim_jobs(self.connection, RUN_ID, "worker-2", 1, max_attempts=2)
+
+        self.assertEqual(jobs[0]["job_key"], "Jane Doe")
+        self.assertEqual(self.get_job("John Doe")["status"], "failed")
+
+    def test_release_fails_job_after_max_attempts(self):
+        leases.claim_jobs(self.connection, RUN_ID, "worker-1", 1)
+        leases.release_job(
+            self.connection, RUN_ID, "worker-1", "John Doe", max_attempts=1
+        )
+
+        self.assertEqual(self.get_job("John Doe")["status"], "failed")
+        self.assertEqual(
+            leases.count_jobs(self.connection, RUN_ID),
+            {"pending": 2, "leased": 0, "done": 0, "failed": 1},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
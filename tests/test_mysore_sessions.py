@@ -0,0 +1,91 @@
+import itertools
+import random
+import unittest
+
+from helpers.mysore_sessions import assign_sessions
+
+
+def find_most_placed(availability, capacities):
+    """
+    :return: int most students any assignment can place, found by trying every assignment.
+    """
+    students = list(availability)
+    most_placed = 0
+    for choices in itertools.product(
+        *[[None] + availability[student] for student in students]
+    ):
+        placed = [session for session in choices if session is not None]
+        if all(placed.count(session) <= capacities[session] for session in placed):
+            most_placed = max(most_placed, len(placed))
+
+    return most_placed
+
+
+class TestAssignSessions(unittest.TestCase):
+    def assert_valid(self, availability, capacities, placements):
+        self.assertEqual(set(placements), set(availability))
+        for student, session in placements.items():
+            if session is not None:
+                self.assertIn(session, availability[student])
+
+        for session, capacity in capacities.items():
+            self.assertLessEqual(list(placements.values()).count(session), capacity)
+
+    def test_chain_of_moves_makes_room(self):
+        availability = {
+            "Ana": ["Mon 10am", "Tue 2pm"],
+            "Ben": ["Tue 2pm", "Wed 9am"],
+            "Cam": ["Mon 10am", "Tue 2pm"],
+        }
+        capacities = {"Mon 10am": 1, "Tue 2pm": 1, "Wed 9am": 1}
+
+        placements = assign_sessions(availability, capacities)
+
+        # Cam only fits once Ben moves from Tue 2pm to Wed 9am
+        self.assert_valid(availability, capacities, placements)
+        self.assertNotIn(None, placements.values())
+        self.assertEqual(placements["Ben"], "Wed 9am")
+
+    def test_unplaceable_students_and_unknown_sessions(self):
+        availability = {
+            "Ana": ["Mon 10am"],
+            "Ben": ["Mon 10am"],
+            "Cam": ["Fri 5pm"],
+            "Dee": [],
+        }
+        capacities = {"Mon 10am": 1, "Tue 2pm": 3}
+
+        placements = assign_sessions(availability, capacities)
+
+        self.assert_valid(availability, capacities, placements)
+        self.assertEqual(list(placements.values()).count("Mon 10am"), 1)
+        self.assertIsNone(placements["Cam"])
+        self.assertIsNone(placements["Dee"])
+
+    def test_matches_brute_force(self):
+        random_generator = random.Random(0)
+        sessions = ["Mon 10am", "Tue 2pm", "Wed 9am"]
+
+        for _ in range(200):
+            capacities = {
+                session: random_generator.randint(0, 2) for session in sessions
+            }
+            availability = {
+                "Student {}".format(index): random_generator.sample(
+                    sessions, random_generator.randint(0, len(sessions))
+                )
+                for index in range(6)
+            }
+
+            placements = assign_sessions(availability, capacities)
+
+            self.assert_valid(availability, capacities, placements)
+            self.assertEqual(
+                sum(session is not None for session in placements.values()),
+                find_most_placed(availability, capacities),
+                availability,
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
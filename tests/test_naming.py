@@ -0,0 +1,52 @@
+import unittest
+
+import helpers.naming as naming
+
+
+class TestNaming(unittest.TestCase):
+    def test_student_short_name(self):
+        self.assertEqual(naming.student_short_name("John Doe"), "John D.")
+        self.assertEqual(naming.student_short_name("Mary Ann Smith"), "Mary S.")
+
+    def test_filenames_match_their_own_pattern(self):
+        filenames = {
+            "ipm": naming.ipm_filename("John Doe"),
+            "self-assessment": naming.self_assessment_filename("John Doe"),
+            "mid-quarter-self-assessment": naming.mid_quarter_self_assessment_filename(
+                "John Doe"
+            ),
+            "in-class-activity": naming.activity_filename("John Doe"),
+        }
+
+        for file_type, filename in filenames.items():
+            self.assertEqual(
+                naming.match_generated_filename(filename, file_type), "John D."
+            )
+            self.assertEqual(
+                naming.find_generated_file_type(filename), (file_type, "John D.")
+            )
+
+    def test_weekly_template_does_not_match_other_generated_files(self):
+        self.assertEqual(
+            naming.match_generated_filename(
+                naming.weekly_template_filename("Milky Way", "Template 01"),
+                "weekly-template",
+            ),
+            "Milky Way",
+        )
+        self.assertIsNone(
+            naming.match_generated_filename(
+                naming.ipm_filename("John Doe"), "weekly-template"
+            )
+        )
+        self.assertIsNone(naming.find_generated_file_type("Meeting notes"))
+
+    def test_index_students_by_short_name(self):
+        self.assertEqual(
+            naming.index_students_by_short_name(["John Doe", "John Dean", "Jane Doe"]),
+            {"John D.": ["John Doe", "John Dean"], "Jane D.": ["Jane Doe"]},
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
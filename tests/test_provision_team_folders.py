@@ -0,0 +1,140 @@
+import os
+import tempfile
+import unittest
+
+import provision_team_folders
+from tests.fake_drive import FakeDriveService
+
+STUDIO_DB_DICT = {
+    "John Doe": {"team_info": {"team_name": "Milky Way"}},
+    "Jane Doe": {"team_info": {"team_name": "Andromeda"}},
+    "Sam Smith": {"team_info": {"team_name": "Cigar"}},
+}
+
+
+class TestProvisionFolders(unittest.TestCase):
+    def setUp(self):
+        self.gdrive_service = FakeDriveService()
+        self.root_id = self.gdrive_service.add_folder("Teams", "root")
+        self.cache = {"root_folder_id": self.root_id, "teams": {}}
+
+    def get_folder_id(self, name, parent_id):
+        ((folder_id, _),) = self.gdrive_service.find_files(name, parent_id)
+        return folder_id
+
+    def test_finds_existing_and_creates_missing_folders(self):
+        milky_way_id = self.gdrive_service.add_folder("Milky Way", self.root_id)
+        week_1_id = self.gdrive_service.add_folder("Week 1", milky_way_id)
+
+        found_count, created_count, failures = provision_team_folders.provision_folders(
+            self.gdrive_service,
+            self.cache,
+            ["Milky Way", "Andromeda"],
+            ["Week 1", "Week 2"],
+        )
+
+        self.assertEqual((found_count, created_count, failures), (2, 4, {}))
+        self.assertEqual(
+            self.cache["teams"]["Milky Way"],
+            {
+                "folder_id": milky_way_id,
+                "weeks": {
+                    "Week 1": week_1_id,
+                    "Week 2": self.get_folder_id("Week 2", milky_way_id),
+                },
+            },
+        )
+        andromeda_id = self.get_folder_id("Andromeda", self.root_id)
+        self.assertEqual(
+            self.cache["teams"]["Andromeda"]["weeks"]["Week 2"],
+            self.get_folder_id("Week 2", andromeda_id),
+        )
+
+        # one listing of the root, and one of the team folders that existed before
+        self.assertEqual(self.gdrive_service.calls.count("files.list"), 2)
+
+    def test_cached_folders_are_not_looked_up_again(self):
+        provision_team_folders.provision_folders(
+            self.gdrive_service, self.cache, ["Milky Way"], ["Week 1"]
+        )
+        call_count = len(self.gdrive_service.calls)
+
+        result = provision_team_folders.provision_folders(
+            self.gdrive_service, self.cache, ["Milky Way"], ["Week 1"]
+        )
+
+        self.assertEqual(result, (0, 0, {}))
+        self.assertEqual(len(self.gdrive_service.calls), call_count)
+
+    def test_folders_are_created_in_batches(self):
+        team_names = ["Team {}".format(index) for index in range(150)]
+
+        _, created_count, _ = provision_team_folders.provision_folders(
+            self.gdrive_service, self.cache, team_names
+        )
+
+        self.assertEqual(created_count, 150)
+        self.assertEqual(self.gdrive_service.batch_sizes, [100, 50])
+
+    def test_cache_round_trip(self):
+        provision_team_folders.provision_folders(
+            self.gdrive_service, self.cache, ["Milky Way"]
+        )
+        temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(temp_dir.cleanup)
+        cache_path = os.path.join(temp_dir.name, "team_folders.json")
+
+        provision_team_folders.save_folder_cache(self.cache, cache_path)
+
+        self.assertEqual(
+            provision_team_folders.load_folder_cache(cache_path, self.root_id),
+            self.cache,
+        )
+        self.assertEqual(
+            provision_team_folders.read_folder_cache(cache_path), self.cache
+        )
+
+        # a cache made for another root folder is not used
+        self.assertEqual(
+            provision_team_folders.load_folder_cache(cache_path, "other-root"),
+            {"root_folder_id": "other-root", "teams": {}},
+        )
+
+
+class TestTeamFolderItems(unittest.TestCase):
+    def setUp(self):
+        self.cache = {
+            "root_folder_id": "root",
+            "teams": {
+                "Milky Way": {"folder_id": "milky-way", "weeks": {"Week 1": "mw-1"}},
+                "Andromeda": {"folder_id": "andromeda", "weeks": {}},
+            },
+        }
+
+    def test_add_team_folders(self):
+        studio_db_dict = {
+            student_name: dict(student_info)
+            for student_name, student_info in STUDIO_DB_DICT.items()
+        }
+
+        provision_team_folders.add_team_folders(studio_db_dict, self.cache)
+
+        self.assertEqual(studio_db_dict["John Doe"]["folder_id"], "milky-way")
+        self.assertEqual(studio_db_dict["Jane Doe"]["folder_id"], "andromeda")
+        self.assertNotIn("folder_id", studio_db_dict["Sam Smith"])
+
+    def test_create_items_for_week(self):
+        self.assertEqual(
+            provision_team_folders.create_items(
+                STUDIO_DB_DICT, self.cache, "teams", "Week 1"
+            ),
+            [
+                {"name": "Andromeda"},
+                {"name": "Cigar"},
+                {"name": "Milky Way", "folder_id": "mw-1"},
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,132 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from gspread.utils import a1_to_rowcol
+
+import roster_to_json as studio_db
+
+
+def trim_values(values):
+    """
+    Leaves out trailing empty cells and rows, like the Sheets API does.
+    """
+    output = []
+    for row in values:
+        row = list(row)
+        while len(row) > 0 and row[-1] == "":
+            row.pop()
+        output.append(row)
+    while len(output) > 0 and len(output[-1]) == 0:
+        output.pop()
+    return output
+
+
+class FakeWorksheet:
+    def __init__(self, values):
+        self.values = values
+        self.row_count = len(values) + 5
+
+    def get_all_values(self):
+        return self.values
+
+    def row_values(self, row):
+        return trim_values(self.values[row - 1 : row])[0]
+
+    def get(self, range_name):
+        start, end = range_name.split(":")
+
+        # whole rows
+        if start.isdigit():
+            return trim_values(self.values[int(start) - 1 : int(end)])
+
+        # single column
+        start_row, column = a1_to_rowcol(start)
+        end_row, _ = a1_to_rowcol(end)
+        return trim_values(
+            [[row[column - 1]] for row in self.values[start_row - 1 : end_row]]
+        )
+
+    def batch_get(self, range_names):
+        return [self.get(range_name) for range_name in range_names]
+
+
+class FakeSpreadsheet:
+    def __init__(self, sheets):
+        self.sheets = sheets
+
+    def worksheet(self, sheet_name):
+        return FakeWorksheet(self.sheets[sheet_name])
+
+
+class TestRosterToJson(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.spreadsheet = FakeSpreadsheet(
+            {
+                "Student Info": [
+                    ["Full Name", "Email", "Team Name"],
+                    ["John Doe", "john@example.edu", "Milky Way"],
+                    ["", "", ""],
+                    ["Jane Doe", "jane@example.edu", "Andromeda"],
+                    ["", "nobody@example.edu", "Andromeda"],
+                    ["John Doe", "john.doe@example.edu", "Andromeda"],
+                    ["Sam Smith", "sam@example.edu", "Milky Way"],
+                    ["", "", ""],
+                ],
+                "Team Info": [["Team Name"], ["Milky Way"], ["Andromeda"]],
+            }
+        )
+
+        # keep roster parsing warnings out of the test output
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_blank_and_repeated_names(self):
+        student_info_dict = studio_db.fetch_student_info(
+            self.spreadsheet, "Student Info"
+        )
+
+        self.assertEqual(
+            list(student_info_dict.keys()), ["John Doe", "Jane Doe", "Sam Smith"]
+        )
+        self.assertEqual(
+            student_info_dict["John Doe"]["email_address"], "john.doe@example.edu"
+        )
+        self.assertEqual(
+            studio_db.fetch_team_members(self.spreadsheet, "Student Info"),
+            {"Andromeda": ["John Doe", "Jane Doe"], "Milky Way": ["Sam Smith"]},
+        )
+
+    def test_streamed_export_matches_dict_export(self):
+        json_file = os.path.join(self.temp_dir.name, "studio_db.json")
+        streamed_json_file = os.path.join(self.temp_dir.name, "streamed_studio_db.json")
+
+        studio_db.export_studio_db_as_json(
+            studio_db.create_studio_db_dict(
+                studio_db.fetch_student_info(self.spreadsheet, "Student Info"),
+                studio_db.fetch_team_info(self.spreadsheet, "Team Info"),
+            ),
+            json_file,
+        )
+        student_count = studio_db.export_studio_db_records_as_json(
+            studio_db.iter_studio_db(
+                studio_db.iter_student_info(
+                    self.spreadsheet, "Student Info", window_size=2
+                ),
+                studio_db.fetch_team_info(self.spreadsheet, "Team Info"),
+                studio_db.fetch_team_members(self.spreadsheet, "Student Info"),
+            ),
+            streamed_json_file,
+        )
+
+        self.assertEqual(student_count, 3)
+        with open(json_file) as infile, open(streamed_json_file) as streamed_infile:
+            self.assertEqual(streamed_infile.read(), infile.read())
+
+
+if __name__ == "__main__":
+    unittest.main()
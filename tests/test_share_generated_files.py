@@ -0,0 +1,77 @@
+import unittest
+
+import share_generated_files
+from tests.fake_drive import FakeDriveService
+
+
+class TestShareFiles(unittest.TestCase):
+    def test_get_permission_key(self):
+        self.assertEqual(
+            share_generated_files.get_permission_key(
+                {"type": "user", "emailAddress": "Jane@Example.edu"}
+            ),
+            ("user", "jane@example.edu"),
+        )
+        self.assertEqual(
+            share_generated_files.get_permission_key(
+                {"type": "domain", "domain": "example.edu"}
+            ),
+            ("domain", "example.edu"),
+        )
+        self.assertEqual(
+            share_generated_files.get_permission_key({"type": "anyone"}),
+            ("anyone", ""),
+        )
+
+    def test_share_files_skips_existing_user_permissions(self):
+        service = FakeDriveService()
+        file_id = service.add_file("[John D.] Individual Progress Map (IPM)", "root")
+
+        created, failed = share_generated_files.share_files(
+            service,
+            {file_id: ["john@example.edu", "jane@example.edu", ""]},
+            send_notification=False,
+            existing_permissions={
+                file_id: {
+                    ("user", "john@example.edu"),
+                    ("group", "jane@example.edu"),
+                }
+            },
+        )
+
+        # a group with the same address does not give the student access
+        self.assertEqual(list(created.keys()), [(file_id, "jane@example.edu")])
+        self.assertEqual(failed, {})
+        self.assertEqual(service.calls, ["permissions.create"])
+
+    def test_share_generated_files_uses_listed_permissions(self):
+        service = FakeDriveService()
+        shared_id = service.add_file(
+            "[John D.] Individual Progress Map (IPM)",
+            "folder",
+            permissions=[{"type": "user", "emailAddress": "John@example.edu"}],
+        )
+        domain_id = service.add_file(
+            "[Jane D.] Individual Progress Map (IPM)",
+            "folder",
+            permissions=[{"type": "domain", "domain": "example.edu"}],
+        )
+        studio_db_dict = {
+            "John Doe": {"email_address": "john@example.edu"},
+            "Jane Doe": {"email_address": "jane@example.edu"},
+        }
+
+        created, _ = share_generated_files.share_generated_files(
+            service,
+            studio_db_dict,
+            "https://drive.google.com/drive/folders/folder",
+            "ipm",
+            send_notification=False,
+        )
+
+        self.assertEqual(list(created.keys()), [(domain_id, "jane@example.edu")])
+        self.assertNotIn(shared_id, [file_id for file_id, _ in created])
+
+
+if __name__ == "__main__":
+    unittest.main()
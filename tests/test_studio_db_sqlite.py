@@ -0,0 +1,157 @@
+import copy
+import os
+import tempfile
+import unittest
+
+import helpers.studio_db_sqlite as studio_db_sqlite
+import roster_to_json as studio_db
+
+STUDENT_INFO = {
+    "John Doe": {
+        "email_address": "john@example.edu",
+        "learning_goals": "",
+        "team_name": "Milky Way",
+        "individual_progress_map_link": "",
+        "self_assessment_link": "",
+        "mysore_availability": ["Mon 10am"],
+        "mysore_session": "",
+    },
+}
+
+TEAM_INFO = {
+    "Milky Way": {
+        "weekly_templates": [
+            {"name": "Week 01 Templates", "link": "https://example.com/1"},
+            {"name": "Week 02 Templates", "link": ""},
+        ],
+        "final_presentation_link": "",
+    },
+    "Andromeda": {
+        "weekly_templates": [
+            {"name": "Week 01 Templates", "link": "https://example.com/a"}
+        ],
+        "final_presentation_link": "",
+    },
+}
+
+
+class TestStudioDbSqlite(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.temp_dir.cleanup)
+        self.db_file = os.path.join(self.temp_dir.name, "studio_db.db")
+
+        studio_db_dict = studio_db.create_studio_db_dict(STUDENT_INFO, TEAM_INFO)
+        studio_db_sqlite.export_studio_db(studio_db_dict, self.db_file, TEAM_INFO)
+
+        self.connection = studio_db_sqlite.connect(self.db_file)
+        self.addCleanup(self.connection.close)
+
+    def test_find_student(self):
+        student = studio_db_sqlite.find_student(self.connection, "John Doe")
+
+        self.assertEqual(student["email_address"], "john@example.edu")
+        self.assertEqual(student["team_info"]["team_members"], ["John Doe"])
+        self.assertEqual(
+            studio_db_sqlite.find_student_by_email(self.connection, "JOHN@example.edu")[
+                "name"
+            ],
+            "John Doe",
+        )
+        self.assertIsNone(studio_db_sqlite.find_student(self.connection, "Nobody"))
+
+    def test_teams_without_students_are_exported(self):
+        team = studio_db_sqlite.find_team(self.connection, "Andromeda")
+
+        self.assertEqual(team["team_members"], [])
+        self.assertEqual(
+            sorted(studio_db_sqlite.load_team_info_dict(self.connection).keys()),
+            ["Andromeda", "Milky Way"],
+        )
+        self.assertEqual(
+            studio_db_sqlite.find_weekly_templates(self.connection, 1),
+            {
+                "Milky Way": "https://example.com/1",
+                "Andromeda": "https://example.com/a",
+            },
+        )
+
+    def test_round_trip(self):
+        studio_db_dict = studio_db_sqlite.load_studio_db_dict(self.connection)
+
+        self.assertEqual(list(studio_db_dict.keys()), ["John Doe"])
+        self.assertEqual(
+            studio_db_dict["John Doe"]["team_info"]["weekly_templates"],
+            TEAM_INFO["Milky Way"]["weekly_templates"],
+        )
+
+    def test_export_streamed_records(self):
+        streamed_db_file = os.path.join(self.temp_dir.name, "streamed_studio_db.db")
+        team_info_dict = copy.deepcopy(TEAM_INFO)
+        studio_db_records = studio_db.iter_studio_db(
+            copy.deepcopy(STUDENT_INFO).items(),
+            team_info_dict,
+            {"Milky Way": ["John Doe"]},
+        )
+
+        studio_db_sqlite.export_studio_db_records(
+            studio_db_records, streamed_db_file, team_info_dict
+        )
+
+        streamed_connection = studio_db_sqlite.connect(streamed_db_file)
+        self.addCleanup(streamed_connection.close)
+        self.assertEqual(
+            studio_db_sqlite.load_studio_db_dict(streamed_connection),
+            studio_db_sqlite.load_studio_db_dict(self.connection),
+        )
+        self.assertEqual(
+            studio_db_sqlite.find_team(streamed_connection, "Andromeda")[
+                "team_members"
+            ],
+            [],
+        )
+
+    def test_repeated_names_keep_the_last_record(self):
+        repeated_db_file = os.path.join(self.temp_dir.name, "repeated_studio_db.db")
+        first_record = copy.deepcopy(STUDENT_INFO["John Doe"])
+        first_record["team_info"] = copy.deepcopy(TEAM_INFO["Milky Way"])
+        first_record["team_info"]["team_name"] = "Milky Way"
+        other_record = copy.deepcopy(first_record)
+        other_record["email_address"] = "jane@example.edu"
+        last_record = copy.deepcopy(first_record)
+        last_record["email_address"] = "john.doe@example.edu"
+
+        studio_db_sqlite.export_studio_db_records(
+            [
+                ("John Doe", first_record),
+                ("Jane Doe", other_record),
+                ("John Doe", last_record),
+            ],
+            repeated_db_file,
+        )
+
+        repeated_connection = studio_db_sqlite.connect(repeated_db_file)
+        self.addCleanup(repeated_connection.close)
+        studio_db_dict = studio_db_sqlite.load_studio_db_dict(repeated_connection)
+        self.assertEqual(list(studio_db_dict.keys()), ["John Doe", "Jane Doe"])
+        self.assertEqual(
+            studio_db_dict["John Doe"]["email_address"], "john.doe@example.edu"
+        )
+
+    def test_failed_export_removes_temp_file(self):
+        failed_db_file = os.path.join(self.temp_dir.name, "failed_studio_db.db")
+
+        def create_records():
+            yield "John Doe", {}
+
+        with self.assertRaises(KeyError):
+            studio_db_sqlite.export_studio_db_records(create_records(), failed_db_file)
+
+        self.assertEqual(
+            sorted(os.listdir(self.temp_dir.name)),
+            ["studio_db.db"],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
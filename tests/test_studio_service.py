@@ -0,0 +1,110 @@
+import json
+import os
+import stat
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+
+from studio_client import send_job
+from studio_service import TOKEN_HEADER, create_service_server, write_token_file
+
+TOKEN = "test-token"
+
+
+class FakeService:
+    def __init__(self):
+        self.requests = []
+
+    def handle(self, method, path, body):
+        self.requests.append((method, path, body))
+        return 200, {"ok": True}
+
+
+class TestStudioServiceServer(unittest.TestCase):
+    def setUp(self):
+        self.service = FakeService()
+        self.server = create_service_server(self.service, TOKEN, 0)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.base_url = "http://localhost:{}".format(self.server.server_address[1])
+
+    def send(self, path, body=None, headers=None):
+        request = urllib.request.Request(
+            self.base_url + path,
+            data=json.dumps(body).encode("utf-8") if body is not None else None,
+            headers=(
+                headers
+                if headers is not None
+                else {TOKEN_HEADER: TOKEN, "Content-Type": "application/json"}
+            ),
+            method="POST" if body is not None else "GET",
+        )
+        try:
+            with urllib.request.urlopen(request) as response:
+                return response.status, json.loads(response.read())
+        except urllib.error.HTTPError as error:
+            return error.code, json.loads(error.read())
+
+    def test_query_string_is_not_part_of_route(self):
+        status, _ = self.send("/health?verbose=1")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(self.service.requests, [("GET", "/health", {})])
+
+    def test_non_object_body_is_rejected(self):
+        status, response = self.send("/ipm", ["John Doe"])
+
+        self.assertEqual(status, 400)
+        self.assertIn("JSON object", response["error"])
+        self.assertEqual(self.service.requests, [])
+
+    def test_missing_or_wrong_token_is_rejected(self):
+        missing_status, _ = self.send("/health", headers={})
+        wrong_status, _ = self.send("/health", headers={TOKEN_HEADER: "wrong"})
+
+        self.assertEqual(missing_status, 401)
+        self.assertEqual(wrong_status, 401)
+        self.assertEqual(self.service.requests, [])
+
+    def test_other_hosts_are_rejected(self):
+        status, _ = self.send(
+            "/health", headers={TOKEN_HEADER: TOKEN, "Host": "attacker.example:8765"}
+        )
+
+        self.assertEqual(status, 403)
+        self.assertEqual(self.service.requests, [])
+
+    def test_post_must_be_json(self):
+        status, _ = self.send(
+            "/ipm",
+            {"template_url": "", "folder_url": ""},
+            headers={TOKEN_HEADER: TOKEN, "Content-Type": "text/plain"},
+        )
+
+        self.assertEqual(status, 415)
+        self.assertEqual(self.service.requests, [])
+
+    def test_client_sends_token(self):
+        response = send_job(
+            "POST", "/roster/refresh", service_url=self.base_url, token=TOKEN
+        )
+
+        self.assertEqual(response, {"ok": True})
+        self.assertEqual(self.service.requests, [("POST", "/roster/refresh", {})])
+
+    def test_token_file_is_private(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            token_filepath = os.path.join(temp_dir, ".studio_service_token")
+            write_token_file("old-token", token_filepath)
+            write_token_file(TOKEN, token_filepath)
+
+            with open(token_filepath) as infile:
+                self.assertEqual(infile.read(), TOKEN)
+            self.assertEqual(stat.S_IMODE(os.stat(token_filepath).st_mode), 0o600)
+
+
+if __name__ == "__main__":
+    unittest.main()
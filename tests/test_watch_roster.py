@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import watch_roster
+from tests.fake_drive import FakeDriveService
+
+ROSTER_URL = "https://docs.google.com/spreadsheets/d/roster/edit"
+IPM_TEMPLATE_URL = "https://docs.google.com/spreadsheets/d/ipm-template/edit"
+WEEKLY_TEMPLATE_URL = "https://docs.google.com/presentation/d/weekly-template/edit"
+
+
+class FakeWorksheet:
+    def __init__(self, values):
+        self.values = values
+
+    def get_all_values(self):
+        return self.values
+
+
+class FakeSpreadsheet:
+    """
+    Stands in for a gspread spreadsheet, recording which sheets are fetched.
+    """
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.fetched_sheets = []
+
+    def worksheet(self, sheet_name):
+        self.fetched_sheets.append(sheet_name)
+        return FakeWorksheet(self.sheets[sheet_name])
+
+
+class FakeSheetsClient:
+    def __init__(self, spreadsheet):
+        self.spreadsheet = spreadsheet
+
+    def open_by_url(self, url):
+        return self.spreadsheet
+
+
+class TestWatchRoster(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.gdrive_service = FakeDriveService()
+        self.spreadsheet = FakeSpreadsheet(
+            {
+                "Student Info": [
+                    ["Full Name", "Email", "Team Name"],
+                    ["John Doe", "john@example.edu", "Milky Way"],
+                ],
+                "Team Info": [["Team Name"], ["Milky Way"]],
+            }
+        )
+        self.config = {
+            "roster_url": ROSTER_URL,
+            "student_info_sheet_name": "Student Info",
+            "team_info_sheet_name": "Team Info",
+            "state_path": os.path.join(self.temp_dir.name, "watch_state.json"),
+            "poll_interval": 0,
+            "ipm": {
+                "template_url": IPM_TEMPLATE_URL,
+                "folder_url": "https://drive.google.com/drive/folders/ipms",
+            },
+            "weekly_template": {
+                "template_name": "Template 01",
+                "template_url": WEEKLY_TEMPLATE_URL,
+                "folder_url": "https://drive.google.com/drive/folders/templates",
+            },
+        }
+
+        # keep roster parsing warnings and generator output out of the test output
+        patcher = mock.patch("builtins.print")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(self.temp_dir.cleanup)
+
+    def watch(self, max_polls):
+        watch_roster.watch(
+            self.gdrive_service,
+            FakeSheetsClient(self.spreadsheet),
+            self.config,
+            max_polls,
+        )
+
+    def folder_filenames(self, folder_id):
+        return sorted(
+            curr_file["name"]
+            for _, curr_file in self.gdrive_service.find_files(parent_id=folder_id)
+        )
+
+    def test_first_run_generates_every_section(self):
+        self.watch(max_polls=1)
+
+        self.assertEqual(
+            self.folder_filenames("ipms"), ["[John D.] Individual Progress Map (IPM)"]
+        )
+        self.assertEqual(
+            self.folder_filenames("templates"), ["[Milky Way] Template 01"]
+        )
+
+    def test_template_change_only_checks_its_section(self):
+        self.watch(max_polls=1)
+        self.spreadsheet.fetched_sheets = []
+
+        self.gdrive_service.touch("weekly-template")
+        self.watch(max_polls=1)
+
+        self.assertEqual(self.spreadsheet.fetched_sheets, ["Team Info"])
+
+    def test_roster_change_only_generates_changed_sheet(self):
+        self.watch(max_polls=1)
+
+        # add a student, without changing the teams
+        self.spreadsheet.sheets["Student Info"].append(
+            ["Jane Doe", "jane@example.edu", "Milky Way"]
+        )
+        self.gdrive_service.touch("roster")
+        self.gdrive_service.calls = []
+        self.watch(max_polls=1)
+
+        self.assertEqual(
+            self.folder_filenames("ipms"),
+            [
+                "[Jane D.] Individual Progress Map (IPM)",
+                "[John D.] Individual Progress Map (IPM)",
+            ],
+        )
+
+        # only the IPM folder is listed, since the teams did not change
+        self.assertEqual(self.gdrive_service.calls.count("files.list"), 1)
+        self.assertEqual(self.gdrive_service.calls.count("files.copy"), 1)
+
+    def test_unwatched_change_does_nothing(self):
+        self.watch(max_polls=1)
+        self.spreadsheet.fetched_sheets = []
+
+        self.gdrive_service.touch("someone-elses-file")
+        self.watch(max_polls=1)
+
+        self.assertEqual(self.spreadsheet.fetched_sheets, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,405 @@
+"""
+This script is used to watch the Studio Roster and templates for changes, using the Google Drive changes feed, and to
+generate files for any students or teams that do not have them yet whenever something changes.
+
+The watcher is configured with a JSON file:
+
+{
+    "roster_url": "<studio_db_url>",
+    "student_info_sheet_name": "Student Info",
+    "team_info_sheet_name": "Team Info",
+    "poll_interval": 60,
+    "state_path": "watch_state.json",
+    "ipm": {"template_url": "<ipm_template_url>", "folder_url": "<ipm_folder_url>"},
+    "weekly_template": {
+        "template_name": "<template_name>",
+        "template_url": "<weekly_template_template_url>",
+        "folder_url": "<weekly_template_folder_url>"
+    },
+    "api_endpoint": "<optional url of a local fake Google Drive API, for testing>"
+}
+
+The "ipm" and "weekly_template" sections are optional. When a template changes, only its section's roster sheet is
+re-parsed and checked for missing files. The changes feed reports the roster spreadsheet as a whole, so when it changes,
+each section's sheet is re-parsed, but only sections whose students or teams changed are checked for missing files.
+"""
+
+import hashlib
+import sys
+import json
+import os
+import time
+import helpers.imports as helpers
+import helpers.drive as drive
+import helpers.naming as naming
+import helpers.pipeline as pipeline
+import roster_to_json as studio_db
+from create_ipm import generate_ipm
+from create_weekly_templates import generate_weekly_templates
+
+# defaults for optional config values
+DEFAULT_POLL_INTERVAL = 60
+DEFAULT_STATE_PATH = "watch_state.json"
+
+# generator sections of the watcher config, and the roster sheet each one reads
+WATCH_SECTIONS = {
+    "ipm": "student_info_sheet_name",
+    "weekly_template": "team_info_sheet_name",
+}
+
+
+def load_watch_state(state_path):
+    """
+    Loads the watcher's persisted state.
+
+    :param state_path: string filepath of state file.
+    :return: dict of state (with the changes feed page_token), or an empty dict if there is no saved state.
+    """
+    if not os.path.exists(state_path):
+        return {}
+
+    with open(state_path, "r") as infile:
+        return json.load(infile)
+
+
+def save_watch_state(state, state_path):
+    """
+    Saves the watcher's state, replacing the state file atomically.
+
+    :param state: dict of state to save.
+    :param state_path: string filepath of state file.
+    :return: None
+    """
+    temp_path = "{path}.tmp".format(path=state_path)
+    with open(temp_path, "w") as outfile:
+        json.dump(state, outfile)
+    os.replace(temp_path, state_path)
+
+
+def get_start_page_token(gdrive_service):
+    """
+    Gets a changes feed page token for the current state of Google Drive.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :return: string page token.
+    """
+    response = (
+        gdrive_service.changes()
+        .getStartPageToken(supportsAllDrives=True, fields="startPageToken")
+        .execute()
+    )
+    return response["startPageToken"]
+
+
+def poll_changes(gdrive_service, page_token):
+    """
+    Fetches every change since a page token. When nothing changed, this is a single small request.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param page_token: string page token from a previous poll (or get_start_page_token).
+    :return: tuple of (set of string ids of changed files, string page token for the next poll).
+    """
+    changed_file_ids = set()
+
+    while True:
+        response = (
+            gdrive_service.changes()
+            .list(
+                pageToken=page_token,
+                fields="nextPageToken, newStartPageToken, changes(fileId)",
+                pageSize=1000,
+                supportsAllDrives=True,
+                includeItemsFromAllDrives=True,
+            )
+            .execute()
+        )
+        changed_file_ids.update(
+            change["fileId"] for change in response.get("changes", [])
+        )
+
+        # the last page includes the token to use for the next poll
+        if "newStartPageToken" in response:
+            return changed_file_ids, response["newStartPageToken"]
+
+        page_token = response["nextPageToken"]
+
+
+def find_missing_files(gdrive_service, folder_url, expected_filenames):
+    """
+    Finds which expected generated files are not in a folder yet.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param folder_url: string url of folder that generated files are copied to.
+    :param expected_filenames: dict of string filename to the student or team name it is generated for.
+    :return: list of student or team names whose file is missing.
+    """
+    folder_id = helpers.get_folder_id_from_url(folder_url)
+    existing_filenames = {
+        curr_file["name"]
+        for curr_file in drive.list_files(
+            gdrive_service, drive.folder_query(folder_id), fields="name"
+        )
+    }
+
+    return [
+        owner
+        for filename, owner in expected_filenames.items()
+        if filename not in existing_filenames
+    ]
+
+
+def fetch_section_owners(roster_spreadsheet, config, section):
+    """
+    Re-parses only the roster sheet that a section's generator needs.
+
+    :param roster_spreadsheet: gspread spreadsheet object for the Studio Roster.
+    :param config: dict of watcher config.
+    :param section: string section of watcher config (key of WATCH_SECTIONS).
+    :return: sorted list of string student names (for "ipm") or team names (for "weekly_template").
+    """
+    if WATCH_SECTIONS[section] == "student_info_sheet_name":
+        owners = studio_db.fetch_student_info(
+            roster_spreadsheet, config["student_info_sheet_name"]
+        ).keys()
+    else:
+        owners = studio_db.fetch_team_info(
+            roster_spreadsheet, config["team_info_sheet_name"]
+        ).keys()
+
+    # skip empty rows in the roster
+    return sorted(owner for owner in owners if owner != "")
+
+
+def generate_section_files(gdrive_service, config, section, owners):
+    """
+    Generates a section's files for any students or teams that do not have them yet.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param config: dict of watcher config.
+    :param section: string section of watcher config (key of WATCH_SECTIONS).
+    :param owners: list of string student or team names from fetch_section_owners.
+    :return: list of student or team names that files were generated for.
+    """
+    section_config = config[section]
+
+    # generate IPMs for new students
+    if section == "ipm":
+        missing_students = find_missing_files(
+            gdrive_service,
+            section_config["folder_url"],
+            {
+                naming.ipm_filename(student_name): student_name
+                for student_name in owners
+            },
+        )
+
+        if len(missing_students) > 0:
+            print("Generating IPMs for: {}".format(missing_students))
+            for record in generate_ipm(
+                missing_students,
+                gdrive_service,
+                section_config["template_url"],
+                section_config["folder_url"],
+            ):
+                print(pipeline.format_result_record(record))
+        return missing_students
+
+    # generate Weekly Templates for new teams
+    missing_teams = find_missing_files(
+        gdrive_service,
+        section_config["folder_url"],
+        {
+            naming.weekly_template_filename(
+                team_name, section_config["template_name"]
+            ): team_name
+            for team_name in owners
+        },
+    )
+
+    if len(missing_teams) > 0:
+        print("Generating Weekly Templates for: {}".format(missing_teams))
+        for record in generate_weekly_templates(
+            missing_teams,
+            gdrive_service,
+            section_config["template_name"],
+            section_config["template_url"],
+            section_config["folder_url"],
+        ):
+            print(pipeline.format_result_record(record))
+    return missing_teams
+
+
+def create_owners_fingerprint(owners):
+    """
+    :param owners: list of string student or team names.
+    :return: string hash of owners, to tell if a roster sheet's students or teams changed without storing them.
+    """
+    return hashlib.sha256(json.dumps(owners).encode("utf-8")).hexdigest()
+
+
+def generate_missing_files(
+    gdrive_service, gspreadsheets_service, config, state, sections
+):
+    """
+    Re-parses the roster sheet of each given section, and generates that section's files for any students or teams
+    that do not have them yet.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param gspreadsheets_service: gspread authentication object.
+    :param config: dict of watcher config.
+    :param state: dict of watcher state, holding a fingerprint of each section's students or teams. updated in place.
+    :param sections: dict of section to boolean whether to check for missing files even if the section's students or
+        teams did not change (e.g., when its template changed).
+    :return: dict of section to list of student or team names that files were generated for.
+    """
+    roster_spreadsheet = gspreadsheets_service.open_by_url(config["roster_url"])
+    fingerprints = state.setdefault("owner_fingerprints", {})
+
+    output = {}
+    for section, should_check in sections.items():
+        owners = fetch_section_owners(roster_spreadsheet, config, section)
+        fingerprint = create_owners_fingerprint(owners)
+
+        # a roster change may have been to the other sheet, or to columns that do not affect which files exist
+        if not should_check and fingerprints.get(section) == fingerprint:
+            continue
+
+        output[section] = generate_section_files(
+            gdrive_service, config, section, owners
+        )
+        fingerprints[section] = fingerprint
+
+    return output
+
+
+def get_watched_file_ids(config):
+    """
+    Gets the ids of the roster and every template the watcher is configured with.
+
+    :param config: dict of watcher config.
+    :return: set of string file ids.
+    """
+    output = {helpers.get_file_id_from_url(config["roster_url"])}
+
+    for section in WATCH_SECTIONS:
+        if section in config:
+            output.add(helpers.get_file_id_from_url(config[section]["template_url"]))
+
+    return output
+
+
+def get_changed_sections(config, changed_file_ids):
+    """
+    Maps changed files to the configured sections they affect. A template change only affects its own section. The
+    changes feed reports the roster as a whole, so a roster change affects every section, but only sections whose
+    students or teams changed generate files (see generate_missing_files).
+
+    :param config: dict of watcher config.
+    :param changed_file_ids: set of string ids of changed files.
+    :return: dict of section to boolean whether its template changed, for each affected section.
+    """
+    roster_changed = helpers.get_file_id_from_url(config["roster_url"]) in (
+        changed_file_ids
+    )
+
+    output = {}
+    for section in WATCH_SECTIONS:
+        if section not in config:
+            continue
+
+        template_changed = (
+            helpers.get_file_id_from_url(config[section]["template_url"])
+            in changed_file_ids
+        )
+        if template_changed or roster_changed:
+            output[section] = template_changed
+
+    return output
+
+
+def watch(gdrive_service, gspreadsheets_service, config, max_polls=None):
+    """
+    Polls the changes feed, generating missing files whenever the roster or a template changes.
+
+    :param gdrive_service: Google Drive v3 authentication object.
+    :param gspreadsheets_service: gspread authentication object.
+    :param config: dict of watcher config.
+    :param max_polls: optional int number of polls before returning. polls forever if None.
+    :return: None
+    """
+    state_path = config.get("state_path", DEFAULT_STATE_PATH)
+    poll_interval = config.get("poll_interval", DEFAULT_POLL_INTERVAL)
+
+    # start from the persisted page token, or catch up once and start watching from now
+    state = load_watch_state(state_path)
+    if "page_token" not in state:
+        state["page_token"] = get_start_page_token(gdrive_service)
+        generate_missing_files(
+            gdrive_service,
+            gspreadsheets_service,
+            config,
+            state,
+            {section: True for section in WATCH_SECTIONS if section in config},
+        )
+        save_watch_state(state, state_path)
+
+    poll_count = 0
+    while max_polls is None or poll_count < max_polls:
+        changed_file_ids, next_page_token = poll_changes(
+            gdrive_service, state["page_token"]
+        )
+
+        # only re-parse and generate for the sections affected by what changed
+        changed_sections = get_changed_sections(config, changed_file_ids)
+        if len(changed_sections) > 0:
+            print(
+                "Roster or template changed. Checking for missing files: {}".format(
+                    list(changed_sections.keys())
+                )
+            )
+            generate_missing_files(
+                gdrive_service, gspreadsheets_service, config, state, changed_sections
+            )
+
+        # only advance the page token once changes are handled, so a crash replays them
+        state["page_token"] = next_page_token
+        save_watch_state(state, state_path)
+
+        poll_count += 1
+        if max_polls is None or poll_count < max_polls:
+            time.sleep(poll_interval)
+
+
+def main(config_path):
+    """
+    Loads the watcher config, authenticates, and watches for changes until stopped.
+
+    :param config_path: string filepath of watcher config.
+    :return: None
+    """
+    with open(config_path, "r") as infile:
+        config = json.load(infile)
+
+    # authenticate for Google Drive v3 and Google Spreadsheets APIs
+    gdrive_service = helpers.auth_gdrive(api_endpoint=config.get("api_endpoint"))
+    gspreadsheets_service = helpers.auth_gsheets()
+
+    watch(gdrive_service, gspreadsheets_service, config)
+
+
+if __name__ == "__main__":
+    # get command line args
+    arg_count = len(sys.argv) - 1
+
+    # check for correct number of arguments
+    if arg_count != 1:
+        raise Exception(
+            "Invalid number of arguments. Expected 1 (Watch config filepath) got {}.".format(
+                arg_count
+            )
+        )
+
+    # inputs for watching roster
+    input_config_path = sys.argv[1]
+
+    main(input_config_path)